@@ -9,13 +9,16 @@ django.setup()          # <── important
 
 # Now it is safe to import consumers that touch models
 from lessons.consumers import NewsFeedConsumer
-from core.consumers import CounterConsumer, NotificationConsumer
+from core.consumers import CounterConsumer, NotificationConsumer, StreamConsumer
+from dashboard.consumers import DashboardConsumer
 from core.middleware import JWTAuthMiddleware
 
 websocket_urlpatterns = [
     re_path(r'^ws/notifications/$', NotificationConsumer.as_asgi()),
     re_path(r'ws/notifications/count/$', CounterConsumer.as_asgi()),
     re_path(r'^ws/news/(?P<slot_id>\d+)/$', NewsFeedConsumer.as_asgi()),
+    re_path(r'^ws/stream/$', StreamConsumer.as_asgi()),
+    re_path(r'^ws/dashboard/$', DashboardConsumer.as_asgi()),
 ]
 
 application = ProtocolTypeRouter({
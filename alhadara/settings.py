@@ -278,6 +278,32 @@ TELEGRAM_FILE_BOT_TOKEN = os.environ.get('TELEGRAM_FILE_BOT_TOKEN')
 TELEGRAM_FILE_CHAT_ID = os.environ.get('TELEGRAM_FILE_CHAT_ID')
 TELEGRAM_FILE_BOT_USERNAME = os.environ.get('TELEGRAM_FILE_BOT_USERNAME')
 
+# Where uploaded files (lesson material, news attachments, reports) are kept: telegram, local or s3
+FILE_STORAGE_BACKEND = os.environ.get('FILE_STORAGE_BACKEND', 'telegram')
+# Takes files over the primary backend's size cap (Telegram: 20 MB, what the bot can download again)
+FILE_STORAGE_OVERFLOW_BACKEND = os.environ.get('FILE_STORAGE_OVERFLOW_BACKEND', 'local')
+# Bytes read/written per step; also the S3 multipart part size (min 5 MB)
+FILE_STORAGE_CHUNK_SIZE = int(os.environ.get('FILE_STORAGE_CHUNK_SIZE', 8 * 1024 * 1024))
+FILE_STORAGE_LOCAL_ROOT = os.environ.get('FILE_STORAGE_LOCAL_ROOT', os.path.join(BASE_DIR, 'filestore'))
+# Uploads wait here for their background upload job; must be shared with the RQ workers
+FILE_STORAGE_SPOOL_DIR = os.environ.get('FILE_STORAGE_SPOOL_DIR', os.path.join(BASE_DIR, 'spool'))
+# Any S3-compatible store; set the endpoint for MinIO and friends, leave it unset for AWS
+FILE_STORAGE_S3_BUCKET = os.environ.get('FILE_STORAGE_S3_BUCKET')
+FILE_STORAGE_S3_ENDPOINT_URL = os.environ.get('FILE_STORAGE_S3_ENDPOINT_URL')
+FILE_STORAGE_S3_ACCESS_KEY_ID = os.environ.get('FILE_STORAGE_S3_ACCESS_KEY_ID')
+FILE_STORAGE_S3_SECRET_ACCESS_KEY = os.environ.get('FILE_STORAGE_S3_SECRET_ACCESS_KEY')
+FILE_STORAGE_S3_REGION = os.environ.get('FILE_STORAGE_S3_REGION')
+
+# Read notifications older than this are moved to NotificationArchive
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 90))
+NOTIFICATION_ARCHIVE_BATCH_SIZE = int(os.environ.get('NOTIFICATION_ARCHIVE_BATCH_SIZE', 5000))
+
+# Languages catalog text is translated into ahead of time (see core.TextTranslation)
+TRANSLATION_LANGUAGES = os.environ.get('TRANSLATION_LANGUAGES', 'en').split(',')
+
+# Days of dashboard.DailyFacts the nightly job rebuilds from the source tables
+DAILY_FACTS_RECONCILE_DAYS = int(os.environ.get('DAILY_FACTS_RECONCILE_DAYS', 7))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -313,7 +339,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'EXCEPTION_HANDLER': 'core.exceptions.custom_exception_handler',
     
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Complaint
 from django.utils import timezone
+from dashboard.rollups import schedule_bulk_fact_refresh, schedule_fact_refresh
 
 class PriorityListFilter(admin.SimpleListFilter):
     title = 'priority'
@@ -45,9 +46,13 @@ class ComplaintAdmin(admin.ModelAdmin):
     actions = ['mark_as_resolved', 'mark_as_in_review']
     
     def mark_as_resolved(self, request, queryset):
+        # update() sends no signals; refresh the resolution days it moves
+        schedule_bulk_fact_refresh('complaints', queryset.filter(resolved_at__isnull=False), 'resolved_at')
+        schedule_fact_refresh('complaints', timezone.localdate())
         queryset.update(status='resolved', resolved_at=timezone.now())
     mark_as_resolved.short_description = "Mark selected complaints as resolved"
     
     def mark_as_in_review(self, request, queryset):
+        schedule_bulk_fact_refresh('complaints', queryset.filter(resolved_at__isnull=False), 'resolved_at')
         queryset.update(status='in_review')
     mark_as_in_review.short_description = "Mark selected complaints as in review"
\ No newline at end of file
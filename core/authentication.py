@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# ------------------------------------------------------------------
+# User-claims cache
+# ------------------------------------------------------------------
+# Only identity and role fields are cached; everything else (password,
+# reset tokens, ...) stays deferred and is loaded lazily on first access,
+# so a cached user behaves like a normal model instance, including save().
+USER_CLAIMS_FIELDS = {
+    'id', 'phone', 'first_name', 'middle_name', 'last_name',
+    'user_type', 'is_active', 'is_staff', 'is_superuser', 'is_verified',
+    'telegram_chat_id', 'last_login', 'date_joined',
+}
+USER_CLAIMS_VERSION_KEY = "auth:user:{user_id}:version"
+USER_CLAIMS_KEY = "auth:user:{user_id}:v{version}"
+USER_CLAIMS_TIMEOUT = 60 * 15   # seconds
+
+
+def _claim_attnames():
+    # from_db() expects values in concrete-field order
+    return [f.attname for f in User._meta.concrete_fields if f.attname in USER_CLAIMS_FIELDS]
+
+
+def get_cached_user(user_id):
+    """
+    Return the user with `user_id`, served from the claims cache when
+    possible. Returns None if the user does not exist.
+    """
+    version = cache.get(USER_CLAIMS_VERSION_KEY.format(user_id=user_id), 0)
+    key = USER_CLAIMS_KEY.format(user_id=user_id, version=version)
+    attnames = _claim_attnames()
+
+    values = cache.get(key)
+    if values is None:
+        values = User.objects.filter(pk=user_id).values_list(*attnames).first()
+        if values is None:
+            return None
+        cache.set(key, tuple(values), USER_CLAIMS_TIMEOUT)
+
+    return User.from_db('default', attnames, values)
+
+
+def invalidate_user_claims(user_id):
+    """
+    Bump the user's claims version. Readers that loaded the old row before
+    the write can only repopulate the previous version's key, so they never
+    resurrect stale claims.
+    """
+    key = USER_CLAIMS_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement for SimpleJWT's JWTAuthentication that resolves the
+    token's user through the claims cache instead of querying the database
+    on every request.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares against the password hash, which is not cached
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
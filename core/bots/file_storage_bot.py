@@ -1,12 +1,19 @@
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
 from telegram import Update
 from django.conf import settings
-from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from core.file_links import cached_short_link, resolve_short_link
 import logging
 import urllib.parse
 
 logger = logging.getLogger(__name__)
 
+
+async def lookup_file_id(short_id):
+    """Telegram file_id behind a deep-link short id; off the event loop only on an LRU miss."""
+    return cached_short_link(short_id) or await sync_to_async(resolve_short_link)(short_id)
+
+
 async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle /start command with or without parameters.
@@ -33,18 +40,17 @@ async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # --- Download link handling ---
     if param and param.startswith("download_"):
         short_id = param[len("download_") :]
-        cache_key = f"telegram_file_{short_id}"
-        file_id = cache.get(cache_key)
+        file_id = await lookup_file_id(short_id)
 
         if not file_id:
-            logger.error(f"Cache miss for short_id={short_id}")
+            logger.error(f"Unknown short_id={short_id}")
             await message.reply_text(
-                "❌ Link expired or invalid.\n"
-                "Please request a fresh download link from the app."
+                "❌ This download link is invalid.\n"
+                "Please open the file again from the app."
             )
             return
 
-        logger.info(f"Cache hit → file_id={file_id}")
+        logger.info(f"Resolved short_id={short_id} → file_id={file_id}")
         try:
             # Telegram accepts document, audio, video, voice, photo, etc.
             await context.bot.send_document(chat_id=chat_id, document=file_id)
@@ -87,13 +93,11 @@ async def handle_fallback_download(update: Update, context: ContextTypes.DEFAULT
         short_id = text[len("download_"):]
         logger.info(f"Attempting to resolve short_id from fallback: {short_id}")
         
-        # Get the actual file_id from cache
-        cache_key = f"telegram_file_{short_id}"
-        file_id = cache.get(cache_key)
+        file_id = await lookup_file_id(short_id)
         
         if not file_id:
             logger.error(f"File ID not found for short_id: {short_id}")
-            await message.reply_text("Sorry, this download link has expired or is invalid.")
+            await message.reply_text("Sorry, this download link is invalid.")
             return
         
         logger.info(f"Resolved file_id from fallback: {file_id}")
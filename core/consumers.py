@@ -1,5 +1,6 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.db.models import Q
 import json
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -91,4 +92,220 @@ class CounterConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def _get_unread_count(self, user):
-        return user.notifications.filter(is_read=False).count()
\ No newline at end of file
+        return user.notifications.filter(is_read=False).count()
+
+class StreamConsumer(AsyncWebsocketConsumer):
+    """
+    Single multiplexed socket for a logged-in user.
+
+    The user's own channel (notifications + unread counter) is joined on
+    connect; schedule-slot news feeds are joined on demand. Every outgoing
+    frame carries a `channel` key so the client can route it.
+
+    Client -> server:
+        {"type": "subscribe",   "channel": "slot", "slot_id": 5, "last_event_id": 40}
+        {"type": "unsubscribe", "channel": "slot", "slot_id": 5}
+        {"type": "resume",      "channel": "notifications", "last_event_id": 120}
+
+    `last_event_id` is the id of the last notification / news item the client
+    saw; only newer items are replayed, so reconnecting does not resend the
+    whole history.
+    """
+    RESUME_LIMIT = 100
+
+    async def connect(self):
+        self.user = self.scope.get("user")
+        if not self.user or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.user_group = f"user_{self.user.id}"
+        self.slot_groups = {}
+        await self.channel_layer.group_add(self.user_group, self.channel_name)
+        await self.accept()
+
+        await self.send_json({
+            "channel": "system",
+            "type": "connection_established",
+            "unread_count": await self._get_unread_count(),
+        })
+
+    async def disconnect(self, code):
+        if hasattr(self, "user_group"):
+            await self.channel_layer.group_discard(self.user_group, self.channel_name)
+        for group_name in getattr(self, "slot_groups", {}).values():
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data)
+        except (TypeError, ValueError):
+            return
+
+        msg_type = data.get("type")
+        channel = data.get("channel")
+
+        if channel == "slot" and msg_type == "subscribe":
+            await self.subscribe_slot(data.get("slot_id"), data.get("last_event_id"))
+        elif channel == "slot" and msg_type == "unsubscribe":
+            await self.unsubscribe_slot(data.get("slot_id"))
+        elif channel == "notifications" and msg_type == "resume":
+            await self.resume_notifications(data.get("last_event_id"))
+        else:
+            await self.send_error("Unknown message type or channel")
+
+    # ------------------------------------------------------------------
+    # Client commands
+    # ------------------------------------------------------------------
+    async def subscribe_slot(self, slot_id, last_event_id=None):
+        try:
+            slot_id = int(slot_id)
+        except (TypeError, ValueError):
+            await self.send_error("slot_id is required")
+            return
+        try:
+            last_event_id = self._parse_event_id(last_event_id)
+        except (TypeError, ValueError):
+            await self.send_error("last_event_id must be an integer", slot_id=slot_id)
+            return
+
+        if not await self._can_access_slot(slot_id):
+            await self.send_error("Not allowed", slot_id=slot_id)
+            return
+
+        if slot_id not in self.slot_groups:
+            group_name = f"slot_news_{slot_id}"
+            await self.channel_layer.group_add(group_name, self.channel_name)
+            self.slot_groups[slot_id] = group_name
+
+        items = await self._get_news_since(slot_id, last_event_id)
+        await self.send_json({
+            "channel": "slot",
+            "slot_id": slot_id,
+            "type": "subscribed",
+            "items": items,
+        })
+
+    async def unsubscribe_slot(self, slot_id):
+        try:
+            slot_id = int(slot_id)
+        except (TypeError, ValueError):
+            return
+        group_name = self.slot_groups.pop(slot_id, None)
+        if group_name:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+        await self.send_json({"channel": "slot", "slot_id": slot_id, "type": "unsubscribed"})
+
+    async def resume_notifications(self, last_event_id):
+        try:
+            last_event_id = self._parse_event_id(last_event_id)
+        except (TypeError, ValueError):
+            await self.send_error("last_event_id must be an integer")
+            return
+        notifications = await self._get_notifications_since(last_event_id)
+        await self.send_json({
+            "channel": "notifications",
+            "type": "resumed",
+            "notifications": notifications,
+        })
+
+    # ------------------------------------------------------------------
+    # Channel-layer event handlers
+    # ------------------------------------------------------------------
+    async def notification_message(self, event):
+        await self.send_json({
+            "channel": "notifications",
+            "type": "notification",
+            "event_id": event["notification"]["id"],
+            "notification": event["notification"],
+        })
+
+    async def notification_counter(self, event):
+        await self.send_json({
+            "channel": "counter",
+            "type": "counter",
+            "unread_count": event["unread_count"],
+        })
+
+    async def news_item_posted(self, event):
+        payload = event["payload"]
+        await self.send_json({
+            "channel": "slot",
+            "slot_id": payload.get("schedule_slot"),
+            "type": "new_item",
+            "event_id": payload.get("id"),
+            "item": payload,
+        })
+
+    async def news_file_status(self, event):
+        payload = event["payload"]
+        await self.send_json({
+            "channel": "slot",
+            "slot_id": payload["schedule_slot"],
+            "type": "file_status",
+            "event_id": payload["file"]["id"],
+            "file": payload["file"],
+            "news_ids": payload["news_ids"],
+            "lesson_ids": payload["lesson_ids"],
+        })
+
+    # ------------------------------------------------------------------
+    # helpers
+    # ------------------------------------------------------------------
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content))
+
+    @staticmethod
+    def _parse_event_id(last_event_id):
+        """None (no replay) or the integer id; raises ValueError/TypeError otherwise."""
+        return None if last_event_id is None else int(last_event_id)
+
+    async def send_error(self, detail, **extra):
+        await self.send_json({"channel": "system", "type": "error", "detail": detail, **extra})
+
+    @database_sync_to_async
+    def _get_unread_count(self):
+        return self.user.notifications.filter(is_read=False).count()
+
+    @database_sync_to_async
+    def _can_access_slot(self, slot_id):
+        from courses.models import ScheduleSlot
+        return ScheduleSlot.objects.filter(id=slot_id).filter(
+            Q(teacher=self.user) | Q(enrollments__student=self.user)
+        ).exists()
+
+    @database_sync_to_async
+    def _get_news_since(self, slot_id, last_event_id):
+        from lessons.models import ScheduleSlotNews
+        from lessons.serializers import ScheduleSlotNewsSerializer
+
+        qs = (
+            ScheduleSlotNews.objects
+            .filter(schedule_slot_id=slot_id)
+            .select_related("author", "file_storage", "related_homework", "related_quiz")
+        )
+        if last_event_id is not None:
+            qs = qs.filter(id__gt=last_event_id)
+        # Newest first, capped so a stale client cannot pull the full history
+        qs = qs.order_by("-id")[:self.RESUME_LIMIT]
+        return ScheduleSlotNewsSerializer(qs, many=True, context={"request": None}).data
+
+    @database_sync_to_async
+    def _get_notifications_since(self, last_event_id):
+        qs = self.user.notifications.all()
+        if last_event_id is not None:
+            qs = qs.filter(id__gt=last_event_id)
+        rows = qs.order_by("-id").values(
+            "id", "notification_type", "title", "message", "data", "created_at"
+        )[:self.RESUME_LIMIT]
+        return [
+            {
+                "id": row["id"],
+                "type": row["notification_type"],
+                "title": row["title"],
+                "message": row["message"],
+                "data": row["data"],
+                "created_at": row["created_at"].isoformat(),
+            }
+            for row in rows
+        ]
@@ -0,0 +1,391 @@
+"""
+Pluggable backends holding the bytes behind core.FileStorage.
+
+A backend streams an uploaded file to its store in chunks and returns a
+StoredFile; the FileStorage row records which backend holds the file
+(`backend`) and under what key (`storage_key`). Each backend keeps one
+client per process (boto3 client, Telegram bot + connection pool) shared by
+every upload and download instead of building one per call.
+
+    telegram  documents in the file chat, delivered by the file bot
+    local     a directory on disk (FILE_STORAGE_LOCAL_ROOT)
+    s3        an S3-compatible bucket: AWS S3, MinIO, ... (FILE_STORAGE_S3_*)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.utils.text import get_valid_filename
+
+from .file_links import download_link, register_short_link
+
+logger = logging.getLogger(__name__)
+
+
+class StoredFile(NamedTuple):
+    backend: str
+    key: str
+    size: int
+    download_link: Optional[str] = None
+
+
+class FileTooLarge(Exception):
+    """The file exceeds what the backend accepts."""
+
+
+def file_size(fileobj):
+    """Size in bytes of an uploaded file or seekable file object."""
+    if hasattr(fileobj, 'seek') and hasattr(fileobj, 'tell'):
+        position = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        fileobj.seek(position)
+        return size
+    return getattr(fileobj, 'size', 0) or 0
+
+
+def iter_chunks(fileobj, chunk_size):
+    """Read `fileobj` from the start in chunks of `chunk_size` bytes (the last may be shorter)."""
+    if hasattr(fileobj, 'chunks'):
+        # django File / UploadedFile; rewinds itself
+        yield from fileobj.chunks(chunk_size)
+        return
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+    while True:
+        data = fileobj.read(chunk_size)
+        if not data:
+            break
+        yield data
+
+
+def new_storage_key(name):
+    """A unique key that still ends in the original (sanitised) file name."""
+    return f"{uuid.uuid4().hex}/{get_valid_filename(os.path.basename(name)) or 'file'}"
+
+
+class FileBackend:
+    name = None
+    # Largest file the backend accepts, in bytes (None: no limit)
+    max_size = None
+
+    def save(self, fileobj, name):
+        """Store `fileobj` under a new key and return its StoredFile."""
+        raise NotImplementedError
+
+    def open(self, key, chunk_size=None):
+        """Iterate over the stored file's bytes in chunks."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class LocalFileBackend(FileBackend):
+    name = 'local'
+
+    def __init__(self, root, chunk_size):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage key outside the storage root: {key!r}")
+        return path
+
+    def save(self, fileobj, name):
+        key = new_storage_key(name)
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = 0
+        # Written under a temporary name so a reader never sees half a file
+        partial = f"{path}.part"
+        try:
+            with open(partial, 'wb') as out:
+                for chunk in iter_chunks(fileobj, self.chunk_size):
+                    out.write(chunk)
+                    size += len(chunk)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return StoredFile(self.name, key, size)
+
+    def open(self, key, chunk_size=None):
+        with open(self.path(key), 'rb') as f:
+            yield from iter_chunks(f, chunk_size or self.chunk_size)
+
+    def delete(self, key):
+        path = self.path(key)
+        try:
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Directory not empty; the file itself is gone
+            pass
+
+
+class S3FileBackend(FileBackend):
+    """
+    S3-compatible bucket. Files larger than one part go up as a multipart
+    upload, one part per chunk, so memory use stays at one part whatever the
+    file size; a failed upload is aborted so no orphaned parts are billed.
+    """
+    name = 's3'
+    MIN_PART_SIZE = 5 * 1024 * 1024   # S3's lower bound for every part but the last
+
+    def __init__(self, bucket, endpoint_url=None, access_key_id=None, secret_access_key=None,
+                 region=None, part_size=8 * 1024 * 1024, max_connections=20):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.max_connections = max_connections
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # boto3 clients are thread-safe but must not cross a fork (RQ work horses)
+        if self._client is not None and self._pid == os.getpid():
+            return self._client
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                import boto3
+                from botocore.config import Config
+
+                self._client = boto3.client(
+                    's3',
+                    endpoint_url=self.endpoint_url,
+                    aws_access_key_id=self.access_key_id,
+                    aws_secret_access_key=self.secret_access_key,
+                    region_name=self.region,
+                    config=Config(
+                        max_pool_connections=self.max_connections,
+                        retries={'max_attempts': 3, 'mode': 'standard'},
+                        # MinIO and most self-hosted stores don't do virtual-host buckets
+                        s3={'addressing_style': 'path' if self.endpoint_url else 'auto'},
+                    ),
+                )
+                self._pid = os.getpid()
+        return self._client
+
+    def save(self, fileobj, name):
+        key = new_storage_key(name)
+        chunks = iter_chunks(fileobj, self.part_size)
+        first = next(chunks, b'')
+        second = next(chunks, None)
+        if second is None:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=first)
+            return StoredFile(self.name, key, len(first))
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)['UploadId']
+        parts = []
+        size = 0
+        try:
+            for number, chunk in enumerate(_chain(first, second, chunks), start=1):
+                response = self.client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=chunk,
+                )
+                parts.append({'ETag': response['ETag'], 'PartNumber': number})
+                size += len(chunk)
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts},
+            )
+        except BaseException:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            except Exception as e:
+                logger.warning(f"Could not abort multipart upload {upload_id} of {key}: {e}")
+            raise
+        logger.info(f"Uploaded {key} to s3://{self.bucket} in {len(parts)} parts ({size} bytes)")
+        return StoredFile(self.name, key, size)
+
+    def open(self, key, chunk_size=None):
+        body = self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+        try:
+            yield from body.iter_chunks(chunk_size or self.part_size)
+        finally:
+            body.close()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+def _chain(first, second, rest):
+    yield first
+    yield second
+    yield from rest
+
+
+class TelegramFileBackend(FileBackend):
+    """
+    Documents sent to the file chat. The key is Telegram's file_id and the
+    download link a deep link into the file bot (core.file_links).
+
+    The Bot and its HTTPX pool live on a private event loop in a daemon
+    thread (as core.translation_client does), so every upload reuses one
+    connection pool rather than opening a new one per file.
+    """
+    name = 'telegram'
+    MAX_DOWNLOAD_SIZE = 20 * 1024 * 1024  # Bot API getFile limit
+    # The Bot API takes uploads up to 50 MB, but open() can only fetch files
+    # getFile hands out; anything larger goes to the overflow backend
+    max_size = MAX_DOWNLOAD_SIZE
+    MAX_RETRIES = 3
+
+    def __init__(self, token, chat_id, chunk_size=8 * 1024 * 1024):
+        self.token = token
+        self.chat_id = chat_id
+        self.chunk_size = chunk_size
+        self._loop = None
+        self._bot = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        # RQ forks a work horse per job; threads don't survive a fork
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                from telegram import Bot
+                from telegram.request import HTTPXRequest
+
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="telegram-file-backend", daemon=True).start()
+                self._bot = Bot(
+                    token=self.token,
+                    request=HTTPXRequest(connection_pool_size=8, connect_timeout=30, pool_timeout=30),
+                )
+                self._loop, self._pid = loop, os.getpid()
+        return self._loop
+
+    def _run(self, coro, timeout):
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    @staticmethod
+    def _timeout(size):
+        # 60s + 30s per MB, within 1-10 minutes
+        return min(max(60 + size / (1024 * 1024) * 30, 60), 600)
+
+    async def _send(self, fileobj, name, timeout):
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                logger.info(f"Upload attempt {attempt + 1}/{self.MAX_RETRIES}")
+                start_time = time.time()
+                if hasattr(fileobj, 'seek'):
+                    fileobj.seek(0)
+                msg = await self._bot.send_document(
+                    chat_id=self.chat_id,
+                    document=fileobj,
+                    filename=name,
+                    read_timeout=timeout,
+                    write_timeout=timeout,
+                )
+                logger.info(f"Upload successful in {time.time() - start_time:.2f} seconds")
+                return msg
+            except Exception as e:
+                logger.error(f"Upload attempt {attempt + 1} failed: {e}")
+                if attempt == self.MAX_RETRIES - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    def save(self, fileobj, name):
+        size = file_size(fileobj)
+        if size > self.max_size:
+            raise FileTooLarge(f"{name} is {size} bytes; the Telegram backend stores at most {self.max_size}.")
+        timeout = self._timeout(size)
+        logger.info(f"File size: {size} bytes, timeout {timeout:.0f}s")
+
+        try:
+            msg = self._run(self._send(fileobj, name, timeout), timeout * self.MAX_RETRIES + 10)
+        except Exception as e:
+            logger.error(f"All upload attempts failed: {e}")
+            raise Exception(f"Telegram upload failed after retries: {str(e)}")
+        if not msg or not getattr(msg, 'document', None):
+            raise Exception("Telegram upload failed or returned no document.")
+
+        file_id = msg.document.file_id
+        # Shorter identifier for the deep link, resolved by the file bot
+        short_id = register_short_link(file_id)
+        logger.info(f"File uploaded successfully. File ID: {file_id}")
+        return StoredFile(self.name, file_id, size, download_link=download_link(short_id) if short_id else None)
+
+    async def _download(self, key):
+        tg_file = await self._bot.get_file(key)
+        return await tg_file.download_as_bytearray()
+
+    def open(self, key, chunk_size=None):
+        # The Bot API hands out whole files (up to MAX_DOWNLOAD_SIZE) only
+        data = self._run(self._download(key), self._timeout(self.MAX_DOWNLOAD_SIZE))
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(data), chunk_size):
+            yield bytes(data[start:start + chunk_size])
+
+    def delete(self, key):
+        # Bots can't delete by file_id; the document stays in the file chat
+        logger.info(f"Telegram file {key} left in the file chat")
+
+
+def _build_backend(name):
+    if name == 'telegram':
+        return TelegramFileBackend(
+            settings.TELEGRAM_FILE_BOT_TOKEN,
+            settings.TELEGRAM_FILE_CHAT_ID,
+            chunk_size=settings.FILE_STORAGE_CHUNK_SIZE,
+        )
+    if name == 'local':
+        return LocalFileBackend(settings.FILE_STORAGE_LOCAL_ROOT, settings.FILE_STORAGE_CHUNK_SIZE)
+    if name == 's3':
+        return S3FileBackend(
+            settings.FILE_STORAGE_S3_BUCKET,
+            endpoint_url=settings.FILE_STORAGE_S3_ENDPOINT_URL,
+            access_key_id=settings.FILE_STORAGE_S3_ACCESS_KEY_ID,
+            secret_access_key=settings.FILE_STORAGE_S3_SECRET_ACCESS_KEY,
+            region=settings.FILE_STORAGE_S3_REGION,
+            part_size=settings.FILE_STORAGE_CHUNK_SIZE,
+        )
+    raise ValueError(f"Unknown file storage backend: {name!r}")
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_file_backend(name=None):
+    """The shared backend instance `name` (default: settings.FILE_STORAGE_BACKEND)."""
+    name = name or settings.FILE_STORAGE_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = _build_backend(name)
+    return backend
+
+
+def backend_for_size(size):
+    """The configured backend, or the overflow backend when `size` exceeds its cap."""
+    backend = get_file_backend()
+    if backend.max_size is not None and size > backend.max_size:
+        logger.info(f"{size} bytes exceeds the {backend.name} limit; using {settings.FILE_STORAGE_OVERFLOW_BACKEND}")
+        return get_file_backend(settings.FILE_STORAGE_OVERFLOW_BACKEND)
+    return backend
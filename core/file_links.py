@@ -0,0 +1,114 @@
+"""
+Short download links for files held by the Telegram backend.
+
+Deep links into the file bot carry a 12-character short id
+(`?start=download_<short_id>`). The short id -> file_id mapping is stored in
+TelegramFileLink, which never expires, and read through an in-process LRU
+and the shared cache. A link therefore resolves without a query in the
+common case, and still resolves after the cache is flushed.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Same key the cache-only links used, so links handed out before still hit
+SHORT_LINK_CACHE_KEY = "telegram_file_{short_id}"
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24 * 7  # 7 days; the table is the source of truth
+SHORT_LINK_LRU_SIZE = 10000
+SHORT_ID_LENGTH = 12
+SHORT_ID_ATTEMPTS = 3        # salted ids tried when a short id is taken by another file
+
+
+class ShortLinkLRU:
+    """Bounded per-process short_id -> file_id map; entries never go stale."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, short_id):
+        with self._lock:
+            file_id = self._entries.get(short_id)
+            if file_id is not None:
+                self._entries.move_to_end(short_id)
+            return file_id
+
+    def set(self, short_id, file_id):
+        with self._lock:
+            self._entries[short_id] = file_id
+            self._entries.move_to_end(short_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+SHORT_LINKS = ShortLinkLRU(SHORT_LINK_LRU_SIZE)
+
+
+def short_id_for(file_id, salt=0):
+    source = f"{file_id}:{salt}" if salt else file_id
+    return hashlib.md5(source.encode()).hexdigest()[:SHORT_ID_LENGTH]
+
+
+def download_link(short_id):
+    return f"https://t.me/{settings.TELEGRAM_FILE_BOT_USERNAME}?start=download_{short_id}"
+
+
+def _remember(short_id, file_id):
+    SHORT_LINKS.set(short_id, file_id)
+    cache.set(SHORT_LINK_CACHE_KEY.format(short_id=short_id), file_id, SHORT_LINK_CACHE_TIMEOUT)
+
+
+def register_short_link(file_id):
+    """
+    Persist (idempotently) and cache a short id for `file_id` and return it.
+    A short id already taken by another file is re-derived with a salt;
+    returns None, so no link is handed out, if every attempt collides.
+    """
+    from .models import TelegramFileLink
+
+    for salt in range(SHORT_ID_ATTEMPTS):
+        short_id = short_id_for(file_id, salt)
+        link, _ = TelegramFileLink.objects.get_or_create(short_id=short_id, defaults={'file_id': file_id})
+        if link.file_id == file_id:
+            _remember(short_id, file_id)
+            return short_id
+        logger.warning(f"Short id {short_id} already points at another Telegram file")
+    logger.error(f"No free short id for Telegram file {file_id}; it gets no download link")
+    return None
+
+
+def cached_short_link(short_id):
+    """The file_id if this process already knows it; never does I/O (safe on the event loop)."""
+    return SHORT_LINKS.get(short_id)
+
+
+def resolve_short_link(short_id):
+    """The file_id behind a short id, or None: LRU, then the shared cache, then the table."""
+    from .models import TelegramFileLink
+
+    if len(short_id) != SHORT_ID_LENGTH or not short_id.isalnum():
+        return None
+    file_id = SHORT_LINKS.get(short_id)
+    if file_id is not None:
+        return file_id
+
+    file_id = cache.get(SHORT_LINK_CACHE_KEY.format(short_id=short_id))
+    if file_id is not None:
+        SHORT_LINKS.set(short_id, file_id)
+        return file_id
+
+    file_id = TelegramFileLink.objects.filter(short_id=short_id).values_list('file_id', flat=True).first()
+    if file_id is not None:
+        _remember(short_id, file_id)
+    return file_id
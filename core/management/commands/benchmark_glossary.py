@@ -0,0 +1,59 @@
+import random
+import re
+import timeit
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import yaml
+from django.core.management.base import BaseCommand
+
+from core.translation import Glossary
+
+ARABIC_LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+
+
+def _word(rng, length):
+    return "".join(rng.choice(ARABIC_LETTERS) for _ in range(length))
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of glossary substitution: compiled matcher vs. recompiling per call."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--terms", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Glossary sizes to test.")
+        parser.add_argument("--words", type=int, default=300, help="Words per description.")
+        parser.add_argument("--runs", type=int, default=200, help="Calls timed per case.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        runs = opts["runs"]
+
+        self.stdout.write(f"{'terms':>7} {'words':>6} {'compiled us/call':>17} {'recompiled us/call':>19}")
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "glossary.yml"
+            for size in opts["terms"]:
+                terms = {}
+                while len(terms) < size:
+                    terms[_word(rng, rng.randint(3, 8))] = "term"
+                path.write_text(yaml.safe_dump(terms, allow_unicode=True), encoding="utf-8")
+                glossary = Glossary(path)
+
+                # A long description where roughly one word in ten is a glossary term
+                keys = list(terms)
+                text = " ".join(
+                    rng.choice(keys) if rng.random() < 0.1 else _word(rng, rng.randint(2, 9))
+                    for _ in range(opts["words"])
+                )
+
+                def recompiled():
+                    # Previous behaviour: build the alternation on every call
+                    pattern = re.compile(
+                        r"\b(" + "|".join(map(re.escape, terms.keys())) + r")\b",
+                        flags=re.IGNORECASE,
+                    )
+                    return pattern.sub(lambda m: terms.get(m.group(0).lower(), m.group(0)), text)
+
+                compiled_us = timeit.timeit(lambda: glossary.apply(text), number=runs) / runs * 1e6
+                recompiled_us = timeit.timeit(recompiled, number=runs) / runs * 1e6
+                self.stdout.write(f"{size:>7} {opts['words']:>6} {compiled_us:>17.1f} {recompiled_us:>19.1f}")
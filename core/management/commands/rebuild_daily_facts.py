@@ -0,0 +1,23 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.rollups import rebuild_daily_facts
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the dashboard daily facts for a date range (backfill or repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD). Defaults to 365 days ago.")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD). Defaults to today.")
+
+    def handle(self, *args, **opts):
+        end = opts["end"] or timezone.localdate()
+        start = opts["start"] or end - timedelta(days=365)
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        count = rebuild_daily_facts(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily facts for {count} days ({start} to {end})"))
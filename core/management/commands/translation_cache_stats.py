@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.translation import TRANSLATION_LRU_SIZE, TranslationCache
+
+
+class Command(BaseCommand):
+    help = "Shows translation cache hit/miss counters aggregated over all web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing them.")
+
+    def handle(self, *args, **opts):
+        stats = TranslationCache.shared_stats()
+        total = sum(stats.values())
+        self.stdout.write(f"In-process LRU size: {TRANSLATION_LRU_SIZE} entries per worker")
+        for name, value in stats.items():
+            share = f"{value / total:.1%}" if total else "-"
+            self.stdout.write(f"{name:>12}: {value:>10} ({share})")
+
+        if opts["reset"]:
+            TranslationCache.reset_shared_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
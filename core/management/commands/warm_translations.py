@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.tasks import warm_catalog_translations_task
+from core.translation import TRANSLATED_FIELDS, TranslationUnavailable, warm_translations
+
+
+class Command(BaseCommand):
+    help = "Pre-translates the whole catalog (courses, departments, course types, lessons, news) in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", choices=list(TRANSLATED_FIELDS), help="Only warm these models (repeatable).")
+        parser.add_argument("--language", action="append", help="Only warm these languages (repeatable). Defaults to TRANSLATION_LANGUAGES.")
+        parser.add_argument("--chunk-size", type=int, default=200, help="Objects per translator batch / RQ job.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Chunks translated at the same time.")
+        parser.add_argument("--enqueue", action="store_true", help="Queue one low-priority RQ job per chunk instead of running inline.")
+
+    def handle(self, *args, **opts):
+        chunks = []
+        for label in opts["model"] or TRANSLATED_FIELDS:
+            ids = list(apps.get_model(label).objects.order_by("pk").values_list("pk", flat=True))
+            size = opts["chunk_size"]
+            chunks += [(label, ids[i:i + size]) for i in range(0, len(ids), size)]
+
+        if opts["enqueue"]:
+            for label, ids in chunks:
+                warm_catalog_translations_task.delay(label, ids)
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(chunks)} warm-up jobs"))
+            return
+
+        stored = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, opts["concurrency"])) as pool:
+            futures = {
+                pool.submit(self._warm_chunk, label, ids, opts["language"]): (label, ids)
+                for label, ids in chunks
+            }
+            for future in as_completed(futures):
+                label, ids = futures[future]
+                try:
+                    count = future.result()
+                except TranslationUnavailable as e:
+                    failed += 1
+                    self.stderr.write(f"{label} {ids[0]}..{ids[-1]}: {e}")
+                    continue
+                stored += count
+                self.stdout.write(f"{label} {ids[0]}..{ids[-1]}: {count} stored")
+
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"Stored {stored} translations from {len(chunks)} chunks ({failed} failed)"))
+
+    @staticmethod
+    def _warm_chunk(label, ids, languages):
+        try:
+            return warm_translations(label, ids, languages)
+        finally:
+            # Each pool thread opened its own connection
+            connection.close()
@@ -6,6 +6,7 @@ from django.contrib.auth.models import AnonymousUser
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth import get_user_model
+from .authentication import get_cached_user
 
 User = get_user_model()
 
@@ -41,7 +42,7 @@ class JWTAuthMiddleware(BaseMiddleware):
     
     @database_sync_to_async
     def get_user(self, user_id):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return AnonymousUser()
\ No newline at end of file
+        user = get_cached_user(user_id)
+        if user is None or not user.is_active:
+            return AnonymousUser()
+        return user
\ No newline at end of file
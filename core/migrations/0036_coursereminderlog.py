@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_notificationarchive'),
+        ('courses', '0021_alter_coursediscount_course_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseReminderLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days_before', models.PositiveSmallIntegerField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_logs', to='courses.enrollment')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('enrollment', 'days_before'), name='unique_reminder_per_enrollment_day')],
+            },
+        ),
+    ]
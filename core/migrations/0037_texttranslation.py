@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_coursereminderlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextTranslation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_hash', models.CharField(max_length=64)),
+                ('language', models.CharField(max_length=10)),
+                ('source_text', models.TextField()),
+                ('translated_text', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source_hash', 'language'), name='unique_translation_per_language')],
+            },
+        ),
+    ]
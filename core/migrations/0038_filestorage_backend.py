@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_texttranslation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filestorage',
+            name='backend',
+            field=models.CharField(choices=[('telegram', 'Telegram'), ('local', 'Local disk'), ('s3', 'S3')], default='telegram', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='filestorage',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='filestorage',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='filestorage',
+            name='storage_key',
+            field=models.CharField(blank=True, max_length=512, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_filestorage_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filestorage',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='filestorage',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='filestorage',
+            name='ref_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='filestorage',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'ready'])), fields=('content_hash',), name='unique_live_file_content'),
+        ),
+    ]
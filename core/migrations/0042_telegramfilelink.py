@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:52
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def link_existing_files(apps, schema_editor):
+    # Links handed out before this table existed only lived in the cache for 24h;
+    # recreate them from the stored file ids so they work again
+    FileStorage = apps.get_model('core', 'FileStorage')
+    TelegramFileLink = apps.get_model('core', 'TelegramFileLink')
+    file_ids = FileStorage.objects.exclude(telegram_file_id__isnull=True).exclude(telegram_file_id='') \
+        .values_list('telegram_file_id', flat=True).distinct()
+    TelegramFileLink.objects.bulk_create(
+        [TelegramFileLink(short_id=hashlib.md5(file_id.encode()).hexdigest()[:12], file_id=file_id)
+         for file_id in file_ids.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramFileLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('short_id', models.CharField(max_length=16, unique=True)),
+                ('file_id', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(link_existing_files, migrations.RunPython.noop),
+    ]
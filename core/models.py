@@ -1,12 +1,18 @@
+import json
+import math
+import uuid
+import zlib
 from datetime import timedelta
 from decimal import Decimal
 from django.conf import settings
 from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.urls import reverse
 from django.utils import timezone
 from .validators import syrian_phone_validator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.files.images import get_image_dimensions
 from django.contrib.auth.hashers import make_password, is_password_usable
 from django.db.models.signals import pre_save, post_save
@@ -588,6 +594,7 @@ class Notification(models.Model):
         ('scheduleslot_news', 'New Schedule Slot News'),
         ('exam_attempt_submitted', 'Entrance Exam Submitted'),
         ('exam_graded', 'Entrance Exam Graded'),
+        ('file_upload_failed', 'File Upload Failed'),
     )
     
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
@@ -600,19 +607,172 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at']),
+            models.Index(fields=['recipient', 'is_read']),
+            models.Index(fields=['is_read', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} - {self.recipient.get_full_name()}"
 
+
+class NotificationArchive(models.Model):
+    """
+    Cold storage for read notifications past the retention window.
+    Each row holds one zlib-compressed JSON batch of a recipient's
+    notifications for a single calendar month.
+    """
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_archives')
+    month = models.DateField(help_text="First day of the month the archived notifications were created in")
+    notification_count = models.PositiveIntegerField(default=0)
+    payload = models.BinaryField(help_text="zlib-compressed JSON list of archived notifications")
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month', '-archived_at']
+        indexes = [
+            models.Index(fields=['recipient', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} archive ({self.notification_count}) - {self.recipient_id}"
+
+    @staticmethod
+    def compress(rows):
+        return zlib.compress(json.dumps(rows, cls=DjangoJSONEncoder).encode('utf-8'), 9)
+
+    def notifications(self):
+        """Decompress and return the archived notifications as a list of dicts."""
+        return json.loads(zlib.decompress(bytes(self.payload)).decode('utf-8'))
+
+class CourseReminderLog(models.Model):
+    """One row per course-start reminder already sent, so reruns skip it."""
+    enrollment = models.ForeignKey('courses.Enrollment', on_delete=models.CASCADE, related_name='reminder_logs')
+    days_before = models.PositiveSmallIntegerField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['enrollment', 'days_before'], name='unique_reminder_per_enrollment_day'),
+        ]
+
+    def __str__(self):
+        return f"Reminder for enrollment {self.enrollment_id} ({self.days_before} days before)"
+
+class TextTranslation(models.Model):
+    """
+    Stored translation of a source (Arabic) string, filled in the background
+    when catalog text is saved. Keyed by a hash of the source text so any
+    serializer showing that text can read it without calling the translator.
+    """
+    source_hash = models.CharField(max_length=64)
+    language = models.CharField(max_length=10)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_hash', 'language'], name='unique_translation_per_language'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_text[:40]} [{self.language}]"
+
 class FileStorage(models.Model):
+    BACKEND_CHOICES = (
+        ('telegram', 'Telegram'),
+        ('local', 'Local disk'),
+        ('s3', 'S3'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),   # spooled locally, upload job not finished yet
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+
     file = models.FileField(upload_to='filestorage/', blank=True, null=True)
+    # Where the bytes live (core.file_backends); for Telegram the key is the file_id
+    backend = models.CharField(max_length=20, choices=BACKEND_CHOICES, default='telegram')
+    storage_key = models.CharField(max_length=512, blank=True, null=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ready')
+    error_message = models.TextField(blank=True, null=True)
+    # sha256 of the content: identical uploads share one row (core.services.stage_file)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    # Rows (lessons, news, reports, ...) pointing at this file; kept by core.signals
+    ref_count = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField(default=timezone.now)
     telegram_file_id = models.CharField(max_length=255, blank=True, null=True)
     telegram_download_link = models.URLField(blank=True, null=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_hash'],
+                condition=models.Q(status__in=['pending', 'ready']),
+                name='unique_live_file_content',
+            ),
+        ]
+
+    def __str__(self):
+        return self.file_name or (self.file.name if self.file else self.telegram_file_id or 'Telegram File')
+
+    @property
+    def download_link(self):
+        """Telegram deep link, or the API's streaming download URL for other backends."""
+        if self.status != 'ready':
+            return None
+        if self.backend == 'telegram':
+            return self.telegram_download_link
+        return reverse('file-download', args=[self.pk])
+
+    def stream(self, chunk_size=None):
+        """Iterate over the stored bytes in chunks."""
+        from .file_backends import get_file_backend
+        return get_file_backend(self.backend).open(self.storage_key or self.telegram_file_id, chunk_size)
+
+
+class TelegramFileLink(models.Model):
+    """Short id used in the file bot's deep links (core.file_links); links never expire."""
+    short_id = models.CharField(max_length=16, unique=True)
+    file_id = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return self.file.name if self.file else self.telegram_file_id or 'Telegram File'
+        return self.short_id
+
+
+class UploadSession(models.Model):
+    """A resumable upload in progress (core.uploads); its chunks wait on local disk."""
+    STATUS_CHOICES = (
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Optional sha256 of the whole file declared by the client, checked on completion
+    content_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    file_storage = models.ForeignKey(
+        FileStorage, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def total_chunks(self):
+        return max(math.ceil(self.size / self.chunk_size), 1)
+
+    def chunk_length(self, number):
+        return min(self.chunk_size, self.size - number * self.chunk_size)
     
     
 class Captcha(models.Model):
@@ -1,3 +1,4 @@
+from django.db.models import Q
 from rest_framework import permissions
 from rest_framework.exceptions import PermissionDenied
 
@@ -115,4 +116,23 @@ class IsTeacherOrReceptionOrAdmin(permissions.BasePermission):
             request.user and 
             request.user.is_authenticated and 
             request.user.user_type in ['teacher', 'reception', 'admin']
-        )
\ No newline at end of file
+        )
+
+
+class CanDownloadFile(permissions.BasePermission):
+    """
+    A stored file is visible to admin/reception, its uploader, whoever
+    requested a report built on it, and the teacher and enrolled students of
+    a schedule slot whose lessons or news use it.
+    """
+    def has_object_permission(self, request, view, obj):
+        user = request.user
+        if user.is_staff or user.user_type in ['admin', 'reception']:
+            return True
+        if obj.uploaded_by_id == user.id:
+            return True
+        if obj.reports.filter(requested_by=user).exists():
+            return True
+
+        in_slot = Q(schedule_slot__teacher=user) | Q(schedule_slot__enrollments__student=user)
+        return obj.lesson_set.filter(in_slot).exists() or obj.scheduleslotnews_set.filter(in_slot).exists()
@@ -5,7 +5,8 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer, UserSerializer
 from .models import ( ProfileImage, SecurityQuestion, SecurityAnswer, Interest, 
     Profile, ProfileInterest, EWallet, DepositMethod,
-    BankTransferInfo, MoneyTransferInfo, DepositRequest, StudyField, University, Transaction, Notification, FileStorage, WithdrawalRequest
+    BankTransferInfo, MoneyTransferInfo, DepositRequest, StudyField, University, Transaction, Notification, FileStorage, WithdrawalRequest,
+    UploadSession
 )
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.exceptions import ValidationError as DRFValidationError
@@ -598,11 +599,52 @@ class TelegramFileSerializer(serializers.Serializer):
     download_link = serializers.URLField()
 
 class FileStorageSerializer(serializers.ModelSerializer):
+    download_link = serializers.SerializerMethodField()
+
     class Meta:
         model = FileStorage
-        fields = ['id', 'telegram_file_id', 'telegram_download_link', 'file', 'uploaded_at']
+        fields = [
+            'id', 'backend', 'status', 'file_name', 'size', 'download_link',
+            'telegram_file_id', 'telegram_download_link', 'file', 'uploaded_at',
+        ]
         read_only_fields = fields
 
+    def get_download_link(self, obj) -> str:
+        link = obj.download_link
+        request = self.context.get('request')
+        if link and request and link.startswith('/'):
+            return request.build_absolute_uri(link)
+        return link
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+    file_storage_details = FileStorageSerializer(source='file_storage', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'file_name', 'size', 'chunk_size', 'content_hash', 'status',
+            'total_chunks', 'received_chunks', 'file_storage_details', 'created_at',
+        ]
+        read_only_fields = ['id', 'status', 'created_at']
+        extra_kwargs = {
+            'size': {'min_value': 1},
+            'chunk_size': {'required': False, 'help_text': 'Bytes per chunk; defaults to the server setting.'},
+            'content_hash': {'required': False, 'help_text': 'sha256 of the whole file; known content completes at once.'},
+        }
+
+    def get_received_chunks(self, obj) -> list[int]:
+        from .uploads import received_chunks
+        return received_chunks(obj) if obj.status == 'open' else []
+
+    def validate_content_hash(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or set(value) - set('0123456789abcdef')):
+            raise serializers.ValidationError("Must be a hex sha256 digest.")
+        return value
+
+
 class WithdrawalRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model  = WithdrawalRequest
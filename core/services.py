@@ -1,191 +1,268 @@
 import asyncio
-import urllib.parse
 import hashlib
+import os
 import uuid
-import time
-from telegram import Bot
-from telegram.request import HTTPXRequest
+from datetime import timedelta
 from django.conf import settings
-from django.core.cache import cache
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 import logging
 
+from .file_backends import backend_for_size, file_size, get_file_backend, iter_chunks
+
 logger = logging.getLogger(__name__)
 
-def upload_to_telegram(file):
-    """Uploads a file to Telegram and returns file_id + download link."""
-    
-    # Get file size for dynamic timeout calculation
-    file_size = getattr(file, 'size', 0)
-    if hasattr(file, 'seek') and hasattr(file, 'tell'):
-        # For file-like objects, get size by seeking
-        current_pos = file.tell()
-        file.seek(0, 2)  # Seek to end
-        file_size = file.tell()
-        file.seek(current_pos)  # Seek back to original position
-    
-    # Calculate dynamic timeouts based on file size
-    # Base timeout of 60s + 30s per MB
-    base_timeout = 60
-    size_in_mb = file_size / (1024 * 1024)
-    dynamic_timeout = base_timeout + (size_in_mb * 30)
-    
-    # Cap the timeout at reasonable limits
-    read_timeout = min(max(dynamic_timeout, 60), 600)  # 1-10 minutes
-    write_timeout = min(max(dynamic_timeout, 60), 600)  # 1-10 minutes
-    
-    logger.info(f"File size: {file_size} bytes ({size_in_mb:.2f} MB)")
-    logger.info(f"Using timeouts: read={read_timeout}s, write={write_timeout}s")
-    
-    # Create request with dynamic timeouts
-    request = HTTPXRequest(
-        read_timeout=read_timeout,
-        write_timeout=write_timeout,
-        connect_timeout=30,
-        pool_timeout=30
+
+def _file_name(file, name=None):
+    return name or os.path.basename(getattr(file, 'name', None) or 'file')
+
+
+def _stored_fields(stored):
+    return {
+        'backend': stored.backend,
+        'storage_key': stored.key,
+        'size': stored.size,
+        'telegram_file_id': stored.key if stored.backend == 'telegram' else None,
+        'telegram_download_link': stored.download_link,
+    }
+
+
+def claim_existing_file(content_hash):
+    """
+    The pending or ready FileStorage holding this content, if any, marked as
+    just used so the cleanup job leaves it alone.
+    """
+    from .models import FileStorage
+
+    file_storage = FileStorage.objects.filter(content_hash=content_hash, status__in=['pending', 'ready']).first()
+    # The update finds nothing if purge_unreferenced_files deleted the row meanwhile
+    if file_storage and FileStorage.objects.filter(pk=file_storage.pk).update(last_used_at=timezone.now()):
+        return file_storage
+    return None
+
+
+def _create_or_claim(content_hash, **fields):
+    """Create a FileStorage for new content; returns (file_storage, created)."""
+    from .models import FileStorage
+
+    try:
+        with transaction.atomic():
+            return FileStorage.objects.create(content_hash=content_hash, **fields), True
+    except IntegrityError:
+        # The same content was stored concurrently
+        existing = claim_existing_file(content_hash)
+        if existing is None:
+            raise
+        return existing, False
+
+
+def store_file(file, uploaded_by=None, name=None):
+    """
+    Stream `file` to the configured storage backend (or the overflow backend
+    when it is over the backend's size cap) and record it as a FileStorage.
+    Content that is already stored is not uploaded again; its FileStorage is
+    returned instead. Blocks until the upload is done; request handlers use
+    stage_file.
+    """
+    name = _file_name(file, name)
+    digest = hashlib.sha256()
+    for chunk in iter_chunks(file, settings.FILE_STORAGE_CHUNK_SIZE):
+        digest.update(chunk)
+    existing = claim_existing_file(digest.hexdigest())
+    if existing:
+        return existing
+
+    backend = backend_for_size(file_size(file))
+    stored = backend.save(file, name)
+    file_storage, created = _create_or_claim(
+        digest.hexdigest(), file_name=name, uploaded_by=uploaded_by, **_stored_fields(stored),
     )
-    
-    bot = Bot(
-        token=settings.TELEGRAM_FILE_BOT_TOKEN,
-        request=request
+    if not created:
+        backend.delete(stored.key)
+    return file_storage
+
+
+def spool_path(file_storage_id):
+    return os.path.join(settings.FILE_STORAGE_SPOOL_DIR, str(file_storage_id))
+
+
+def stage_file(file, uploaded_by=None, name=None):
+    """
+    Copy `file` to the local spool, hashing it on the way, and return a
+    `pending` FileStorage right away. Once the surrounding transaction
+    commits, upload_staged_file_task pushes it to the backend and announces
+    the outcome. Content that is already stored (or on its way) returns that
+    FileStorage instead, without a second upload.
+    """
+    from .tasks import upload_staged_file_task
+
+    name = _file_name(file, name)
+    os.makedirs(settings.FILE_STORAGE_SPOOL_DIR, exist_ok=True)
+    incoming = os.path.join(settings.FILE_STORAGE_SPOOL_DIR, f"incoming-{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(incoming, 'wb') as out:
+            for chunk in iter_chunks(file, settings.FILE_STORAGE_CHUNK_SIZE):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        file_storage = claim_existing_file(digest.hexdigest())
+        if file_storage:
+            logger.info(f"Upload of {name} matches FileStorage {file_storage.pk}; reusing it")
+            return file_storage
+
+        file_storage, created = _create_or_claim(
+            digest.hexdigest(), status='pending', backend=backend_for_size(size).name,
+            file_name=name, size=size, uploaded_by=uploaded_by,
+        )
+        if created:
+            os.replace(incoming, spool_path(file_storage.pk))
+            transaction.on_commit(lambda: upload_staged_file_task.delay(file_storage.pk))
+        return file_storage
+    finally:
+        if os.path.exists(incoming):
+            os.remove(incoming)
+
+
+def upload_staged_file(file_storage_id, final_attempt=True):
+    """
+    Push a spooled file to its backend and mark it ready. A failed attempt
+    keeps the spooled copy and the `pending` status so the job can retry;
+    only the final one marks the file `failed` and tells its uploader.
+    """
+    from .models import FileStorage
+    from .signals import file_storage_status_changed
+
+    file_storage = FileStorage.objects.get(pk=file_storage_id)
+    if file_storage.status != 'pending':
+        return file_storage
+
+    path = spool_path(file_storage.pk)
+    try:
+        with open(path, 'rb') as spooled:
+            stored = get_file_backend(file_storage.backend).save(
+                File(spooled, name=file_storage.file_name), file_storage.file_name,
+            )
+    except Exception as e:
+        logger.error(f"Upload of FileStorage {file_storage.pk} failed: {e}")
+        file_storage.error_message = str(e)
+        if not final_attempt:
+            file_storage.save(update_fields=['error_message'])
+            raise
+        file_storage.status = 'failed'
+        file_storage.save(update_fields=['status', 'error_message'])
+        _discard_spooled_file(path)
+        file_storage_status_changed.send(sender=FileStorage, instance=file_storage)
+        _notify_upload_failed(file_storage)
+        raise
+
+    for field, value in _stored_fields(stored).items():
+        setattr(file_storage, field, value)
+    file_storage.status = 'ready'
+    file_storage.error_message = ''
+    file_storage.save()
+    _discard_spooled_file(path)
+    file_storage_status_changed.send(sender=FileStorage, instance=file_storage)
+    return file_storage
+
+
+def _discard_spooled_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _notify_upload_failed(file_storage):
+    """Ask the uploader to upload the file again; it can never become ready."""
+    from .tasks import send_notification_task
+
+    if not file_storage.uploaded_by_id:
+        return
+    send_notification_task.delay(
+        recipient_id=file_storage.uploaded_by_id,
+        notification_type='file_upload_failed',
+        title="File Upload Failed",
+        message=f'"{file_storage.file_name}" could not be stored. Please upload it again.',
+        data={'file_storage_id': file_storage.pk, 'file_name': file_storage.file_name},
     )
-    
-    async def send_with_retry(max_retries=3):
-        """Send file with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Upload attempt {attempt + 1}/{max_retries}")
-                start_time = time.time()
-                
-                # Reset file position if it's seekable
-                if hasattr(file, 'seek'):
-                    file.seek(0)
-                
-                msg = await bot.send_document(
-                    chat_id=settings.TELEGRAM_FILE_CHAT_ID,
-                    document=file,
-                    filename=getattr(file, 'name', 'file'),
-                    read_timeout=read_timeout,
-                    write_timeout=write_timeout
-                )
-                
-                upload_time = time.time() - start_time
-                logger.info(f"Upload successful in {upload_time:.2f} seconds")
-                return msg
-                
-            except Exception as e:
-                logger.error(f"Upload attempt {attempt + 1} failed: {e}")
-                
-                # If it's the last attempt, raise the exception
-                if attempt == max_retries - 1:
-                    raise e
-                    
-                # Wait before retrying (exponential backoff)
-                wait_time = 2 ** attempt
-                logger.info(f"Waiting {wait_time} seconds before retry...")
-                await asyncio.sleep(wait_time)
-        
-        return None
-    
+
+
+def file_references(file_storage_id):
+    """Number of rows (lessons, news items, reports, ...) pointing at the FileStorage."""
+    from .models import FileStorage
+
+    return sum(
+        relation.related_model._base_manager.filter(**{relation.field.name: file_storage_id}).count()
+        for relation in FileStorage._meta.related_objects
+        if relation.one_to_many
+    )
+
+
+def refresh_file_ref_counts(*file_storage_ids):
+    from .models import FileStorage
+
+    for file_storage_id in {pk for pk in file_storage_ids if pk}:
+        FileStorage.objects.filter(pk=file_storage_id).update(ref_count=file_references(file_storage_id))
+
+
+def _delete_stored_file(backend, key):
     try:
-        msg = asyncio.run(send_with_retry())
+        get_file_backend(backend).delete(key)
     except Exception as e:
-        logger.error(f"All upload attempts failed: {e}")
-        raise Exception(f"Telegram upload failed after retries: {str(e)}")
-    
-    if not msg or not getattr(msg, 'document', None):
-        raise Exception("Telegram upload failed or returned no document.")
-    
-    # Create a shorter identifier for the deep link
-    short_id = hashlib.md5(msg.document.file_id.encode()).hexdigest()[:12]
-    
-    # Store the mapping in cache for 24 hours
-    cache_key = f"telegram_file_{short_id}"
-    cache.set(cache_key, msg.document.file_id, timeout=86400)  # 24 hours
-    
-    logger.info(f"File uploaded successfully. File ID: {msg.document.file_id}")
-    
+        logger.warning(f"Could not delete {key} from {backend}: {e}")
+
+
+def purge_unreferenced_files(grace=timedelta(days=1), batch_size=500):
+    """
+    Delete FileStorage rows nothing points at and that were not uploaded or
+    reused within `grace`, together with their stored bytes. References are
+    recounted under a row lock first, so a drifted ref_count or a concurrent
+    reuse never removes a file in use.
+    """
+    from .models import FileStorage
+
+    cutoff = timezone.now() - grace
+    candidates = list(
+        FileStorage.objects.filter(ref_count=0, last_used_at__lt=cutoff)
+        .exclude(status='pending')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    purged = 0
+    for pk in candidates:
+        with transaction.atomic():
+            file_storage = FileStorage.objects.select_for_update().filter(pk=pk, last_used_at__lt=cutoff).first()
+            if file_storage is None:
+                continue
+            references = file_references(pk)
+            if references:
+                file_storage.ref_count = references
+                file_storage.save(update_fields=['ref_count'])
+                continue
+
+            if file_storage.storage_key:
+                transaction.on_commit(
+                    lambda backend=file_storage.backend, key=file_storage.storage_key: _delete_stored_file(backend, key)
+                )
+            if file_storage.file:
+                file_storage.file.delete(save=False)
+            file_storage.delete()
+            purged += 1
+    return purged
+
+
+def upload_to_telegram(file):
+    """Uploads a file to Telegram and returns file_id + download link."""
+    name = os.path.basename(getattr(file, 'name', None) or 'file')
+    stored = get_file_backend('telegram').save(file, name)
     return {
-        "file_id": msg.document.file_id,
-        "download_link": f"https://t.me/{settings.TELEGRAM_FILE_BOT_USERNAME}?start=download_{short_id}",
+        "file_id": stored.key,
+        "download_link": stored.download_link,
     }
 
 
 # Alternative async version if you want to call it from async context
 async def upload_to_telegram_async(file):
     """Async version of upload_to_telegram"""
-    
-    # Get file size for dynamic timeout calculation
-    file_size = getattr(file, 'size', 0)
-    if hasattr(file, 'seek') and hasattr(file, 'tell'):
-        current_pos = file.tell()
-        file.seek(0, 2)
-        file_size = file.tell()
-        file.seek(current_pos)
-    
-    # Calculate dynamic timeouts
-    base_timeout = 60
-    size_in_mb = file_size / (1024 * 1024)
-    dynamic_timeout = base_timeout + (size_in_mb * 30)
-    read_timeout = min(max(dynamic_timeout, 60), 600)
-    write_timeout = min(max(dynamic_timeout, 60), 600)
-    
-    logger.info(f"File size: {file_size} bytes ({size_in_mb:.2f} MB)")
-    logger.info(f"Using timeouts: read={read_timeout}s, write={write_timeout}s")
-    
-    request = HTTPXRequest(
-        read_timeout=read_timeout,
-        write_timeout=write_timeout,
-        connect_timeout=30,
-        pool_timeout=30
-    )
-    
-    bot = Bot(
-        token=settings.TELEGRAM_FILE_BOT_TOKEN,
-        request=request
-    )
-    
-    # Retry logic
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Upload attempt {attempt + 1}/{max_retries}")
-            start_time = time.time()
-            
-            if hasattr(file, 'seek'):
-                file.seek(0)
-            
-            msg = await bot.send_document(
-                chat_id=settings.TELEGRAM_FILE_CHAT_ID,
-                document=file,
-                filename=getattr(file, 'name', 'file'),
-                read_timeout=read_timeout,
-                write_timeout=write_timeout
-            )
-            
-            upload_time = time.time() - start_time
-            logger.info(f"Upload successful in {upload_time:.2f} seconds")
-            break
-            
-        except Exception as e:
-            logger.error(f"Upload attempt {attempt + 1} failed: {e}")
-            if attempt == max_retries - 1:
-                raise Exception(f"Telegram upload failed after {max_retries} attempts: {str(e)}")
-            
-            wait_time = 2 ** attempt
-            logger.info(f"Waiting {wait_time} seconds before retry...")
-            await asyncio.sleep(wait_time)
-    
-    if not msg or not getattr(msg, 'document', None):
-        raise Exception("Telegram upload failed or returned no document.")
-    
-    # Create short ID and cache
-    short_id = hashlib.md5(msg.document.file_id.encode()).hexdigest()[:12]
-    cache_key = f"telegram_file_{short_id}"
-    cache.set(cache_key, msg.document.file_id, timeout=86400)
-    
-    logger.info(f"File uploaded successfully. File ID: {msg.document.file_id}")
-    
-    return {
-        "file_id": msg.document.file_id,
-        "download_link": f"https://t.me/{settings.TELEGRAM_FILE_BOT_USERNAME}?start=download_{short_id}",
-    }
\ No newline at end of file
+    return await asyncio.to_thread(upload_to_telegram, file)
@@ -1,10 +1,15 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from .models import Notification, User, EWallet, Transaction, WithdrawalRequest
-from .tasks import notify_ewallet_transfer_task, notify_withdrawal_requested_task
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+from .models import FileStorage, Notification, User, EWallet, Transaction, WithdrawalRequest
+from .tasks import notify_ewallet_transfer_task, notify_withdrawal_requested_task, warm_catalog_translations_task
+from .translation import TRANSLATED_FIELDS
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .authentication import invalidate_user_claims
+from .services import refresh_file_ref_counts
 
 
 User = get_user_model() 
@@ -12,6 +17,9 @@ User = get_user_model()
 
 channel_layer = get_channel_layer()
 
+# Sent with `instance` when a staged FileStorage finishes uploading (ready or failed)
+file_storage_status_changed = Signal()
+
 @receiver(post_save, sender=User)
 def create_user_wallet(sender, instance, created, **kwargs):
     """Create a wallet for each new user (only if user is newly created)"""
@@ -19,6 +27,18 @@ def create_user_wallet(sender, instance, created, **kwargs):
         EWallet.objects.create(user=instance)
 
 
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user_claims(sender, instance, **kwargs):
+    """Covers profile edits, verification and password changes (set_password + save)."""
+    invalidate_user_claims(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def invalidate_claims_on_blacklist(sender, instance, created, **kwargs):
+    if created and instance.token.user_id:
+        invalidate_user_claims(instance.token.user_id)
+
+
 @receiver(post_save, sender=Transaction)
 def notify_on_transfer(sender, instance, created, **kwargs):
     """Send notification when a transfer transaction is created."""
@@ -45,10 +65,81 @@ def push_counter_sync(user_id):
 
 @receiver([post_save, post_delete], sender=Notification)
 def notification_changed(sender, instance, **kwargs):
+    # Deleting an already-read notification (e.g. the archive job) leaves
+    # the unread count untouched, so there is nothing to push.
+    if kwargs.get('signal') is post_delete and instance.is_read:
+        return
     push_counter_sync(instance.recipient_id)
     
     
 @receiver(post_save, sender=WithdrawalRequest)
 def withdrawal_created_alert(sender, instance, created, **kwargs):
     if created:                       # only on first save
-        notify_withdrawal_requested_task.delay(instance.id)
\ No newline at end of file
+        notify_withdrawal_requested_task.delay(instance.id)
+
+
+def queue_catalog_translation(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Translate catalog text in the background whenever it is written."""
+    if raw:
+        return
+    model_label = sender._meta.label
+    if update_fields is not None and not set(update_fields) & set(TRANSLATED_FIELDS[model_label]):
+        return
+    transaction.on_commit(lambda: warm_catalog_translations_task.delay(model_label, [instance.pk]))
+
+
+for _model_label in TRANSLATED_FIELDS:
+    post_save.connect(
+        queue_catalog_translation,
+        sender=_model_label,
+        dispatch_uid=f"queue_catalog_translation:{_model_label}",
+    )
+
+
+def track_file_references(relation):
+    """
+    Keep FileStorage.ref_count in step with the rows of `relation`'s model
+    (a foreign key to FileStorage) as they are attached, moved and deleted.
+    """
+    field = relation.field
+    previous = f"_previous_{field.attname}"
+
+    def remember(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or instance.pk is None:
+            return
+        if update_fields is not None and not {field.name, field.attname} & set(update_fields):
+            return
+        instance.__dict__[previous] = (
+            sender._base_manager.filter(pk=instance.pk).values_list(field.attname, flat=True).first()
+        )
+
+    def saved(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        current = getattr(instance, field.attname)
+        if created:
+            ids = {current}
+        elif previous in instance.__dict__:
+            old = instance.__dict__.pop(previous)
+            if old == current:
+                return
+            ids = {old, current}
+        else:
+            return
+        if any(ids):
+            transaction.on_commit(lambda: refresh_file_ref_counts(*ids))
+
+    def deleted(sender, instance, **kwargs):
+        file_storage_id = getattr(instance, field.attname)
+        if file_storage_id:
+            transaction.on_commit(lambda: refresh_file_ref_counts(file_storage_id))
+
+    uid = f"file_references:{relation.related_model._meta.label}.{field.name}"
+    pre_save.connect(remember, sender=relation.related_model, weak=False, dispatch_uid=uid)
+    post_save.connect(saved, sender=relation.related_model, weak=False, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=relation.related_model, weak=False, dispatch_uid=uid)
+
+
+for _relation in FileStorage._meta.related_objects:
+    if _relation.one_to_many:
+        track_file_references(_relation)
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from datetime import date, timedelta
 from decimal import Decimal
 from django_rq import job, get_queue
@@ -6,6 +7,8 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import Count
 from courses.models import Course, CourseDiscount, Enrollment, Wishlist
 import random
 from django.conf import settings
@@ -13,9 +16,10 @@ from telegram import Bot
 from django.core.cache import cache
 
 from entranceexam.models import ExamAttempt
-from .models import Captcha, Notification, DepositRequest, WithdrawalRequest
+from .models import Captcha, CourseReminderLog, Notification, NotificationArchive, DepositRequest, WithdrawalRequest
 import logging
 import asyncio
+import time
 User = get_user_model()
 
 # ------------------------- Core Notification Task -----------------------------
@@ -104,6 +108,79 @@ def send_notification_task(recipient_id, notification_type, title, message, data
     )
     return f"Notification sent to user {recipient_id}"
 
+NOTIFICATION_BATCH_SIZE = 500
+
+
+def create_bulk_notifications(notifications):
+    """
+    Bulk-inserts notifications and schedules their WebSocket pushes for
+    after the surrounding transaction commits (immediately if there is none).
+    `notifications` is a list of dicts with the same keys as the arguments
+    of send_notification_task.
+    """
+    created = Notification.objects.bulk_create([
+        Notification(
+            recipient_id=n['recipient_id'],
+            notification_type=n['notification_type'],
+            title=n['title'],
+            message=n['message'],
+            data=n.get('data') or {},
+        )
+        for n in notifications
+    ])
+    transaction.on_commit(lambda: _push_bulk_notifications(created))
+    return created
+
+
+def _push_bulk_notifications(created):
+    for notification in created:
+        async_to_sync(channel_layer.group_send)(
+            f"user_{notification.recipient_id}",
+            {
+                "type": "notification.message",
+                "notification": {
+                    "id": notification.id,
+                    "type": notification.notification_type,
+                    "title": notification.title,
+                    "message": notification.message,
+                    "data": notification.data,
+                    "created_at": notification.created_at.isoformat(),
+                }
+            }
+        )
+
+    # bulk_create skips post_save, so push the counters ourselves
+    recipient_ids = {n.recipient_id for n in created}
+    unread_counts = (
+        Notification.objects
+        .filter(recipient_id__in=recipient_ids, is_read=False)
+        .values('recipient_id')
+        .annotate(unread=Count('id'))
+    )
+    for row in unread_counts:
+        async_to_sync(channel_layer.group_send)(
+            f"user_{row['recipient_id']}",
+            {"type": "notification.counter", "unread_count": row['unread']}
+        )
+
+
+@job('default',
+    timeout=600,
+    retry=Retry(max=3, interval=[60, 120, 240]))
+def send_bulk_notifications_task(notifications):
+    """Batched counterpart of send_notification_task: one insert, one counter push per recipient."""
+    created = create_bulk_notifications(notifications)
+    return f"Bulk notifications sent: {len(created)}"
+
+
+def enqueue_bulk_notifications(notifications, batch_size=NOTIFICATION_BATCH_SIZE):
+    """Split `notifications` into batches and enqueue one bulk job per batch."""
+    jobs = 0
+    for i in range(0, len(notifications), batch_size):
+        send_bulk_notifications_task.delay(notifications[i:i + batch_size])
+        jobs += 1
+    return jobs
+
 # ------------------------- Deposit-Related Tasks ------------------------------
 
 @job('default', retry=Retry(max=2))
@@ -264,46 +341,153 @@ def notify_course_payment_task(enrollment_id, amount):
 
 # ------------------------- Scheduled Tasks ------------------------------------
 
+REMINDER_DAYS = (0, 1, 2, 3)
+REMINDER_TITLES = ["Course Starting Today", "Course Starting Tomorrow", "Course Starting in 2 Days", "Course Starting in 3 Days"]
+REMINDER_WHEN = ["today", "tomorrow", "in 2 days", "in 3 days"]
+
+
+def _claim_reminders(batch):
+    """
+    Record the reminders of `batch` in CourseReminderLog and return the rows
+    this run claimed. The batch is claimed in one insert; if another run got
+    to some of its rows first, each row is claimed on its own and the ones
+    already taken are left out.
+    """
+    try:
+        with transaction.atomic():
+            CourseReminderLog.objects.bulk_create([
+                CourseReminderLog(enrollment_id=enrollment_id, days_before=days_until)
+                for enrollment_id, _, _, _, days_until in batch
+            ])
+        return batch
+    except IntegrityError:
+        pass
+
+    claimed = []
+    for row in batch:
+        enrollment_id, _, _, _, days_until = row
+        try:
+            with transaction.atomic():
+                CourseReminderLog.objects.create(enrollment_id=enrollment_id, days_before=days_until)
+        except IntegrityError:
+            continue
+        claimed.append(row)
+    logger.warning(f"{len(batch) - len(claimed)} of {len(batch)} reminders were already claimed by another run")
+    return claimed
+
+
 @job('default')
 def send_course_reminders_task():
     """
     Daily scheduled task for course reminders.
-    Sends notifications for courses starting today/tomorrow/in 3 days.
+    Sends notifications for courses starting today/tomorrow/in 2 or 3 days.
+    Each (enrollment, days_before) reminder is recorded in CourseReminderLog
+    in the same transaction as its notification, so reruns never double-notify.
     """
     today = timezone.now().date()
-    enrollments = Enrollment.objects.filter(
-        status__in=['pending', 'active'],
-        schedule_slot__isnull=False
-    ).select_related('student', 'course', 'schedule_slot')
+    due = list(
+        Enrollment.objects.filter(
+            status__in=['pending', 'active'],
+            student__isnull=False,
+            schedule_slot__valid_from__range=(today, today + timedelta(days=max(REMINDER_DAYS))),
+        )
+        .values_list('id', 'student_id', 'course_id', 'course__title', 'schedule_slot__valid_from')
+    )
+
+    already_sent = set(
+        CourseReminderLog.objects
+        .filter(enrollment_id__in=[row[0] for row in due], days_before__in=REMINDER_DAYS)
+        .values_list('enrollment_id', 'days_before')
+    )
+
+    pending = []
+    for enrollment_id, student_id, course_id, course_title, valid_from in due:
+        days_until = (valid_from - today).days
+        if (enrollment_id, days_until) not in already_sent:
+            pending.append((enrollment_id, student_id, course_id, course_title, days_until))
 
     sent = 0
-    for enrollment in enrollments:
-        days_until = (enrollment.schedule_slot.valid_from - today).days
-        if days_until in {0, 1, 2, 3}:
-            title = (
-                "Course Starting Today" if days_until == 0 else
-                "Course Starting Tomorrow" if days_until == 1 else
-                "Course Starting in 2 Days" if days_until == 2 else
-                "Course Starting in 3 Days"
-            )
-            
-            send_notification_task.delay(
-                recipient_id=enrollment.student.id,
-                notification_type='course_starting',
-                title=title,
-                message=f'Your course "{enrollment.course.title}" starts {["today","tomorrow","in 2 days","in 3 days"][days_until]}!',
-                data={
-                    'enrollment_id': enrollment.id,
-                    'course_id': enrollment.course.id,
-                    'course_title': enrollment.course.title,
-                    'days_until_start': days_until,
+    for i in range(0, len(pending), NOTIFICATION_BATCH_SIZE):
+        with transaction.atomic():
+            batch = _claim_reminders(pending[i:i + NOTIFICATION_BATCH_SIZE])
+            create_bulk_notifications([
+                {
+                    'recipient_id': student_id,
+                    'notification_type': 'course_starting',
+                    'title': REMINDER_TITLES[days_until],
+                    'message': f'Your course "{course_title}" starts {REMINDER_WHEN[days_until]}!',
+                    'data': {
+                        'enrollment_id': enrollment_id,
+                        'course_id': course_id,
+                        'course_title': course_title,
+                        'days_until_start': days_until,
+                    },
                 }
-            )
-            sent += 1
-            
+                for enrollment_id, student_id, course_id, course_title, days_until in batch
+            ])
+        sent += len(batch)
+
     return f"Sent {sent} course reminder notifications"
 
 
+@job('low', timeout=1800)
+def archive_read_notifications_task(days=None, batch_size=None):
+    """
+    Moves read notifications older than `days` out of the hot
+    core_notification table into compressed NotificationArchive rows.
+    Works in id-ordered batches so each transaction stays short.
+    """
+    days = days or settings.NOTIFICATION_RETENTION_DAYS
+    batch_size = batch_size or settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=days)
+    fields = ('id', 'recipient_id', 'notification_type', 'title', 'message', 'data', 'created_at')
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Notification.objects
+                .filter(is_read=True, created_at__lt=cutoff)
+                .order_by('id')
+                .values(*fields)[:batch_size]
+            )
+            if not rows:
+                break
+
+            buckets = defaultdict(list)
+            for row in rows:
+                month = row['created_at'].date().replace(day=1)
+                buckets[(row['recipient_id'], month)].append(row)
+
+            NotificationArchive.objects.bulk_create([
+                NotificationArchive(
+                    recipient_id=recipient_id,
+                    month=month,
+                    notification_count=len(items),
+                    payload=NotificationArchive.compress(items),
+                )
+                for (recipient_id, month), items in buckets.items()
+            ])
+            Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+
+    logger.info(f"Archived {archived} read notifications older than {days} days")
+    return f"Archived {archived} notifications"
+
+
+@job('low', retry=Retry(max=3, interval=[60, 300, 900]))
+def warm_catalog_translations_task(model_label, object_ids):
+    """
+    Pre-translates the catalog fields of the given objects into every
+    language in TRANSLATION_LANGUAGES, storing and caching the results so
+    the first reader doesn't pay for cold translations.
+    """
+    from .translation import warm_translations
+
+    stored = warm_translations(model_label, object_ids)
+    return f"Stored {stored} translations for {len(object_ids)} {model_label} objects"
+
+
 @job
 def update_enrollment_statuses_bulk():
     """Update enrollment statuses using bulk operations"""
@@ -315,25 +499,34 @@ def update_enrollment_statuses_bulk():
     
     updated_count = 0
     
+    from dashboard.rollups import schedule_bulk_fact_refresh
+
     with transaction.atomic():
         # Update to pending (courses that haven't started yet)
-        pending_count = Enrollment.objects.filter(
+        to_pending = Enrollment.objects.filter(
             schedule_slot__valid_from__gt=today,
             status__in=['active', 'completed']
-        ).exclude(status='cancelled').update(status='pending')
+        ).exclude(status='cancelled')
+        # update() sends no signals; the daily facts count enrollments by status
+        schedule_bulk_fact_refresh('enrollments', to_pending, 'enrollment_date')
+        pending_count = to_pending.update(status='pending')
         
         # Update to completed (courses that have ended - using > not >=)
-        completed_count = Enrollment.objects.filter(
+        to_completed = Enrollment.objects.filter(
             schedule_slot__valid_until__lt=today,
             status__in=['pending', 'active']
-        ).exclude(status='cancelled').update(status='completed')
+        ).exclude(status='cancelled')
+        schedule_bulk_fact_refresh('enrollments', to_completed, 'enrollment_date')
+        completed_count = to_completed.update(status='completed')
         
         # Update to active (courses that are currently running)
-        active_count = Enrollment.objects.filter(
+        to_active = Enrollment.objects.filter(
             schedule_slot__valid_from__lte=today,
             schedule_slot__valid_until__gte=today,
             status__in=['pending', 'completed']
-        ).exclude(status='cancelled').update(status='active')
+        ).exclude(status='cancelled')
+        schedule_bulk_fact_refresh('enrollments', to_active, 'enrollment_date')
+        active_count = to_active.update(status='active')
         
         updated_count = pending_count + completed_count + active_count
     
@@ -492,48 +685,107 @@ def notify_scheduleslot_news_task(news_id):
 
 # --- Scheduled Notification Tasks ---
 
+def _group_courses_by_user(rows):
+    """Collapse (user_id, course_id, ...) rows into {user_id: {course_id: row}}."""
+    by_user = defaultdict(dict)
+    for row in rows:
+        by_user[row[0]].setdefault(row[1], row)
+    return by_user
+
+
 @job('default')
 def notify_wishlist_slots_available():
     """Daily task to check for new, available schedule slots for courses on users' wishlists."""
-    # Find courses that are on at least one wishlist
-    wishlisted_courses = Course.objects.filter(wishlists__isnull=False).distinct()
-    
-    for course in wishlisted_courses:
-        # Find schedule slots for this course that just became valid (e.g., created today)
-        newly_available_slots = course.schedule_slots.filter(valid_from=timezone.now().date())
-        
-        if newly_available_slots.exists():
-            # Find all users who have this course on their wishlist
-            wishlists = Wishlist.objects.filter(courses=course).select_related('owner')
-            for wishlist in wishlists:
-                send_notification_task.delay(
-                    recipient_id=wishlist.owner.id,
-                    notification_type='wishlist_slot_available',
-                    title=f"'{course.title}' is Now Available!",
-                    message=f"A course from your wishlist, '{course.title}', has a new schedule available. Enroll now!",
-                    data={'course_id': course.id}
-                )
-    return "Wishlist notifications sent."
+    started = time.monotonic()
+    today = timezone.now().date()
+
+    # One join: wishlist entries whose course got a slot starting today
+    rows = (
+        Wishlist.courses.through.objects
+        .filter(course__schedule_slots__valid_from=today)
+        .values_list('wishlist__owner_id', 'course_id', 'course__title')
+        .distinct()
+    )
+    by_user = _group_courses_by_user(rows)
+
+    notifications = []
+    for user_id, courses in by_user.items():
+        course_rows = list(courses.values())
+        if len(course_rows) == 1:
+            _, course_id, title = course_rows[0]
+            notifications.append({
+                'recipient_id': user_id,
+                'notification_type': 'wishlist_slot_available',
+                'title': f"'{title}' is Now Available!",
+                'message': f"A course from your wishlist, '{title}', has a new schedule available. Enroll now!",
+                'data': {'course_id': course_id, 'course_ids': [course_id]},
+            })
+        else:
+            titles = ", ".join(f"'{r[2]}'" for r in course_rows)
+            notifications.append({
+                'recipient_id': user_id,
+                'notification_type': 'wishlist_slot_available',
+                'title': f"{len(course_rows)} Wishlist Courses Are Now Available!",
+                'message': f"Courses from your wishlist have new schedules available: {titles}. Enroll now!",
+                'data': {'course_id': course_rows[0][1], 'course_ids': [r[1] for r in course_rows]},
+            })
+
+    jobs = enqueue_bulk_notifications(notifications)
+    pairs = sum(len(courses) for courses in by_user.values())
+    elapsed = time.monotonic() - started
+    logger.info(f"Wishlist notifier: {pairs} (user, course) pairs, {len(notifications)} users, {jobs} jobs in {elapsed:.2f}s")
+    return f"Wishlist notifications queued: {pairs} pairs, {len(notifications)} users, {jobs} jobs, {elapsed:.2f}s"
 
 @job('default')
 def notify_course_discounts():
     """Daily task to alert users about new discounts on wishlisted courses."""
-    # Find discounts that start today
-    new_discounts = CourseDiscount.objects.filter(start_date__date=timezone.now().date(), status='active')
-    
-    for discount in new_discounts.select_related('course'):
-        course = discount.course
-        # Find all users who have this course on their wishlist
-        wishlists = Wishlist.objects.filter(courses=course).select_related('owner')
-        for wishlist in wishlists:
-            send_notification_task.delay(
-                recipient_id=wishlist.owner.id,
-                notification_type='course_discount_alert',
-                title=f"💸 Sale on '{course.title}'!",
-                message=f"A course from your wishlist is now on sale! Get {discount.discount_value:.0f}% off until {discount.end_date.strftime('%Y-%m-%d')}.",
-                data={'course_id': course.id, 'discount_id': str(discount.id)}
-            )
-    return "Discount notifications sent."
+    started = time.monotonic()
+    today = timezone.now().date()
+
+    # Both discount conditions sit in one filter() so they apply to the same discount row
+    rows = (
+        Wishlist.courses.through.objects
+        .filter(course__discounts__start_date__date=today, course__discounts__status='active')
+        .values_list(
+            'wishlist__owner_id', 'course_id', 'course__title',
+            'course__discounts__id', 'course__discounts__discount_value', 'course__discounts__end_date',
+        )
+        .distinct()
+    )
+    by_user = _group_courses_by_user(rows)
+
+    notifications = []
+    for user_id, courses in by_user.items():
+        course_rows = list(courses.values())
+        if len(course_rows) == 1:
+            _, course_id, title, discount_id, value, end_date = course_rows[0]
+            notifications.append({
+                'recipient_id': user_id,
+                'notification_type': 'course_discount_alert',
+                'title': f"💸 Sale on '{title}'!",
+                'message': f"A course from your wishlist is now on sale! Get {value:.0f}% off until {end_date.strftime('%Y-%m-%d')}.",
+                'data': {'course_id': course_id, 'discount_id': str(discount_id)},
+            })
+        else:
+            titles = ", ".join(f"'{r[2]}'" for r in course_rows)
+            notifications.append({
+                'recipient_id': user_id,
+                'notification_type': 'course_discount_alert',
+                'title': f"💸 {len(course_rows)} Wishlist Courses on Sale!",
+                'message': f"Courses from your wishlist are now on sale: {titles}.",
+                'data': {
+                    'course_id': course_rows[0][1],
+                    'discount_id': str(course_rows[0][3]),
+                    'course_ids': [r[1] for r in course_rows],
+                    'discount_ids': [str(r[3]) for r in course_rows],
+                },
+            })
+
+    jobs = enqueue_bulk_notifications(notifications)
+    pairs = sum(len(courses) for courses in by_user.values())
+    elapsed = time.monotonic() - started
+    logger.info(f"Discount notifier: {pairs} (user, course) pairs, {len(notifications)} users, {jobs} jobs in {elapsed:.2f}s")
+    return f"Discount notifications queued: {pairs} pairs, {len(notifications)} users, {jobs} jobs, {elapsed:.2f}s"
 
 @job('default', retry=Retry(max=2))
 def notify_withdrawal_scheduled_task(withdrawal_request_id):
@@ -584,4 +836,33 @@ def notify_withdrawal_requested_task(withdrawal_request_id):
                 'amount': str(wr.amount),
                 'pickup_datetime': wr.pickup_datetime.isoformat() if wr.pickup_datetime else None
             }
-        )
\ No newline at end of file
+        )
+
+@job('default', timeout=3600, retry=Retry(max=3, interval=[60, 300, 900]))
+def upload_staged_file_task(file_storage_id):
+    """
+    Pushes a file spooled by core.services.stage_file to its storage backend.
+    The spooled copy is kept between retries; after the last one the
+    FileStorage is marked `failed` and its uploader is notified.
+    """
+    from rq import get_current_job
+    from .services import upload_staged_file
+
+    current = get_current_job()
+    final_attempt = current is None or not current.retries_left
+    file_storage = upload_staged_file(file_storage_id, final_attempt=final_attempt)
+    return f"FileStorage {file_storage.pk}: {file_storage.status}"
+
+
+@job('low', timeout=1800)
+def purge_unreferenced_files_task():
+    """
+    Removes abandoned resumable uploads, then uploaded files no lesson, news
+    item, report or upload session uses any more.
+    """
+    from .services import purge_unreferenced_files
+    from .uploads import purge_stale_sessions
+
+    sessions = purge_stale_sessions()
+    purged = purge_unreferenced_files()
+    return f"Purged {sessions} stale upload sessions and {purged} unreferenced files"
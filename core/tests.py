@@ -1,3 +1,191 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from botocore.stub import ANY, Stubber
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .file_backends import LocalFileBackend, S3FileBackend, _backends
+from .file_links import SHORT_LINKS, register_short_link, resolve_short_link, short_id_for
+from reports.models import Report
+from .models import FileStorage, TelegramFileLink, User
+from .services import purge_unreferenced_files, spool_path, stage_file, store_file, upload_staged_file
+
+
+class FileBackendTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.addCleanup(_backends.clear)
+        _backends.clear()
+
+    def test_local_round_trip(self):
+        backend = LocalFileBackend(self.root.name, chunk_size=4)
+        stored = backend.save(io.BytesIO(b'0123456789'), '../notes.pdf')
+        self.assertEqual(stored.size, 10)
+        self.assertTrue(stored.key.endswith('/notes.pdf'))
+        self.assertEqual(list(backend.open(stored.key)), [b'0123', b'4567', b'89'])
+        backend.delete(stored.key)
+        with self.assertRaises(FileNotFoundError):
+            list(backend.open(stored.key))
+
+    def test_s3_multipart_upload(self):
+        backend = S3FileBackend('files', endpoint_url='http://minio:9000', access_key_id='k',
+                                secret_access_key='s', region='us-east-1')
+        part = backend.part_size
+        data = b'a' * part + b'b' * part + b'c'
+        with Stubber(backend.client) as stub:
+            stub.add_response('create_multipart_upload', {'UploadId': 'u1'},
+                              {'Bucket': 'files', 'Key': ANY})
+            for number in (1, 2, 3):
+                stub.add_response('upload_part', {'ETag': f'"e{number}"'},
+                                  {'Bucket': 'files', 'Key': ANY, 'UploadId': 'u1',
+                                   'PartNumber': number, 'Body': ANY})
+            stub.add_response('complete_multipart_upload', {}, {
+                'Bucket': 'files', 'Key': ANY, 'UploadId': 'u1',
+                'MultipartUpload': {'Parts': [{'ETag': f'"e{n}"', 'PartNumber': n} for n in (1, 2, 3)]},
+            })
+            stored = backend.save(io.BytesIO(data), 'video.mp4')
+            stub.assert_no_pending_responses()
+        self.assertEqual(stored.size, len(data))
+
+    def test_store_file_and_download(self):
+        user = User.objects.create_user('0991234567', 'Test', 'M', 'User', password='pass')
+        with override_settings(FILE_STORAGE_BACKEND='local', FILE_STORAGE_LOCAL_ROOT=self.root.name,
+                               FILE_STORAGE_CHUNK_SIZE=4):
+            file_storage = store_file(SimpleUploadedFile('plan.txt', b'lesson plan'), uploaded_by=user)
+            self.assertEqual((file_storage.backend, file_storage.size), ('local', 11))
+
+            client = APIClient()
+            client.force_authenticate(user)
+            response = client.get(file_storage.download_link)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'lesson plan')
+
+            # Nothing ties another student to the file
+            client.force_authenticate(User.objects.create_user('0991234572', 'Other', 'M', 'User', password='pass'))
+            self.assertEqual(client.get(file_storage.download_link).status_code, 403)
+
+    def test_staged_upload(self):
+        with override_settings(FILE_STORAGE_BACKEND='local', FILE_STORAGE_LOCAL_ROOT=self.root.name,
+                               FILE_STORAGE_SPOOL_DIR=os.path.join(self.root.name, 'spool')), \
+                mock.patch('core.tasks.upload_staged_file_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                file_storage = stage_file(SimpleUploadedFile('deck.pdf', b'slides'))
+            self.assertEqual(file_storage.status, 'pending')
+            self.assertIsNone(file_storage.download_link)
+            delay.assert_called_once_with(file_storage.pk)
+
+            file_storage = upload_staged_file(file_storage.pk)
+            self.assertEqual(file_storage.status, 'ready')
+            self.assertEqual(b''.join(file_storage.stream()), b'slides')
+            self.assertFalse(os.path.exists(spool_path(file_storage.pk)))
+
+    def test_failed_upload_is_retried_then_reported(self):
+        user = User.objects.create_user('0991234571', 'Test', 'M', 'User', password='pass')
+        with override_settings(FILE_STORAGE_BACKEND='local', FILE_STORAGE_LOCAL_ROOT=self.root.name,
+                               FILE_STORAGE_SPOOL_DIR=os.path.join(self.root.name, 'spool')), \
+                mock.patch('core.tasks.upload_staged_file_task.delay'), \
+                mock.patch('core.tasks.send_notification_task.delay') as notify, \
+                mock.patch.object(LocalFileBackend, 'save', side_effect=OSError('disk full')):
+            file_storage = stage_file(SimpleUploadedFile('deck.pdf', b'slides'), uploaded_by=user)
+
+            with self.assertRaises(OSError):
+                upload_staged_file(file_storage.pk, final_attempt=False)
+            file_storage.refresh_from_db()
+            self.assertEqual((file_storage.status, file_storage.error_message), ('pending', 'disk full'))
+            self.assertTrue(os.path.exists(spool_path(file_storage.pk)))
+            notify.assert_not_called()
+
+            with self.assertRaises(OSError):
+                upload_staged_file(file_storage.pk)
+            file_storage.refresh_from_db()
+            self.assertEqual(file_storage.status, 'failed')
+            self.assertFalse(os.path.exists(spool_path(file_storage.pk)))
+            self.assertEqual(notify.call_args.kwargs['recipient_id'], user.pk)
+
+    def test_duplicate_uploads_share_one_file(self):
+        user = User.objects.create_user('0991234568', 'Test', 'M', 'User', password='pass')
+        with override_settings(FILE_STORAGE_BACKEND='local', FILE_STORAGE_LOCAL_ROOT=self.root.name,
+                               FILE_STORAGE_SPOOL_DIR=os.path.join(self.root.name, 'spool')), \
+                mock.patch('core.tasks.upload_staged_file_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                first = stage_file(SimpleUploadedFile('a.pdf', b'same slides'))
+                second = stage_file(SimpleUploadedFile('b.pdf', b'same slides'))
+            self.assertEqual(first.pk, second.pk)
+            delay.assert_called_once_with(first.pk)
+            upload_staged_file(first.pk)
+            self.assertEqual(store_file(SimpleUploadedFile('c.pdf', b'same slides')).pk, first.pk)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(2):
+                    Report.objects.create(report_type='feedback_summary', requested_by=user, file_storage=first)
+            first.refresh_from_db()
+            self.assertEqual(first.ref_count, 2)
+
+            FileStorage.objects.filter(pk=first.pk).update(last_used_at=timezone.now() - timedelta(days=2))
+            self.assertEqual(purge_unreferenced_files(), 0)
+            with self.captureOnCommitCallbacks(execute=True):
+                Report.objects.all().delete()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(purge_unreferenced_files(), 1)
+            self.assertFalse(FileStorage.objects.filter(pk=first.pk).exists())
+            self.assertFalse(os.path.exists(os.path.join(self.root.name, first.storage_key)))
+
+    def test_resumable_upload(self):
+        user = User.objects.create_user('0991234569', 'Test', 'M', 'User', password='pass')
+        client = APIClient()
+        client.force_authenticate(user)
+        data = b'x' * 2500 + b'y' * 10
+        with override_settings(FILE_STORAGE_BACKEND='local', FILE_STORAGE_LOCAL_ROOT=self.root.name,
+                               FILE_STORAGE_SPOOL_DIR=os.path.join(self.root.name, 'spool')), \
+                mock.patch('core.tasks.upload_staged_file_task.delay'):
+            session = client.post('/api/core/uploads/', {'file_name': 'talk.mp4', 'size': len(data), 'chunk_size': 1000},
+                                  format='json').data
+            self.assertEqual(session['total_chunks'], 3)
+
+            def put(number, body, checksum=None):
+                return client.put(f"/api/core/uploads/{session['id']}/chunks/{number}/", body,
+                                  content_type='application/octet-stream',
+                                  HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(body).hexdigest())
+
+            self.assertEqual(put(0, data[:1000], checksum='0' * 64).status_code, 400)
+            for number in (2, 0):
+                put(number, data[number * 1000:(number + 1) * 1000])
+            response = client.post(f"/api/core/uploads/{session['id']}/complete/")
+            self.assertEqual(response.status_code, 400)
+
+            self.assertEqual(put(1, data[1000:2000]).data['received_chunks'], [0, 1, 2])
+            response = client.post(f"/api/core/uploads/{session['id']}/complete/")
+            self.assertEqual(response.data['status'], 'complete')
+
+            file_storage = upload_staged_file(response.data['file_storage_details']['id'])
+            self.assertEqual(b''.join(file_storage.stream()), data)
+
+
+class FileLinkTests(TestCase):
+    def test_short_link_survives_cache_flush(self):
+        short_id = register_short_link('BQACAgQAAxkDAAIB')
+        self.assertEqual(register_short_link('BQACAgQAAxkDAAIB'), short_id)
+
+        cache.clear()
+        SHORT_LINKS.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_short_link(short_id), 'BQACAgQAAxkDAAIB')
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_short_link(short_id), 'BQACAgQAAxkDAAIB')
+            self.assertIsNone(resolve_short_link('not-a-link'))
+
+    def test_colliding_short_id_gets_its_own_link(self):
+        TelegramFileLink.objects.create(short_id=short_id_for('BQACAgQAAxkDAAIC'), file_id='another-file')
+        short_id = register_short_link('BQACAgQAAxkDAAIC')
+        self.assertNotEqual(short_id, short_id_for('BQACAgQAAxkDAAIC'))
+        self.assertEqual(register_short_link('BQACAgQAAxkDAAIC'), short_id)
+        self.assertEqual(resolve_short_link(short_id), 'BQACAgQAAxkDAAIC')
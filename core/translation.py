@@ -1,93 +1,408 @@
-import os, re, hashlib, requests, yaml
+import atexit, os, re, hashlib, logging, threading, time, yaml
+from collections import OrderedDict
 from pathlib import Path
 from django.core.cache import cache
 
+from .translation_client import LibreTranslateClient, TranslationUnavailable
+
+logger = logging.getLogger(__name__)
+
 # ------------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------------
 LT_HOST = os.getenv("LT_HOST", "http://libretranslate:5000")  # Back to local instance
 LT_API_KEY = os.getenv("LT_API_KEY", None)  # Optional API key
+LT_TIMEOUT = float(os.getenv("LT_TIMEOUT", 3))  # seconds; deadline for translations on the read path
+LT_MAX_CONNECTIONS = int(os.getenv("LT_MAX_CONNECTIONS", 20))
+LT_BREAKER_THRESHOLD = int(os.getenv("LT_BREAKER_THRESHOLD", 5))  # consecutive failures before failing fast
+LT_BREAKER_RESET = int(os.getenv("LT_BREAKER_RESET", 30))  # seconds before retrying an open circuit
 GLOSSARY_PATH = Path(__file__).parent / "fixtures" / "glossary.yml"
+GLOSSARY_RELOAD_INTERVAL = 5  # seconds between checks of the YAML mtime
+TRANSLATION_LRU_SIZE = int(os.getenv("TRANSLATION_LRU_SIZE", 10000))  # entries per process
+TRANSLATION_CACHE_TTL = 60 * 60 * 24 * 7  # 7 days
+TRANSLATION_NEGATIVE_TTL = int(os.getenv("TRANSLATION_NEGATIVE_TTL", 60 * 10))  # "no translation" results
+
+
+# ------------------------------------------------------------------
+# Glossary
+# ------------------------------------------------------------------
+def _build_trie(keys):
+    root = {}
+    for key in keys:
+        node = root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return root
+
+
+def _trie_pattern(node):
+    """
+    Regex for all keys in `node` with shared prefixes factored out, so the
+    engine walks the glossary like a trie instead of trying every term at
+    every position. Optional groups are greedy: longer terms win.
+    """
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    if len(branches) == 1 and "" not in node:
+        return branches[0]
+    group = "(?:" + "|".join(branches) + ")"
+    return group + "?" if "" in node else group
+
+
+class Glossary:
+    """
+    Glossary terms plus a single pre-compiled whole-word matcher.
+    Rebuilt only when glossary.yml changes on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.terms = {}
+        self.pattern = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        try:
+            mtime = self.path.stat().st_mtime
+            with self.path.open(encoding="utf-8") as f:
+                terms = {str(k).lower(): v for k, v in (yaml.safe_load(f) or {}).items()}
+        except (OSError, yaml.YAMLError) as e:
+            logger.error(f"Could not load glossary {self.path}: {e}")
+            return
+
+        pattern = None
+        if terms:
+            pattern = re.compile(r"\b" + _trie_pattern(_build_trie(terms)) + r"\b", flags=re.IGNORECASE)
+        # Swap both at once so readers never see a mismatched pair
+        self.terms, self.pattern = terms, pattern
+        self._mtime = mtime
+        logger.info(f"Loaded {len(terms)} glossary terms")
+
+    def refresh(self):
+        """Reload if the YAML changed; stats the file at most every few seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < GLOSSARY_RELOAD_INTERVAL:
+            return
+        with self._lock:
+            if now - self._checked_at < GLOSSARY_RELOAD_INTERVAL:
+                return
+            self._checked_at = now
+            try:
+                changed = self.path.stat().st_mtime != self._mtime
+            except OSError:
+                return
+            if changed:
+                self.reload()
+
+    def exact(self, text: str):
+        self.refresh()
+        return self.terms.get(text.strip().lower())
+
+    def apply(self, text: str) -> str:
+        """Case-insensitive whole-word glossary replacement."""
+        self.refresh()
+        terms, pattern = self.terms, self.pattern
+        if pattern is None:
+            return text
+        return pattern.sub(lambda m: terms.get(m.group(0).lower(), m.group(0)), text)
+
+
+GLOSSARY = Glossary(GLOSSARY_PATH)
+
+# Catalog fields translated on write and stored in core.TextTranslation
+TRANSLATED_FIELDS = {
+    "courses.Course": ("title", "description"),
+    "courses.Department": ("name", "description"),
+    "courses.CourseType": ("name",),
+    "lessons.Lesson": ("title", "notes"),
+    "lessons.ScheduleSlotNews": ("title", "content"),
+}
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def get_stored_translations(texts, target_lang: str) -> dict:
+    """Return {source: translation} for the texts already in the store."""
+    from .models import TextTranslation
+
+    hashes = {source_hash(t): t for t in texts if t}
+    if not hashes:
+        return {}
+    rows = TextTranslation.objects.filter(
+        language=target_lang, source_hash__in=list(hashes)
+    ).values_list("source_hash", "translated_text")
+    return {hashes[h]: translated for h, translated in rows}
+
+
+def store_translations(translations: dict, target_lang: str) -> None:
+    """Upsert {source: translation} pairs into the store."""
+    from .models import TextTranslation
+
+    TextTranslation.objects.bulk_create(
+        [
+            TextTranslation(
+                source_hash=source_hash(text),
+                language=target_lang,
+                source_text=text,
+                translated_text=translated,
+            )
+            for text, translated in translations.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["source_hash", "language"],
+        update_fields=["translated_text", "updated_at"],
+    )
+
+
+def apply_glossary(text: str) -> str:
+    return GLOSSARY.apply(text)
+
+
+LT_CLIENT = LibreTranslateClient(
+    LT_HOST,
+    api_key=LT_API_KEY,
+    timeout=LT_TIMEOUT,
+    max_connections=LT_MAX_CONNECTIONS,
+    breaker_threshold=LT_BREAKER_THRESHOLD,
+    breaker_reset=LT_BREAKER_RESET,
+)
+atexit.register(LT_CLIENT.close)
+
+
+def request_translations(texts, target_lang: str, deadline: float = None) -> list:
+    """
+    Translate a list of (glossary-substituted) texts through the pooled
+    LibreTranslate client. Raises TranslationUnavailable on any failure,
+    including an open circuit; callers decide how to fall back.
+    """
+    return LT_CLIENT.translate(list(texts), target_lang, deadline)
+
+
+async def arequest_translations(texts, target_lang: str, deadline: float = None) -> list:
+    """Async counterpart of `request_translations` for ASGI consumers."""
+    return await LT_CLIENT.atranslate(list(texts), target_lang, deadline)
+
+
+# ------------------------------------------------------------------
+# Two-tier cache: in-process LRU in front of Redis
+# ------------------------------------------------------------------
+class TranslationCache:
+    """
+    Bounded per-process LRU backed by the shared Django cache.
+    Lookups and writes are batched with get_many/set_many. Hit/miss
+    counters are kept in memory and flushed to the shared cache every
+    STATS_FLUSH_INTERVAL seconds (see `manage.py translation_cache_stats`).
+    """
+    STATS_KEY = "translation_cache:stats:{name}"
+    STATS = ("local_hits", "shared_hits", "misses")
+    STATS_FLUSH_INTERVAL = 60
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # (text, lang) -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(self.STATS, 0)
+        self._unflushed = dict.fromkeys(self.STATS, 0)
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def shared_key(text, lang):
+        return f"translate_{hashlib.md5(f'{text}#{lang}'.encode()).hexdigest()}"
+
+    def _count(self, name, n):
+        if n:
+            self.counters[name] += n
+            self._unflushed[name] += n
+
+    def _remember(self, text, lang, value, timeout):
+        self._entries[(text, lang)] = (value, time.monotonic() + timeout)
+        self._entries.move_to_end((text, lang))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_many(self, texts, lang):
+        """Return {text: translation} for the texts found in either tier."""
+        found, remote = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for text in texts:
+                entry = self._entries.get((text, lang))
+                if entry and entry[1] > now:
+                    self._entries.move_to_end((text, lang))
+                    found[text] = entry[0]
+                else:
+                    remote.append(text)
+            self._count("local_hits", len(found))
+
+        if remote:
+            keys = {self.shared_key(text, lang): text for text in remote}
+            shared = cache.get_many(list(keys))
+            with self._lock:
+                for key, value in shared.items():
+                    text = keys[key]
+                    found[text] = value
+                    # The shared entry may expire sooner; don't outlive it by much
+                    self._remember(text, lang, value, TRANSLATION_NEGATIVE_TTL)
+                self._count("shared_hits", len(shared))
+                self._count("misses", len(remote) - len(shared))
+
+        self._maybe_flush_stats()
+        return found
+
+    def set_many(self, translations, lang, timeout=TRANSLATION_CACHE_TTL):
+        if not translations:
+            return
+        with self._lock:
+            for text, value in translations.items():
+                self._remember(text, lang, value, min(timeout, TRANSLATION_CACHE_TTL))
+        cache.set_many(
+            {self.shared_key(text, lang): value for text, value in translations.items()},
+            timeout,
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _maybe_flush_stats(self):
+        if time.monotonic() - self._flushed_at < self.STATS_FLUSH_INTERVAL:
+            return
+        with self._lock:
+            pending, self._unflushed = self._unflushed, dict.fromkeys(self.STATS, 0)
+            self._flushed_at = time.monotonic()
+        for name, n in pending.items():
+            if not n:
+                continue
+            key = self.STATS_KEY.format(name=name)
+            try:
+                cache.incr(key, n)
+            except ValueError:
+                cache.set(key, n, None)
+
+    @classmethod
+    def shared_stats(cls):
+        """Counters summed over every process that has flushed them."""
+        keys = {cls.STATS_KEY.format(name=name): name for name in cls.STATS}
+        values = cache.get_many(list(keys))
+        return {name: values.get(key, 0) for key, name in keys.items()}
+
+    @classmethod
+    def reset_shared_stats(cls):
+        cache.delete_many([cls.STATS_KEY.format(name=name) for name in cls.STATS])
+
+
+TRANSLATION_CACHE = TranslationCache(TRANSLATION_LRU_SIZE)
 
-# Load glossary once at import time
-with GLOSSARY_PATH.open(encoding="utf-8") as f:
-    GLOSSARY = {k.lower(): v for k, v in (yaml.safe_load(f) or {}).items()}
 
 def translate_text(text: str, target_lang: str = "en") -> str:
     """
     Translate Arabic text to target language via LibreTranslate.
     Falls back to original text or glossary override.
-    Results cached 7 days.
     """
-    print(f"DEBUG: translate_text called with text='{text}', target_lang='{target_lang}'")
-    
     if not text:
-        print("DEBUG: Empty text, returning as-is")
-        return text
-    
-    # If target language is Arabic, return original text (since source is Arabic)
-    if target_lang.lower() == "ar":
-        print("DEBUG: Target is Arabic, returning original text")
         return text
+    return translate_many([text], target_lang)[text]
 
-    # 1. Exact glossary hit
-    key_exact = text.strip().lower()
-    if key_exact in GLOSSARY:
-        print(f"DEBUG: Found exact glossary match: {GLOSSARY[key_exact]}")
-        return GLOSSARY[key_exact]
 
-    # 2. Case-insensitive whole-word replacement
-    def repl(match):
-        return GLOSSARY.get(match.group(0).lower(), match.group(0))
+def translate_many(texts, target_lang: str = "en") -> dict:
+    """
+    Translate a batch of Arabic strings in one go.
+    Returns a {source: translation} mapping. Glossary, cached and stored
+    translations are served locally; everything else goes to LibreTranslate
+    in a single request. Results are cached for 7 days; results with no
+    real translation (errors, output equal to the input) only for
+    TRANSLATION_NEGATIVE_TTL, so they are retried later but not on every read.
+    """
+    unique = list(dict.fromkeys(t for t in texts if t))
+    result = {t: t for t in unique}
+    # If target language is Arabic, return original text (since source is Arabic)
+    if not unique or target_lang.lower() == "ar":
+        return result
 
-    pattern = re.compile(
-        r"\b(" + "|".join(map(re.escape, GLOSSARY.keys())) + r")\b",
-        flags=re.IGNORECASE,
-    )
-    text_with_glossary = pattern.sub(repl, text)
-    print(f"DEBUG: After glossary replacement: '{text_with_glossary}'")
-
-    # 3. LibreTranslate for anything left
-    cache_key = f"translate_{hashlib.md5(f'{text}#{target_lang}'.encode()).hexdigest()}"
-    if cached := cache.get(cache_key):
-        print(f"DEBUG: Found cached translation: '{cached}'")
-        # Check if cached result is actually translated (not same as original)
-        if cached != text:
-            return cached
+    pending = []
+    for text in unique:
+        if (exact := GLOSSARY.exact(text)) is not None:
+            result[text] = exact
         else:
-            print("DEBUG: Cached result is same as original, clearing cache and retrying")
-            cache.delete(cache_key)
+            pending.append(text)
+    if not pending:
+        return result
+
+    cached = TRANSLATION_CACHE.get_many(pending, target_lang)
+    result.update(cached)
+    pending = [t for t in pending if t not in cached]
+    if not pending:
+        return result
 
-    print(f"DEBUG: Making API call to {LT_HOST}/translate")
+    # Translated ahead of time on write
+    stored = get_stored_translations(pending, target_lang)
+    result.update(stored)
+    TRANSLATION_CACHE.set_many(stored, target_lang)
+    misses = [t for t in pending if t not in stored]
+    if not misses:
+        return result
 
+    prepared = [apply_glossary(text) for text in misses]
     try:
-        # Prepare request data
-        data = {
-            "q": text_with_glossary, 
-            "source": "ar",  # Source is Arabic
-            "target": target_lang
-        }
-        
-        # Add API key if available
-        if LT_API_KEY:
-            data["api_key"] = LT_API_KEY
-        
-        r = requests.post(
-            f"{LT_HOST}/translate",
-            data=data,
-            timeout=10,
-        )
-        print(f"DEBUG: API response status: {r.status_code}")
-        print(f"DEBUG: API response: {r.text}")
-        r.raise_for_status()
-        translated = r.json()["translatedText"]
-        print(f"DEBUG: Translated text: '{translated}'")
-    except requests.RequestException as e:
-        print(f"Translation error: {e}")  # For debugging
-        print(f"DEBUG: Falling back to original text")
-        # Fail gracefully: return original text
-        translated = text_with_glossary
-
-    cache.set(cache_key, translated, 60 * 60 * 24 * 7)
-    print(f"DEBUG: Final result: '{translated}'")
-    return translated
\ No newline at end of file
+        translated = request_translations(prepared, target_lang)
+    except TranslationUnavailable as e:
+        logger.warning(f"Translation error: {e}")
+        # Fail gracefully: glossary-substituted original text, retried after the negative TTL
+        not_found = dict(zip(misses, prepared))
+        result.update(not_found)
+        TRANSLATION_CACHE.set_many(not_found, target_lang, TRANSLATION_NEGATIVE_TTL)
+        return result
+
+    found, not_found = {}, {}
+    for text, source, value in zip(misses, prepared, translated):
+        result[text] = value
+        (not_found if value == source else found)[text] = value
+    TRANSLATION_CACHE.set_many(found, target_lang)
+    TRANSLATION_CACHE.set_many(not_found, target_lang, TRANSLATION_NEGATIVE_TTL)
+    return result
+
+
+# ------------------------------------------------------------------
+# Warm-up
+# ------------------------------------------------------------------
+def warm_translations(model_label: str, object_ids, languages=None, deadline: float = 30) -> int:
+    """
+    Translate the TRANSLATED_FIELDS of `object_ids` into `languages`
+    (default: settings.TRANSLATION_LANGUAGES) with one translator batch per
+    language. New translations are stored; stored ones are pushed into the
+    cache. Returns the number of translations stored. Raises
+    TranslationUnavailable so RQ can retry; rows stay pending meanwhile.
+    """
+    from django.apps import apps
+    from django.conf import settings
+
+    fields = TRANSLATED_FIELDS[model_label]
+    model = apps.get_model(model_label)
+    texts = set()
+    for values in model.objects.filter(pk__in=list(object_ids)).values_list(*fields):
+        texts.update(v for v in values if v)
+    # Exact glossary hits are resolved in memory and never need storing
+    texts = [t for t in texts if GLOSSARY.exact(t) is None]
+
+    stored = 0
+    for lang in languages or settings.TRANSLATION_LANGUAGES:
+        if not texts or lang.lower() == "ar":
+            continue
+        have = get_stored_translations(texts, lang)
+        missing = [t for t in texts if t not in have]
+        if missing:
+            prepared = [apply_glossary(t) for t in missing]
+            translated = request_translations(prepared, lang, deadline)
+            new = {t: value for t, source, value in zip(missing, prepared, translated) if value != source}
+            store_translations(new, lang)
+            have.update(new)
+            stored += len(new)
+        TRANSLATION_CACHE.set_many(have, lang)
+    return stored
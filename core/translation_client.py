@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationUnavailable(Exception):
+    """The translator could not answer in time (error, timeout or open circuit)."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. After that a single trial call is let through;
+    its outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Translator circuit opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+class LibreTranslateClient:
+    """
+    LibreTranslate client on a persistent httpx connection pool.
+
+    The AsyncClient lives on a private event loop in a daemon thread, so the
+    same pool serves sync callers (DRF views, RQ jobs) through `translate()`
+    and async callers (ASGI consumers) through `atranslate()`. Large batches
+    are split into chunks sent concurrently. Every call has a deadline, and
+    repeated failures open a circuit breaker so callers fail fast to the
+    original text instead of waiting on a dead host.
+    """
+
+    def __init__(self, host, api_key=None, timeout=3.0, max_connections=20,
+                 chunk_size=50, breaker_threshold=5, breaker_reset=30):
+        self.host = host.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.chunk_size = chunk_size
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._loop = None
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # -- event loop / pool ------------------------------------------------
+    def _ensure_loop(self):
+        # RQ forks a work horse per job; threads don't survive a fork
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="libretranslate-client", daemon=True).start()
+                self._client = httpx.AsyncClient(
+                    base_url=self.host,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                    timeout=self.timeout,
+                )
+                self._loop, self._pid = loop, os.getpid()
+        return self._loop
+
+    def close(self):
+        if self._loop is None or self._pid != os.getpid():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop)
+        try:
+            future.result(timeout=1)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    # -- requests -----------------------------------------------------------
+    async def _post(self, texts, target_lang, deadline):
+        data = {"q": texts, "source": "ar", "target": target_lang}
+        if self.api_key:
+            data["api_key"] = self.api_key
+        r = await self._client.post("/translate", json=data, timeout=deadline)
+        r.raise_for_status()
+        translated = r.json()["translatedText"]
+        if not isinstance(translated, list) or len(translated) != len(texts):
+            raise ValueError("unexpected batch response shape")
+        return translated
+
+    async def _translate(self, texts, target_lang, deadline):
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        results = await asyncio.wait_for(
+            asyncio.gather(*(self._post(chunk, target_lang, deadline) for chunk in chunks)),
+            timeout=deadline,
+        )
+        return [value for chunk in results for value in chunk]
+
+    def _submit(self, texts, target_lang, deadline):
+        if not self.breaker.allow():
+            raise TranslationUnavailable("translator circuit is open")
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._translate(list(texts), target_lang, deadline), loop)
+
+    def _failed(self, future, error):
+        future.cancel()
+        self.breaker.record_failure()
+        return TranslationUnavailable(str(error) or error.__class__.__name__)
+
+    def translate(self, texts, target_lang, deadline=None):
+        """Blocking: translate a list of texts, raising TranslationUnavailable on failure."""
+        if not texts:
+            return []
+        deadline = deadline or self.timeout
+        future = self._submit(texts, target_lang, deadline)
+        try:
+            result = future.result(timeout=deadline + 0.5)
+        except Exception as e:
+            raise self._failed(future, e) from e
+        self.breaker.record_success()
+        return result
+
+    async def atranslate(self, texts, target_lang, deadline=None):
+        """Awaitable counterpart of `translate` for async code on any event loop."""
+        if not texts:
+            return []
+        deadline = deadline or self.timeout
+        future = self._submit(texts, target_lang, deadline)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=deadline + 0.5)
+        except Exception as e:
+            raise self._failed(future, e) from e
+        self.breaker.record_success()
+        return result
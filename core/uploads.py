@@ -0,0 +1,188 @@
+"""
+Resumable chunked uploads.
+
+    1. init      create an UploadSession for a file of known size; the server
+                 answers with the chunk size and the number of chunks
+    2. chunk N   send chunk N's bytes with its sha256; it is streamed to
+                 FILE_STORAGE_SPOOL_DIR/uploads/<session>/N and kept only if
+                 the checksum matches, so a broken transfer costs one chunk
+    3. complete  the chunks are assembled, in order, into one staged
+                 FileStorage (core.services.stage_file)
+
+Chunks may arrive in any order and be resent; the session reports which
+ones it already holds. A client that declares the file's sha256 at init
+skips the transfer entirely when that content is already stored.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .services import claim_existing_file, stage_file
+
+# Sessions not completed within this time are deleted with their chunks
+UPLOAD_SESSION_TTL = timedelta(days=1)
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """The request does not fit the upload session; the message is safe to show."""
+
+
+def session_dir(session_id):
+    return os.path.join(settings.FILE_STORAGE_SPOOL_DIR, 'uploads', str(session_id))
+
+
+def chunk_path(session_id, number):
+    return os.path.join(session_dir(session_id), str(number))
+
+
+def received_chunks(session):
+    try:
+        names = os.listdir(session_dir(session.pk))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def open_session(user, file_name, size, chunk_size=None, content_hash=''):
+    """Start an upload; completed at once when `content_hash` is already stored."""
+    from .models import UploadSession
+
+    chunk_size = chunk_size or settings.FILE_STORAGE_CHUNK_SIZE
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise UploadError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE} bytes.")
+    session = UploadSession(user=user, file_name=file_name, size=size, chunk_size=chunk_size,
+                            content_hash=content_hash.lower())
+    if session.content_hash:
+        existing = claim_existing_file(session.content_hash)
+        if existing:
+            session.status = 'complete'
+            session.file_storage = existing
+    session.save()
+    return session
+
+
+def write_chunk(session, number, stream, checksum):
+    """Stream chunk `number` from `stream` to disk, keeping it only if its sha256 matches."""
+    if session.status != 'open':
+        raise UploadError("Upload session is not open.")
+    if not 0 <= number < session.total_chunks:
+        raise UploadError(f"Chunk number must be between 0 and {session.total_chunks - 1}.")
+    expected = session.chunk_length(number)
+
+    path = chunk_path(session.pk, number)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # One temp file per request: a retried PUT of the same chunk must not write into this one
+    partial = f"{path}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    length = 0
+    try:
+        with open(partial, 'wb') as out:
+            while True:
+                data = stream.read(READ_SIZE)
+                if not data:
+                    break
+                length += len(data)
+                if length > expected:
+                    raise UploadError(f"Chunk {number} must be {expected} bytes.")
+                digest.update(data)
+                out.write(data)
+        if length != expected:
+            raise UploadError(f"Chunk {number} must be {expected} bytes, got {length}.")
+        if digest.hexdigest() != (checksum or '').lower():
+            raise UploadError(f"Checksum mismatch for chunk {number}.")
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+class _AssembledChunks:
+    """Read-only file over a session's chunks in order, without joining them on disk first."""
+
+    def __init__(self, session):
+        self.name = session.file_name
+        self.size = session.size
+        self._paths = [chunk_path(session.pk, number) for number in range(session.total_chunks)]
+        self._current = None
+
+    def read(self, size=-1):
+        while self._paths or self._current:
+            if self._current is None:
+                self._current = open(self._paths.pop(0), 'rb')
+            data = self._current.read(size)
+            if data:
+                return data
+            self._current.close()
+            self._current = None
+        return b''
+
+    def close(self):
+        if self._current:
+            self._current.close()
+
+
+def complete_session(session):
+    """Assemble the chunks into a staged FileStorage and close the session."""
+    if session.status == 'complete':
+        return session
+    missing = sorted(set(range(session.total_chunks)) - set(received_chunks(session)))
+    if missing:
+        raise UploadError(f"Missing chunks: {missing}")
+
+    if session.content_hash:
+        # Checked before staging so a mismatch leaves nothing behind
+        digest = hashlib.sha256()
+        assembled = _AssembledChunks(session)
+        try:
+            for data in iter(lambda: assembled.read(READ_SIZE), b''):
+                digest.update(data)
+        finally:
+            assembled.close()
+        if digest.hexdigest() != session.content_hash:
+            raise UploadError("Assembled file does not match the declared sha256.")
+
+    assembled = _AssembledChunks(session)
+    try:
+        file_storage = stage_file(assembled, uploaded_by=session.user, name=session.file_name)
+    finally:
+        assembled.close()
+
+    session.file_storage = file_storage
+    session.status = 'complete'
+    session.save(update_fields=['file_storage', 'status'])
+    shutil.rmtree(session_dir(session.pk), ignore_errors=True)
+    return session
+
+
+def discard_session(session):
+    shutil.rmtree(session_dir(session.pk), ignore_errors=True)
+    session.delete()
+
+
+def completed_upload(upload_id, user):
+    """The FileStorage of the user's completed upload session `upload_id`."""
+    from .models import UploadSession
+
+    session = UploadSession.objects.select_related('file_storage').filter(pk=upload_id, user=user).first()
+    if session is None:
+        raise UploadError("Unknown upload.")
+    if session.status != 'complete' or session.file_storage is None:
+        raise UploadError("Upload is not complete.")
+    return session.file_storage
+
+
+def purge_stale_sessions():
+    """Delete sessions older than UPLOAD_SESSION_TTL and their chunks; returns how many."""
+    from .models import UploadSession
+
+    stale = list(UploadSession.objects.filter(created_at__lt=timezone.now() - UPLOAD_SESSION_TTL))
+    for session in stale:
+        discard_session(session)
+    return len(stale)
@@ -4,7 +4,7 @@ from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 from .views import (
     JobStatusView, PasswordResetViewSet, ProfileImageViewSet, SecurityQuestionViewSet, SecurityAnswerViewSet, InterestViewSet, TeacherViewSet,UserProfileView,
     ProfileViewSet, EWalletViewSet, DepositMethodViewSet, DepositRequestViewSet, CustomTokenObtainPairView, StudyFieldViewSet, UniversityViewSet,
-    TransactionViewSet, NotificationViewSet, WithdrawalRequestViewSet, get_captcha, start_verification, verify_captcha, verify_pin
+    TransactionViewSet, NotificationViewSet, WithdrawalRequestViewSet, FileStorageDownloadView, UploadSessionViewSet, get_captcha, start_verification, verify_captcha, verify_pin
 )
 
 router = DefaultRouter()
@@ -23,6 +23,7 @@ router.register(r'studyfields', StudyFieldViewSet)
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'teachers', TeacherViewSet, basename='teacher')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 
 urlpatterns = [
@@ -37,5 +38,6 @@ urlpatterns = [
     path('api/captcha/verify/', verify_captcha, name='verify-captcha'),
     # Router URLs
     path('', include(router.urls)),
-    path("jobs/<uuid:job_id>/", JobStatusView.as_view())
+    path("jobs/<uuid:job_id>/", JobStatusView.as_view()),
+    path('files/<int:pk>/download/', FileStorageDownloadView.as_view(), name='file-download'),
 ]
\ No newline at end of file
@@ -4,7 +4,9 @@ from captcha.image import ImageCaptcha
 from django.utils.crypto import get_random_string
 from PIL import ImageDraw
 
-from core.translation import translate_text
+from rest_framework import serializers
+
+from core.translation import translate_text, translate_many
 from .models import Captcha
 import base64
 import random
@@ -49,6 +51,50 @@ def validate_captcha(key: str, answer: str) -> bool:
     except Captcha.DoesNotExist:
         return False
     
+TRANSLATION_BATCH_KEY = '_translation_batch'
+
+
+class PendingTranslation:
+    """
+    Placeholder returned by `get_translated_field` while a response is being
+    rendered. The root serializer swaps every placeholder for its
+    translation once the whole payload has been built.
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _fill_translations(data, translations):
+    """Replace PendingTranslation placeholders in `data` in place."""
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = enumerate(data)
+    else:
+        return data
+    for key, value in list(items):
+        if isinstance(value, PendingTranslation):
+            data[key] = translations.get(value.text, value.text)
+        elif isinstance(value, (dict, list)):
+            _fill_translations(value, translations)
+    return data
+
+
+class TranslationListSerializer(serializers.ListSerializer):
+    """
+    List serializer used for `many=True` TranslationMixin serializers.
+    Translates the whole page with one batch instead of one call per field.
+    """
+
+    def to_representation(self, data):
+        ret = super().to_representation(data)
+        if self.root is self:
+            ret = self.child._resolve_translations(ret)
+        return ret
+
+
 class TranslationMixin:
     """
     A serializer mixin that provides a utility method for conditional translation.
@@ -57,8 +103,19 @@ class TranslationMixin:
     - Checking if the request method is GET.
     - Safely getting the 'lang' parameter.
     - Calling the translation function or returning the original text.
+
+    When the root serializer is a TranslationMixin (or its list serializer),
+    translations are collected during `to_representation` and resolved in a
+    single batch at the end, so a list page costs about one round-trip.
     """
-    
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Route many=True through the batching list serializer
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = TranslationListSerializer
+
     def _get_lang(self):
         """
         Safely get the language from the request context,
@@ -81,6 +138,23 @@ class TranslationMixin:
         # Do NOT translate for POST, PUT, PATCH, or if context is missing.
         return False
 
+    def _can_defer_translation(self):
+        root = self.root
+        return isinstance(root, (TranslationMixin, TranslationListSerializer))
+
+    def _resolve_translations(self, data):
+        batch = self.context.pop(TRANSLATION_BATCH_KEY, None)
+        if not batch:
+            return data
+        translations = translate_many(batch, self._get_lang())
+        return _fill_translations(data, translations)
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        if self.root is self:
+            ret = self._resolve_translations(ret)
+        return ret
+
     def get_translated_field(self, text_to_translate):
         """
         Main utility method. Translates the given text if the request
@@ -91,6 +165,9 @@ class TranslationMixin:
             return None
             
         if self._should_translate():
+            if self._can_defer_translation():
+                self.context.setdefault(TRANSLATION_BATCH_KEY, set()).add(text_to_translate)
+                return PendingTranslation(text_to_translate)
             return translate_text(text_to_translate, self._get_lang())
         
-        return text_to_translate
\ No newline at end of file
+        return text_to_translate
@@ -1,6 +1,6 @@
-from rest_framework import viewsets, permissions, filters, status
+from rest_framework import mixins, viewsets, permissions, filters, status
 from rest_framework.decorators import action,api_view,permission_classes,authentication_classes
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from core.authentication import CachedJWTAuthentication
 from rq.job import Job
 from rest_framework.response import Response
 from rest_framework import serializers
@@ -22,19 +22,24 @@ from django_ratelimit.decorators import ratelimit
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import (ProfileImage, SecurityQuestion, SecurityAnswer, Interest, 
     Profile, ProfileInterest, EWallet, DepositMethod,
-    BankTransferInfo, MoneyTransferInfo, DepositRequest, StudyField, University, Transaction, Notification, WithdrawalRequest
+    BankTransferInfo, MoneyTransferInfo, DepositRequest, StudyField, University, Transaction, Notification, WithdrawalRequest,
+    FileStorage, UploadSession
 )
+from .uploads import UploadError, complete_session, discard_session, open_session, write_chunk
 from .serializers import (
     InterestCreateSerializer, NewPasswordSerializer, PasswordResetRequestSerializer, PickupScheduleSerializer, ProfileImageSerializer, SecurityAnswerValidationSerializer, SecurityQuestionSerializer, SecurityAnswerSerializer, InterestSerializer, 
     ProfileSerializer, EWalletSerializer, DepositMethodSerializer, DepositRequestSerializer, AddInterestSerializer,RemoveInterestSerializer, StudyFieldSerializer, TeacherSerializer, UniversitySerializer, TransactionSerializer, NotificationSerializer,
-    PasswordResetOTPRequestSerializer, PasswordResetOTPValidateSerializer, WithdrawalRequestSerializer
+    PasswordResetOTPRequestSerializer, PasswordResetOTPValidateSerializer, WithdrawalRequestSerializer, UploadSessionSerializer
 )
 from django.conf import settings
 from rest_framework.permissions import AllowAny
-from .permissions import  IsStudent, IsAdminOrReception, IsOwnerOrAdminOrReception
+from .permissions import  IsStudent, IsAdminOrReception, IsOwnerOrAdminOrReception, CanDownloadFile
 from django_ratelimit.exceptions import Ratelimited
 from rest_framework.exceptions import NotFound
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+import mimetypes
 from django.views.decorators.clickjacking import xframe_options_exempt
 from django.contrib.auth import get_user_model
 import secrets
@@ -188,7 +193,7 @@ class TeacherViewSet(viewsets.ViewSet):
     description="Initiate phone verification by generating a Telegram deep link. Only the phone number associated with the JWT token can request verification.",
 )
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def start_verification(request):
     # Get phone from request
@@ -1203,4 +1208,91 @@ class WithdrawalRequestViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)},
                             status=status.HTTP_400_BAD_REQUEST)
         return Response({'status': 'done',
-                         'new_balance': str(wr.user.wallet.current_balance)})
\ No newline at end of file
+                         'new_balance': str(wr.user.wallet.current_balance)})
+
+
+class FileStorageDownloadView(APIView):
+    """
+    Stream a stored file from its backend in chunks, so large files never
+    sit in memory. Telegram files are handed to the file bot instead, since
+    bots can only fetch small documents back.
+    """
+    permission_classes = [IsAuthenticated, CanDownloadFile]
+
+    @extend_schema(responses={(200, 'application/octet-stream'): OpenApiTypes.BINARY})
+    def get(self, request, pk):
+        file_storage = get_object_or_404(FileStorage, pk=pk)
+        self.check_object_permissions(request, file_storage)
+        if file_storage.backend == 'telegram':
+            if not file_storage.telegram_download_link:
+                raise NotFound("File is not available.")
+            return HttpResponseRedirect(file_storage.telegram_download_link)
+
+        file_name = file_storage.file_name or 'file'
+        response = StreamingHttpResponse(
+            file_storage.stream(),
+            content_type=mimetypes.guess_type(file_name)[0] or 'application/octet-stream',
+        )
+        if file_storage.size is not None:
+            response['Content-Length'] = str(file_storage.size)
+        response['Content-Disposition'] = content_disposition_header(True, file_name)
+        return response
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads for large files (see core.uploads):
+
+    1. `POST /uploads/` with the file's name and size (and optionally its
+       sha256) opens a session and returns the chunk size and count.
+    2. `PUT /uploads/{id}/chunks/{n}/` with the raw bytes of chunk n and its
+       sha256 in the `X-Chunk-SHA256` header. Resend any chunk that failed;
+       `GET /uploads/{id}/` lists the chunks already received.
+    3. `POST /uploads/{id}/complete/` assembles the file. Pass the session id
+       as `upload_id` when creating a lesson or news item.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user).select_related('file_storage')
+
+    def perform_create(self, serializer):
+        try:
+            serializer.instance = open_session(self.request.user, **serializer.validated_data)
+        except UploadError as e:
+            raise serializers.ValidationError({"detail": str(e)})
+
+    def perform_destroy(self, instance):
+        discard_session(instance)
+
+    @extend_schema(
+        request={'application/octet-stream': OpenApiTypes.BINARY},
+        parameters=[
+            OpenApiParameter('X-Chunk-SHA256', OpenApiTypes.STR, OpenApiParameter.HEADER, required=True,
+                             description="Hex sha256 of this chunk's bytes."),
+        ],
+        responses={200: UploadSessionSerializer},
+    )
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<number>\d+)')
+    def chunk(self, request, pk=None, number=None):
+        """Store one chunk; the body is streamed to disk, never read into memory whole."""
+        session = self.get_object()
+        try:
+            write_chunk(session, int(number), request.stream, request.headers.get('X-Chunk-SHA256'))
+        except UploadError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
+
+    @extend_schema(request=None, responses={200: UploadSessionSerializer})
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Assemble the received chunks into a file; its upload continues in the background."""
+        session = self.get_object()
+        try:
+            with transaction.atomic():
+                session = complete_session(session)
+        except UploadError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
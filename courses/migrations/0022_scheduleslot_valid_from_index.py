@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_alter_coursediscount_course_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(fields=['valid_from'], name='courses_sch_valid_f_7db9b1_idx'),
+        ),
+    ]
@@ -446,6 +446,9 @@ class ScheduleSlot(models.Model):
                 name='valid_until_after_valid_from'
             )
         ]
+        indexes = [
+            models.Index(fields=['valid_from']),
+        ]
         
     def clean(self):
         """Model-level validation that works with Django admin"""
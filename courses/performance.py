@@ -0,0 +1,90 @@
+# courses/performance.py
+"""
+Set-based student performance scoring.
+
+Every enrollment of one or many schedule slots is scored in a single query:
+each component is a grouped subquery correlated on the enrollment, and the
+per-slot ranking is a window function, so the number of queries doesn't
+grow with the number of students or slots.
+"""
+from django.db.models import Avg, Count, F, FloatField, OuterRef, Subquery, Value, Window
+from django.db.models.functions import Cast, Coalesce, NullIf, RowNumber
+
+from lessons.models import Attendance, HomeworkGrade, Lesson
+from quiz.models import QuizAttempt
+from .models import Enrollment
+
+# Weights of the overall grade (attendance %, homework average, quiz average)
+ATTENDANCE_WEIGHT = 0.3
+HOMEWORK_WEIGHT = 0.4
+QUIZ_WEIGHT = 0.3
+
+
+def _grouped(queryset, group_by, aggregate):
+    """Correlated subquery returning one aggregate for the outer row."""
+    return Subquery(
+        queryset.order_by().values(group_by).annotate(value=Cast(aggregate, FloatField())).values('value'),
+        output_field=FloatField(),
+    )
+
+
+def _zero(expression):
+    return Coalesce(expression, Value(0.0), output_field=FloatField())
+
+
+def score_enrollments(enrollments):
+    """
+    Annotate an Enrollment queryset with `completed_lessons`, `present_count`,
+    `attendance_pct`, `homework_avg`, `quiz_avg`, `overall_grade` and `rank`
+    (1 = best within the enrollment's schedule slot; ties broken by id).
+    """
+    completed_lessons = _grouped(
+        Lesson.objects.filter(schedule_slot=OuterRef('schedule_slot'), status='completed'),
+        'schedule_slot', Count('id'),
+    )
+    present_count = _grouped(
+        Attendance.objects.filter(enrollment=OuterRef('pk'), attendance='present'),
+        'enrollment', Count('id'),
+    )
+    homework_avg = _grouped(
+        HomeworkGrade.objects.filter(enrollment=OuterRef('pk')),
+        'enrollment', Avg('grade'),
+    )
+    quiz_avg = _grouped(
+        QuizAttempt.objects.filter(
+            user=OuterRef('student'), quiz__schedule_slot=OuterRef('schedule_slot'), status='completed',
+        ),
+        'user', Avg('score'),
+    )
+
+    return enrollments.annotate(
+        completed_lessons=_zero(completed_lessons),
+        present_count=_zero(present_count),
+        homework_avg=_zero(homework_avg),
+        quiz_avg=_zero(quiz_avg),
+    ).annotate(
+        attendance_pct=_zero(F('present_count') * Value(100.0) / NullIf(F('completed_lessons'), Value(0.0))),
+    ).annotate(
+        overall_grade=(
+            F('attendance_pct') * Value(ATTENDANCE_WEIGHT)
+            + F('homework_avg') * Value(HOMEWORK_WEIGHT)
+            + F('quiz_avg') * Value(QUIZ_WEIGHT)
+        ),
+    ).annotate(
+        rank=Window(
+            RowNumber(),
+            partition_by=F('schedule_slot'),
+            order_by=[F('overall_grade').desc(), F('id').asc()],
+        ),
+    )
+
+
+def slot_scores(slot_ids, **filters):
+    """Scored enrollments of the given slots, best first within each slot."""
+    enrollments = Enrollment.objects.filter(schedule_slot_id__in=slot_ids, **filters)
+    return score_enrollments(enrollments).order_by('schedule_slot_id', 'rank')
+
+
+def top_performers(slot_ids, limit=3, **filters):
+    """The `limit` best enrollments of each of the given slots."""
+    return slot_scores(slot_ids, **filters).filter(rank__lte=limit)
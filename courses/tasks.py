@@ -6,11 +6,8 @@ from rq import get_current_job
 import logging
 from django.db import transaction
 from courses.models import Enrollment, ScheduleSlot
-from lessons.models import Attendance, HomeworkGrade
 from loyaltypoints.tasks import award_points_task
-from quiz.models import QuizAttempt   # add this
-from django.db.models import Avg
-from decimal import Decimal
+from courses.performance import top_performers
 
 
 logger = logging.getLogger(__name__)
@@ -89,6 +86,9 @@ def cancel_scheduled_job(job_id):
         
         
         
+# Loyalty points for the best students of a finished slot, by rank
+TOP_PERFORMER_POINTS = {1: 10, 2: 7, 3: 5}
+
 @job('default')
 def award_points_for_top_performers():
     """
@@ -98,49 +98,17 @@ def award_points_for_top_performers():
     yesterday = timezone.now().date() - timedelta(days=1)
     
     # Find all schedule slots that officially ended yesterday
-    completed_slots = ScheduleSlot.objects.filter(valid_until=yesterday).select_related('course')
-
-    for slot in completed_slots:
-        enrollments = Enrollment.objects.filter(
-            schedule_slot=slot, 
-            status='completed', 
-            is_guest=False # Only award points to registered students
-        ).select_related('student')
-        
-        student_scores = []
-        for enr in enrollments:
-            # --- Attendance Score ---
-            total_lessons = slot.lessons_in_lessons_app.filter(status='completed').count()
-            present_count = Attendance.objects.filter(enrollment=enr, attendance='present').count()
-            attendance_pct = Decimal(present_count / total_lessons * 100) if total_lessons > 0 else Decimal('0.0')
-            
-            # --- Homework Score ---
-            avg_hw_grade = HomeworkGrade.objects.filter(enrollment=enr).aggregate(avg=Avg('grade'))['avg']
-            # Ensure grade is a Decimal and handle None case
-            avg_hw_grade = Decimal(avg_hw_grade) if avg_hw_grade is not None else Decimal('0.0')
-
-            # --- Quiz Score ---
-            avg_quiz_score = QuizAttempt.objects.filter(
-                user=enr.student, 
-                quiz__schedule_slot=slot, 
-                status='completed'
-            ).aggregate(avg=Avg('score'))['avg']
-            # Ensure score is a Decimal and handle None case
-            avg_quiz_score = Decimal(avg_quiz_score) if avg_quiz_score is not None else Decimal('0.0')
-
-            # --- Weighted Overall Grade (using Decimals for precision) ---
-            overall_grade = (attendance_pct * Decimal('0.3')) + (avg_hw_grade * Decimal('0.4')) + (avg_quiz_score * Decimal('0.3'))
-            
-            student_scores.append({'student_id': enr.student.id, 'score': overall_grade})
-
-        # Sort by score to find the top performers
-        top_performers = sorted(student_scores, key=lambda x: x['score'], reverse=True)
+    completed_slots = {
+        slot.id: slot for slot in ScheduleSlot.objects.filter(valid_until=yesterday).select_related('course')
+    }
 
-        # Award points to the top 3
-        points_map = {0: 10, 1: 7, 2: 5} # Rank -> Points
-        for i, perf in enumerate(top_performers[:3]):
-            points = points_map[i]
-            reason = f"Top performer award for the course '{slot.course.title}'"
-            award_points_task.delay(perf['student_id'], points, reason)
+    # Score every slot at once; only registered students who completed the course
+    top = top_performers(
+        completed_slots, limit=len(TOP_PERFORMER_POINTS), status='completed', is_guest=False,
+    )
+    for enr in top:
+        points = TOP_PERFORMER_POINTS[enr.rank]
+        reason = f"Top performer award for the course '{completed_slots[enr.schedule_slot_id].course.title}'"
+        award_points_task.delay(enr.student_id, points, reason)
 
-    return f"Checked for top performers in {completed_slots.count()} completed slots."
\ No newline at end of file
+    return f"Checked for top performers in {len(completed_slots)} completed slots."
\ No newline at end of file
@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import DailyFacts
 
-# Register your models here.
+@admin.register(DailyFacts)
+class DailyFactsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'course_revenue_sum', 'booking_revenue_sum', 'enrollments_new', 'bookings_approved', 'students_new', 'updated_at')
+    date_hierarchy = 'date'
+
+    # Rebuilt from the source tables; edits would be overwritten
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from urllib.parse import parse_qsl
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .kpi_cache import DASHBOARD_GROUP, get_cached_kpis, kpis_recomputing
+from .metrics import dashboard_metrics, flat_kpis
+from .views import resolve_period
+
+
+class DashboardConsumer(AsyncWebsocketConsumer):
+    """
+    Live admin dashboard KPIs.
+
+    Connect with the same query parameters as the KPI list
+    (`?period=month`, or `?period=custom&start_date=...&end_date=...`).
+    The socket receives one `snapshot` with every KPI, then `delta` frames
+    holding only the KPIs whose value changed. Change events from committed
+    writes are coalesced, so at most one delta is sent per PUSH_INTERVAL.
+
+    Client -> server:
+        {"type": "set_period", "period": "year"}
+    """
+    PUSH_INTERVAL = 1.0   # seconds
+
+    async def connect(self):
+        self.user = self.scope.get("user")
+        if not self.user or not self.user.is_authenticated or not self.user.is_staff:
+            await self.close()
+            return
+
+        params = dict(parse_qsl(self.scope.get("query_string", b"").decode()))
+        try:
+            resolve_period(params)
+        except ValueError:
+            await self.close()
+            return
+
+        self.params = params
+        self.kpis = {}
+        self.dirty = False
+        self.last_push = 0.0
+        self.flush_task = None
+        await self.channel_layer.group_add(DASHBOARD_GROUP, self.channel_name)
+        await self.accept()
+        await self.send_snapshot()
+
+    async def disconnect(self, code):
+        if getattr(self, "flush_task", None):
+            self.flush_task.cancel()
+        if hasattr(self, "params"):
+            await self.channel_layer.group_discard(DASHBOARD_GROUP, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data)
+        except (TypeError, ValueError):
+            return
+
+        if data.get("type") == "set_period":
+            params = {key: data[key] for key in ("period", "start_date", "end_date") if data.get(key)}
+            try:
+                resolve_period(params)
+            except ValueError as e:
+                await self.send_json({"type": "error", "detail": str(e)})
+                return
+            self.params = params
+            await self.send_snapshot()
+        else:
+            await self.send_json({"type": "error", "detail": "Unknown message type"})
+
+    # ------------------------------------------------------------------
+    # Channel-layer event handlers
+    # ------------------------------------------------------------------
+    async def kpis_changed(self, event):
+        self.schedule_push()
+
+    # ------------------------------------------------------------------
+    # helpers
+    # ------------------------------------------------------------------
+    def schedule_push(self):
+        self.dirty = True
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        loop = asyncio.get_running_loop()
+        # Changes arriving while we wait or compute are folded into the next push
+        while self.dirty:
+            wait = self.last_push + self.PUSH_INTERVAL - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.dirty = False
+            await self.send_delta()
+            self.last_push = loop.time()
+
+    async def send_snapshot(self):
+        self.kpis, time_period = await self._fetch_kpis()
+        self.last_push = asyncio.get_running_loop().time()
+        await self.send_json({"type": "snapshot", "kpis": self.kpis, "time_period": time_period})
+
+    async def send_delta(self):
+        kpis, time_period = await self._fetch_kpis()
+        changes = {key: value for key, value in kpis.items() if self.kpis.get(key) != value}
+        self.kpis = kpis
+        if changes:
+            await self.send_json({"type": "delta", "changes": changes, "time_period": time_period})
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content))
+
+    async def _fetch_kpis(self):
+        kpis, time_period, stale = await self._get_kpis()
+        if stale:
+            # Another worker is recomputing; the next coalesced push carries its result
+            self.schedule_push()
+        return kpis, time_period
+
+    @database_sync_to_async
+    def _get_kpis(self):
+        # Re-resolved every time so `today`/`month` roll over at midnight
+        period, start_date, end_date = resolve_period(self.params)
+        metrics = get_cached_kpis(period, start_date, end_date, lambda: dashboard_metrics(start_date, end_date))
+        time_period = {"start": start_date.isoformat(), "end": end_date.isoformat(), "filter_used": period}
+        return flat_kpis(metrics), time_period, kpis_recomputing(period, start_date, end_date)
@@ -0,0 +1,103 @@
+# dashboard/kpi_cache.py
+"""
+Dashboard KPI cache.
+
+Entries are keyed by period and date range plus the current version of
+every domain the KPIs read. Writes bump their domain's version
+(dashboard.signals), so a changed domain simply moves readers to a new key;
+nothing is deleted and no TTL has to guess at freshness.
+
+When a key is cold, one worker takes a short lock and recomputes. The
+others meanwhile serve the last value computed for that period and range,
+so a burst of dashboard refreshes after a write costs one computation.
+
+Every bump is also broadcast to open live dashboards (dashboard.consumers).
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+KPI_DOMAINS = ('transactions', 'enrollments', 'bookings', 'users', 'feedback', 'complaints', 'courses')
+
+KPI_VERSION_KEY = "dashboard:kpi:version:{domain}"
+KPI_KEY = "dashboard:kpi:{period}:{start}:{end}:v{versions}"
+KPI_STALE_KEY = "dashboard:kpi:{period}:{start}:{end}:latest"
+KPI_LOCK_KEY = "dashboard:kpi:{period}:{start}:{end}:lock"
+KPI_TIMEOUT = 60 * 60 * 24   # seconds; versions decide freshness, this only bounds memory
+KPI_LOCK_TIMEOUT = 30        # seconds
+
+# Channel-layer group of open live dashboards
+DASHBOARD_GROUP = "dashboard_kpis"
+
+
+def kpi_versions():
+    keys = [KPI_VERSION_KEY.format(domain=domain) for domain in KPI_DOMAINS]
+    values = cache.get_many(keys)
+    return '.'.join(str(values.get(key, 0)) for key in keys)
+
+
+def bump_kpi_version(*domains):
+    """Invalidate cached KPIs that read any of `domains` and tell live dashboards."""
+    for domain in domains:
+        key = KPI_VERSION_KEY.format(domain=domain)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+    notify_live_dashboards(domains)
+
+
+def notify_live_dashboards(domains):
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            DASHBOARD_GROUP, {"type": "kpis.changed", "domains": list(domains)}
+        )
+    except Exception as e:
+        # The write already committed; live dashboards catch up on the next change
+        logger.warning(f"Could not notify live dashboards of {list(domains)}: {e}")
+
+
+def bump_kpi_version_on_commit(*domains):
+    # Bumping before commit would let a reader cache pre-write data under the new version
+    transaction.on_commit(lambda: bump_kpi_version(*domains))
+
+
+def kpis_recomputing(period, start_date, end_date):
+    """True while a worker is recomputing the KPIs of this period and range."""
+    return cache.get(KPI_LOCK_KEY.format(
+        period=period, start=start_date.isoformat(), end=end_date.isoformat(),
+    )) is not None
+
+
+def get_cached_kpis(period, start_date, end_date, compute):
+    """
+    Return compute()'s KPIs for the period, cached until one of the domains
+    changes. While another worker recomputes a cold key, the previous value
+    is returned instead.
+    """
+    names = dict(period=period, start=start_date.isoformat(), end=end_date.isoformat())
+    key = KPI_KEY.format(versions=kpi_versions(), **names)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock_key = KPI_LOCK_KEY.format(**names)
+    stale_key = KPI_STALE_KEY.format(**names)
+    if not cache.add(lock_key, 1, KPI_LOCK_TIMEOUT):
+        data = cache.get(stale_key)
+        if data is not None:
+            return data
+        # Nothing to fall back on; compute without caching
+        return compute()
+
+    try:
+        data = compute()
+        cache.set_many({key: data, stale_key: data}, KPI_TIMEOUT)
+        return data
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,206 @@
+# dashboard/metrics.py
+"""
+Shared KPI queries for the dashboard and the period reports.
+
+Period KPIs are sums over the DailyFacts rollup (dashboard.rollups): one
+query over at most one row per day of the period, whatever its length.
+Point-in-time KPIs read the live tables with one conditional aggregate
+(`Count(..., filter=Q(...))`) per table.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from complaints.models import Complaint
+from core.models import User
+from courses.models import Course, Enrollment
+from .models import DailyFacts
+from .rollups import TRANSACTION_METRICS
+
+# KPI name -> DailyFacts column, per domain
+PERIOD_FACTS = {
+    'transactions': {
+        f'{name}_{kind}': f'{name}_{kind}' for name in TRANSACTION_METRICS for kind in ('sum', 'count')
+    },
+    'enrollments': {
+        'new_in_period': 'enrollments_new',
+        'active_in_period': 'enrollments_active',
+        'cancelled_in_period': 'enrollments_cancelled',
+    },
+    'bookings': {
+        'approved_in_period': 'bookings_approved',
+        'public_in_period': 'bookings_public',
+        'private_in_period': 'bookings_private',
+    },
+    'users': {'students_new_in_period': 'students_new'},
+    'feedback': {'new_in_period': 'feedback_new'},
+    'complaints': {
+        'new_in_period': 'complaints_new',
+        'resolved_in_period': 'complaints_resolved',
+    },
+}
+
+
+def period_metrics(start_date, end_date, domains=None):
+    """Period KPIs of the given domains (default: all), from a single DailyFacts query."""
+    domains = domains or list(PERIOD_FACTS)
+    aggregates = {
+        f'{domain}__{name}': Sum(column, default=0)
+        for domain in domains
+        for name, column in PERIOD_FACTS[domain].items()
+    }
+    totals = DailyFacts.objects.filter(date__range=(start_date, end_date)).aggregate(**aggregates)
+
+    metrics = {domain: {} for domain in domains}
+    for key, value in totals.items():
+        domain, name = key.split('__', 1)
+        metrics[domain][name] = value
+    return metrics
+
+
+def transaction_metrics(start_date, end_date):
+    """
+    Sum and count of completed transactions per type in the period:
+    `<name>_sum` / `<name>_count` for every name in TRANSACTION_METRICS.
+    """
+    return period_metrics(start_date, end_date, ['transactions'])['transactions']
+
+
+def enrollment_metrics(start_date, end_date):
+    return period_metrics(start_date, end_date, ['enrollments'])['enrollments']
+
+
+def booking_metrics(start_date, end_date):
+    """Approved bookings taking place in the period, split by booking type."""
+    return period_metrics(start_date, end_date, ['bookings'])['bookings']
+
+
+def current_metrics():
+    """Point-in-time KPIs; not affected by any period."""
+    students = Q(user_type='student')
+    return {
+        'users': User.objects.aggregate(
+            students_total=Count('id', filter=students),
+            students_unverified=Count('id', filter=students & Q(is_verified=False)),
+            teachers_total=Count('id', filter=Q(user_type='teacher')),
+        ),
+        'enrollments': {'active_current': Enrollment.objects.filter(status='active').count()},
+        'complaints': {'pending_current': Complaint.objects.filter(status__in=['submitted', 'in_review']).count()},
+        'courses': {'total': Course.objects.count()},
+    }
+
+
+def dashboard_metrics(start_date, end_date):
+    """All dashboard KPIs for the period, grouped by domain."""
+    metrics = period_metrics(start_date, end_date)
+    for domain, values in current_metrics().items():
+        metrics.setdefault(domain, {}).update(values)
+    return metrics
+
+
+def flat_kpis(metrics):
+    """The dashboard's flat KPI payload (without the time period) for dashboard_metrics() output."""
+    transactions = metrics['transactions']
+    enrollments = metrics['enrollments']
+    bookings = metrics['bookings']
+    users = metrics['users']
+    complaints = metrics['complaints']
+
+    course_revenue = transactions['course_revenue_sum']
+    booking_revenue = transactions['booking_revenue_sum']
+    total_refunds = transactions['course_refunds_sum'] + transactions['booking_refunds_sum']
+
+    return {
+        # Financials
+        "revenue_total_in_period": f"{(course_revenue + booking_revenue):.2f}",
+        "revenue_courses_in_period": f"{course_revenue:.2f}",
+        "revenue_bookings_in_period": f"{booking_revenue:.2f}",
+        "refunds_total_in_period": f"{total_refunds:.2f}",
+        "net_revenue_in_period": f"{(course_revenue + booking_revenue - total_refunds):.2f}",
+        "deposits_sum_in_period": f"{transactions['deposits_sum']:.2f}",
+        "deposits_count_in_period": transactions['deposits_count'],
+        "withdrawals_sum_in_period": f"{transactions['withdrawals_sum']:.2f}",
+        "withdrawals_count_in_period": transactions['withdrawals_count'],
+
+        # Activity in Period
+        "enrollments_new_in_period": enrollments['new_in_period'],
+        "bookings_new_in_period": bookings['approved_in_period'],
+        "public_bookings_in_period": bookings['public_in_period'],
+        "private_bookings_in_period": bookings['private_in_period'],
+        "students_new_in_period": users['students_new_in_period'],
+        "feedback_new_in_period": metrics['feedback']['new_in_period'],
+        "complaints_new_in_period": complaints['new_in_period'],
+        "complaints_resolved_in_period": complaints['resolved_in_period'],
+
+        # Totals & Current State
+        "students_total_all_time": users['students_total'],
+        "teachers_total_all_time": users['teachers_total'],
+        "courses_total_all_time": metrics['courses']['total'],
+        "enrollments_active_current": enrollments['active_current'],
+        "students_unverified_current": users['students_unverified'],
+        "complaints_pending_current": complaints['pending_current'],
+    }
+
+
+# Time-series name -> DailyFacts expression summed per bucket
+SERIES_FACTS = {
+    'revenue': F('course_revenue_sum') + F('booking_revenue_sum'),
+    'enrollments': F('enrollments_new'),
+    'bookings': F('bookings_approved'),
+    'signups': F('students_new'),
+    'complaints': F('complaints_new'),
+}
+
+SERIES_BUCKETS = ('day', 'week', 'month')
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_starts(start_date, end_date, bucket):
+    """Start date of every `bucket` (day/week/month) overlapping the period."""
+    current = _bucket_start(start_date, bucket)
+    while current <= end_date:
+        yield current
+        current = _next_bucket(current, bucket)
+
+
+def timeseries_metrics(start_date, end_date, bucket='day'):
+    """
+    SERIES_FACTS per day, ISO week (starting Monday) or month of the period,
+    from one grouped DailyFacts query. Buckets without activity are filled
+    with zeros so the series is dense.
+    """
+    facts = DailyFacts.objects.filter(date__range=(start_date, end_date))
+    if bucket == 'week':
+        facts = facts.annotate(bucket=TruncWeek('date'))
+    elif bucket == 'month':
+        facts = facts.annotate(bucket=TruncMonth('date'))
+    else:
+        facts = facts.annotate(bucket=F('date'))
+    rows = {
+        row.pop('bucket'): row
+        for row in facts.values('bucket').annotate(
+            **{name: Sum(expression, default=0) for name, expression in SERIES_FACTS.items()}
+        ).order_by('bucket')
+    }
+
+    zero = dict.fromkeys(SERIES_FACTS, 0)
+    return [
+        {'bucket': start, **rows.get(start, zero)}
+        for start in bucket_starts(start_date, end_date, bucket)
+    ]
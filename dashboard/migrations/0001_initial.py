@@ -0,0 +1,48 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFacts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('course_revenue_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('course_revenue_count', models.PositiveIntegerField(default=0)),
+                ('booking_revenue_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('booking_revenue_count', models.PositiveIntegerField(default=0)),
+                ('course_refunds_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('course_refunds_count', models.PositiveIntegerField(default=0)),
+                ('booking_refunds_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('booking_refunds_count', models.PositiveIntegerField(default=0)),
+                ('deposits_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('deposits_count', models.PositiveIntegerField(default=0)),
+                ('withdrawals_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('withdrawals_count', models.PositiveIntegerField(default=0)),
+                ('enrollments_new', models.PositiveIntegerField(default=0)),
+                ('enrollments_active', models.PositiveIntegerField(default=0)),
+                ('enrollments_cancelled', models.PositiveIntegerField(default=0)),
+                ('bookings_approved', models.PositiveIntegerField(default=0)),
+                ('bookings_public', models.PositiveIntegerField(default=0)),
+                ('bookings_private', models.PositiveIntegerField(default=0)),
+                ('students_new', models.PositiveIntegerField(default=0)),
+                ('feedback_new', models.PositiveIntegerField(default=0)),
+                ('complaints_new', models.PositiveIntegerField(default=0)),
+                ('complaints_resolved', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily facts',
+                'ordering': ['date'],
+            },
+        ),
+    ]
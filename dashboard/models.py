@@ -1,3 +1,58 @@
 from django.db import models
 
-# Create your models here.
+
+def _amount():
+    return models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+class DailyFacts(models.Model):
+    """
+    Pre-aggregated KPI inputs for one calendar day (local time).
+
+    Each group of columns is rebuilt from its source table by
+    dashboard.rollups; period KPIs are sums over these rows.
+    """
+    date = models.DateField(unique=True)
+
+    # Completed transactions by type, by creation day
+    course_revenue_sum = _amount()
+    course_revenue_count = models.PositiveIntegerField(default=0)
+    booking_revenue_sum = _amount()
+    booking_revenue_count = models.PositiveIntegerField(default=0)
+    course_refunds_sum = _amount()
+    course_refunds_count = models.PositiveIntegerField(default=0)
+    booking_refunds_sum = _amount()
+    booking_refunds_count = models.PositiveIntegerField(default=0)
+    deposits_sum = _amount()
+    deposits_count = models.PositiveIntegerField(default=0)
+    withdrawals_sum = _amount()
+    withdrawals_count = models.PositiveIntegerField(default=0)
+
+    # Enrollments by enrollment day, and their current status
+    enrollments_new = models.PositiveIntegerField(default=0)
+    enrollments_active = models.PositiveIntegerField(default=0)
+    enrollments_cancelled = models.PositiveIntegerField(default=0)
+
+    # Approved hall bookings by booking day
+    bookings_approved = models.PositiveIntegerField(default=0)
+    bookings_public = models.PositiveIntegerField(default=0)
+    bookings_private = models.PositiveIntegerField(default=0)
+
+    # Student sign-ups by join day
+    students_new = models.PositiveIntegerField(default=0)
+
+    # Feedback by submission day
+    feedback_new = models.PositiveIntegerField(default=0)
+
+    # Complaints by creation day; resolutions by resolution day
+    complaints_new = models.PositiveIntegerField(default=0)
+    complaints_resolved = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'Daily facts'
+
+    def __str__(self):
+        return f"Daily facts for {self.date}"
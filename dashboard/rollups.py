@@ -0,0 +1,161 @@
+# dashboard/rollups.py
+"""
+Daily rollups behind the dashboard and the period reports.
+
+DailyFacts holds one row per day. Each domain below owns a group of its
+columns and rebuilds them for a whole day from the source table with one
+indexed range query, so a refresh is idempotent and safe to repeat.
+Writes schedule a refresh of the days they touch (dashboard.signals), and a
+nightly job rebuilds recent days to pick up bulk updates that bypass signals.
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from complaints.models import Complaint
+from core.models import Transaction, User
+from courses.models import Booking, Enrollment
+from feedback.models import Feedback
+from .kpi_cache import bump_kpi_version, bump_kpi_version_on_commit
+from .models import DailyFacts
+
+logger = logging.getLogger(__name__)
+
+# Completed transaction types rolled up, keyed by column prefix
+TRANSACTION_METRICS = {
+    'course_revenue': 'course_payment',
+    'booking_revenue': 'booking_payment',
+    'course_refunds': 'course_refund',
+    'booking_refunds': 'booking_refund',
+    'deposits': 'deposit',
+    'withdrawals': 'withdrawal',
+}
+
+FACT_REFRESH_PENDING_KEY = "daily_facts:pending:{domain}:{day}"
+FACT_REFRESH_PENDING_TIMEOUT = 300  # seconds; a lost job stops blocking refreshes after this
+
+
+def _day_bounds(day):
+    """Aware [start, end) of a local calendar day, so timestamp indexes apply."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+def _transaction_facts(day):
+    start, end = _day_bounds(day)
+    aggregates = {}
+    for name, transaction_type in TRANSACTION_METRICS.items():
+        condition = Q(transaction_type=transaction_type)
+        aggregates[f'{name}_sum'] = Sum('amount', filter=condition, default=0)
+        aggregates[f'{name}_count'] = Count('id', filter=condition)
+    return Transaction.objects.filter(
+        created_at__gte=start, created_at__lt=end,
+        status='completed', transaction_type__in=TRANSACTION_METRICS.values(),
+    ).order_by().aggregate(**aggregates)
+
+
+def _enrollment_facts(day):
+    start, end = _day_bounds(day)
+    return Enrollment.objects.filter(enrollment_date__gte=start, enrollment_date__lt=end).order_by().aggregate(
+        enrollments_new=Count('id'),
+        enrollments_active=Count('id', filter=Q(status='active')),
+        enrollments_cancelled=Count('id', filter=Q(status='cancelled')),
+    )
+
+
+def _booking_facts(day):
+    return Booking.objects.filter(date=day, status='approved').order_by().aggregate(
+        bookings_approved=Count('id'),
+        bookings_public=Count('id', filter=Q(booking_type='public')),
+        bookings_private=Count('id', filter=Q(booking_type='private')),
+    )
+
+
+def _user_facts(day):
+    start, end = _day_bounds(day)
+    return {
+        'students_new': User.objects.filter(user_type='student', date_joined__gte=start, date_joined__lt=end).count(),
+    }
+
+
+def _feedback_facts(day):
+    start, end = _day_bounds(day)
+    return {'feedback_new': Feedback.objects.filter(created_at__gte=start, created_at__lt=end).count()}
+
+
+def _complaint_facts(day):
+    start, end = _day_bounds(day)
+    created = Q(created_at__gte=start, created_at__lt=end)
+    resolved = Q(status='resolved', resolved_at__gte=start, resolved_at__lt=end)
+    return Complaint.objects.filter(created | resolved).order_by().aggregate(
+        complaints_new=Count('id', filter=created),
+        complaints_resolved=Count('id', filter=resolved),
+    )
+
+
+FACT_SOURCES = {
+    'transactions': _transaction_facts,
+    'enrollments': _enrollment_facts,
+    'bookings': _booking_facts,
+    'users': _user_facts,
+    'feedback': _feedback_facts,
+    'complaints': _complaint_facts,
+}
+
+
+def refresh_daily_facts(day, domains=None):
+    """Rebuild the given domains' columns (default: all) of `day`'s DailyFacts row."""
+    domains = domains or list(FACT_SOURCES)
+    values = {}
+    for domain in domains:
+        # Cleared before reading: writes committed after this point schedule a new refresh
+        cache.delete(FACT_REFRESH_PENDING_KEY.format(domain=domain, day=day))
+        values.update(FACT_SOURCES[domain](day))
+    DailyFacts.objects.update_or_create(date=day, defaults=values)
+    # KPIs cached between the write and this refresh still hold the old totals
+    bump_kpi_version(*domains)
+    return values
+
+
+def rebuild_daily_facts(start_date, end_date):
+    """Rebuild every domain for each day in [start_date, end_date]; returns the day count."""
+    day = start_date
+    while day <= end_date:
+        refresh_daily_facts(day)
+        day += timedelta(days=1)
+    return (end_date - start_date).days + 1
+
+
+def schedule_fact_refresh(domain, *days):
+    """
+    Refresh `domain` for `days` once the current transaction commits.
+    Writes to the same day share a job until that job starts reading.
+    """
+    from .tasks import refresh_daily_facts_task
+
+    for day in {d for d in days if d is not None}:
+        key = FACT_REFRESH_PENDING_KEY.format(domain=domain, day=day)
+
+        def enqueue(day=day, key=key):
+            if cache.add(key, 1, FACT_REFRESH_PENDING_TIMEOUT):
+                refresh_daily_facts_task.delay(day.isoformat(), [domain])
+
+        transaction.on_commit(enqueue)
+
+
+def schedule_bulk_fact_refresh(domain, queryset, field):
+    """
+    Refresh `domain` for every local day of `field` among `queryset`'s rows
+    and invalidate its cached KPIs. For queryset.update(), which sends no
+    signals; call it before the update when the update changes which rows
+    the queryset selects.
+    """
+    days = queryset.order_by().annotate(fact_day=TruncDate(field)).values_list('fact_day', flat=True).distinct()
+    schedule_fact_refresh(domain, *days)
+    bump_kpi_version_on_commit(domain)
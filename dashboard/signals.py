@@ -0,0 +1,110 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from complaints.models import Complaint
+from core.models import Transaction, User
+from courses.models import Booking, Course, Enrollment
+from feedback.models import Feedback
+from .kpi_cache import bump_kpi_version_on_commit
+from .rollups import TRANSACTION_METRICS, schedule_fact_refresh
+
+# User fields the daily facts / the live user KPIs depend on
+USER_FACT_FIELDS = {'user_type', 'date_joined'}
+USER_KPI_FIELDS = USER_FACT_FIELDS | {'is_verified'}
+
+
+def _local_day(value):
+    return timezone.localdate(value) if value else None
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+def _remember_previous(sender, instance, field, update_fields):
+    """Stash the stored value of `field` so post_save can refresh the day it moved away from."""
+    if instance.pk is None or not _touches(update_fields, {field}):
+        return
+    instance.__dict__[f'_previous_{field}'] = (
+        sender._base_manager.filter(pk=instance.pk).values_list(field, flat=True).first()
+    )
+
+
+def _previous(instance, field):
+    return instance.__dict__.pop(f'_previous_{field}', None)
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def transaction_facts_changed(sender, instance, raw=False, **kwargs):
+    if raw or instance.transaction_type not in TRANSACTION_METRICS.values():
+        return
+    schedule_fact_refresh('transactions', _local_day(instance.created_at))
+    bump_kpi_version_on_commit('transactions')
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def enrollment_facts_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_fact_refresh('enrollments', _local_day(instance.enrollment_date))
+    bump_kpi_version_on_commit('enrollments')
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_date(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        _remember_previous(sender, instance, 'date', update_fields)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def booking_facts_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_fact_refresh('bookings', instance.date, _previous(instance, 'date'))
+    bump_kpi_version_on_commit('bookings')
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_facts_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins and profile edits save the user too; skip saves of unrelated fields
+    if raw:
+        return
+    if _touches(update_fields, USER_FACT_FIELDS):
+        schedule_fact_refresh('users', _local_day(instance.date_joined))
+    if _touches(update_fields, USER_KPI_FIELDS):
+        bump_kpi_version_on_commit('users')
+
+
+@receiver([post_save, post_delete], sender=Feedback)
+def feedback_facts_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_fact_refresh('feedback', _local_day(instance.created_at))
+    bump_kpi_version_on_commit('feedback')
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_complaint_resolution(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        _remember_previous(sender, instance, 'resolved_at', update_fields)
+
+
+@receiver([post_save, post_delete], sender=Complaint)
+def complaint_facts_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_fact_refresh(
+        'complaints', _local_day(instance.created_at), _local_day(instance.resolved_at),
+        _local_day(_previous(instance, 'resolved_at')),
+    )
+    bump_kpi_version_on_commit('complaints')
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_count_changed(sender, instance, raw=False, created=True, **kwargs):
+    # Only the course count is shown; edits don't change it
+    if raw or not created:
+        return
+    bump_kpi_version_on_commit('courses')
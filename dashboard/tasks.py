@@ -0,0 +1,29 @@
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django_rq import job
+
+from .rollups import rebuild_daily_facts, refresh_daily_facts
+
+logger = logging.getLogger(__name__)
+
+
+@job('default')
+def refresh_daily_facts_task(day, domains=None):
+    """Rebuilds one day of DailyFacts after a write touched it."""
+    refresh_daily_facts(date.fromisoformat(day), domains)
+
+
+@job('low', timeout=1800)
+def reconcile_daily_facts_task(days=None):
+    """
+    Nightly rebuild of the last `days` days of DailyFacts, catching changes
+    made without signals (queryset.update(), raw SQL, restores).
+    """
+    days = days or settings.DAILY_FACTS_RECONCILE_DAYS
+    today = timezone.localdate()
+    count = rebuild_daily_facts(today - timedelta(days=days), today)
+    logger.info(f"Reconciled {count} days of dashboard facts")
+    return f"Reconciled {count} days of dashboard facts"
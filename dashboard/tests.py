@@ -1,3 +1,128 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Transaction, User
+from .kpi_cache import KPI_LOCK_KEY, bump_kpi_version, get_cached_kpis
+from .metrics import timeseries_metrics, transaction_metrics
+from .models import DailyFacts
+from .rollups import refresh_daily_facts
+from .views import DashboardViewSet
+
+
+class MetricsQueryCountTests(TestCase):
+    """Period KPIs come from one DailyFacts query; live KPIs from one query per table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('0999000001', 'Admin', 'M', 'User', password='pass')
+        Transaction.objects.bulk_create([
+            Transaction(amount=Decimal(amount), transaction_type=kind, status=status, reference_id=f'MET-{i}')
+            for i, (amount, kind, status) in enumerate([
+                ('100.00', 'course_payment', 'completed'),
+                ('50.00', 'course_payment', 'completed'),
+                ('30.00', 'booking_payment', 'completed'),
+                ('20.00', 'course_refund', 'completed'),
+                ('200.00', 'deposit', 'completed'),
+                ('75.00', 'withdrawal', 'completed'),
+                ('999.00', 'course_payment', 'pending'),
+            ])
+        ])
+        # bulk_create skips the write hooks
+        refresh_daily_facts(timezone.localdate())
+
+    def setUp(self):
+        cache.clear()
+
+    def _get_dashboard(self):
+        request = APIRequestFactory().get('/api/dashboard/', {'period': 'month'})
+        force_authenticate(request, user=self.admin)
+        return DashboardViewSet.as_view({'get': 'list'})(request)
+
+    def test_transaction_metrics_single_query(self):
+        today = timezone.now().date()
+        with self.assertNumQueries(1):
+            totals = transaction_metrics(today - timedelta(days=365), today)
+
+        self.assertEqual(totals['course_revenue_sum'], Decimal('150.00'))
+        self.assertEqual(totals['course_revenue_count'], 2)
+        self.assertEqual(totals['booking_revenue_sum'], Decimal('30.00'))
+        self.assertEqual(totals['course_refunds_sum'], Decimal('20.00'))
+        self.assertEqual(totals['booking_refunds_sum'], Decimal('0.00'))
+        self.assertEqual(totals['booking_refunds_count'], 0)
+        self.assertEqual(totals['deposits_sum'], Decimal('200.00'))
+        self.assertEqual(totals['withdrawals_count'], 1)
+
+    def test_dashboard_one_query_per_table(self):
+        # daily facts, then users, active enrollments, pending complaints, courses
+        with self.assertNumQueries(5):
+            response = self._get_dashboard()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['revenue_total_in_period'], '180.00')
+        self.assertEqual(response.data['net_revenue_in_period'], '160.00')
+        self.assertEqual(response.data['deposits_count_in_period'], 1)
+
+    def test_timeseries_is_dense_and_single_query(self):
+        today = timezone.localdate()
+        start = today - timedelta(days=20)
+        with self.assertNumQueries(1):
+            series = timeseries_metrics(start, today, 'day')
+
+        self.assertEqual(len(series), 21)
+        self.assertEqual(series[0], {'bucket': start, 'revenue': 0, 'enrollments': 0, 'bookings': 0, 'signups': 0, 'complaints': 0})
+        self.assertEqual(series[-1]['revenue'], Decimal('180.00'))
+
+        weeks = timeseries_metrics(start, today, 'week')
+        self.assertTrue(all(point['bucket'].weekday() == 0 for point in weeks))
+        self.assertEqual(sum(point['revenue'] for point in weeks), Decimal('180.00'))
+
+    def test_timeseries_endpoint(self):
+        request = APIRequestFactory().get('/api/dashboard/timeseries/', {'period': 'year', 'bucket': 'month'})
+        force_authenticate(request, user=self.admin)
+        response = DashboardViewSet.as_view({'get': 'timeseries'})(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), timezone.localdate().month)
+        self.assertEqual(response.data['series'][-1]['revenue'], '180.00')
+
+    def test_refresh_is_idempotent(self):
+        today = timezone.localdate()
+        refresh_daily_facts(today)
+        refresh_daily_facts(today, ['transactions'])
+
+        facts = DailyFacts.objects.get(date=today)
+        self.assertEqual(facts.course_revenue_sum, Decimal('150.00'))
+        self.assertEqual(facts.course_revenue_count, 2)
+        self.assertEqual(DailyFacts.objects.filter(date=today).count(), 1)
+
+
+class KPICacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.today = timezone.localdate()
+
+    def compute(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def test_cached_until_domain_version_bumped(self):
+        self.assertEqual(get_cached_kpis('month', self.today, self.today, self.compute), {'calls': 1})
+        self.assertEqual(get_cached_kpis('month', self.today, self.today, self.compute), {'calls': 1})
+
+        bump_kpi_version('transactions')
+        self.assertEqual(get_cached_kpis('month', self.today, self.today, self.compute), {'calls': 2})
+
+    def test_serves_stale_value_while_another_worker_recomputes(self):
+        get_cached_kpis('month', self.today, self.today, self.compute)
+        bump_kpi_version('complaints')
+        cache.add(KPI_LOCK_KEY.format(period='month', start=self.today.isoformat(), end=self.today.isoformat()), 1)
 
-# Create your tests here.
+        self.assertEqual(get_cached_kpis('month', self.today, self.today, self.compute), {'calls': 1})
+        self.assertEqual(self.calls, 1)
@@ -1,19 +1,46 @@
 from rest_framework import viewsets,status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from datetime import date, timedelta
-from decimal import Decimal
+from itertools import islice
 
-from django.db.models import Sum, Count, Q
 from django.utils import timezone
 
-# Import all the models we need to query
-from core.models import Transaction, User
-from courses.models import Enrollment, ScheduleSlot, Course, Booking
-from complaints.models import Complaint
-from feedback.models import Feedback
+from .kpi_cache import get_cached_kpis
+from .metrics import SERIES_BUCKETS, bucket_starts, dashboard_metrics, flat_kpis, timeseries_metrics
+
+PERIOD_CHOICES = ['today', 'week', 'month', 'year', 'custom']
+# Longest time series returned in one response
+MAX_SERIES_POINTS = 1000
+
+
+def resolve_period(params):
+    """(period, start_date, end_date) for the `period` query parameters; ValueError if invalid."""
+    period = params.get('period', 'month')
+    today = timezone.now().date()
+
+    if period == 'today':
+        return period, today, today
+    if period == 'week':
+        return period, today - timedelta(days=today.weekday()), today
+    if period == 'month':
+        return period, today.replace(day=1), today
+    if period == 'year':
+        return period, today.replace(day=1, month=1), today
+    if period == 'custom':
+        try:
+            start_date = date.fromisoformat(params.get('start_date'))
+            end_date = date.fromisoformat(params.get('end_date'))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid start_date or end_date. Use YYYY-MM-DD format.")
+        if start_date > end_date:
+            raise ValueError("start_date must not be after end_date.")
+        return period, start_date, end_date
+    raise ValueError("Invalid period parameter.")
+
 
 class DashboardViewSet(viewsets.ViewSet):
     """
@@ -37,7 +64,7 @@ class DashboardViewSet(viewsets.ViewSet):
         - `today`, `week`, `month` (default), `year`, `custom` (requires `start_date` and `end_date`).
         """,
         parameters=[
-            OpenApiParameter(name='period', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, enum=['today', 'week', 'month', 'year', 'custom'], default='month'),
+            OpenApiParameter(name='period', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, enum=PERIOD_CHOICES, default='month'),
             OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY, description='Required if period is "custom".'),
             OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY, description='Required if period is "custom".'),
         ],
@@ -79,94 +106,17 @@ class DashboardViewSet(viewsets.ViewSet):
     )
     def list(self, request):
         # --- 1. Calculate Date Range ---
-        period = request.query_params.get('period', 'month')
-        today = timezone.now().date()
-        start_date, end_date = None, None
-
-        if period == 'today':
-            start_date = end_date = today
-        elif period == 'week':
-            start_date = today - timedelta(days=today.weekday())
-            end_date = today
-        elif period == 'month':
-            start_date = today.replace(day=1)
-            end_date = today
-        elif period == 'year':
-            start_date = today.replace(day=1, month=1)
-            end_date = today
-        elif period == 'custom':
-            try:
-                start_date = date.fromisoformat(request.query_params.get('start_date'))
-                end_date = date.fromisoformat(request.query_params.get('end_date'))
-            except (ValueError, TypeError):
-                return Response({"error": "Invalid start_date or end_date. Use YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            return Response({"error": "Invalid period parameter."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # --- 2. Define Date Filters ---
-        transaction_filter = Q(created_at__date__range=(start_date, end_date))
-        enrollment_filter = Q(enrollment_date__date__range=(start_date, end_date))
-        user_filter = Q(date_joined__date__range=(start_date, end_date))
-        complaint_filter = Q(created_at__date__range=(start_date, end_date))
-        booking_filter = Q(date__range=(start_date, end_date))
-        feedback_filter = Q(created_at__date__range=(start_date, end_date))
-
-        # --- 3. Perform Aggregations ---
-        
-        # Financial Metrics (Period-Specific)
-        course_revenue = Transaction.objects.filter(transaction_filter, transaction_type='course_payment', status='completed').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        booking_revenue = Transaction.objects.filter(transaction_filter, transaction_type='booking_payment', status='completed').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        total_refunds = Transaction.objects.filter(transaction_filter, transaction_type__in=['course_refund', 'booking_refund'], status='completed').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        deposits = Transaction.objects.filter(transaction_filter, transaction_type='deposit', status='completed')
-        withdrawals = Transaction.objects.filter(transaction_filter, transaction_type='withdrawal', status='completed')
-        
-        # Activity Metrics (Period-Specific)
-        new_enrollments = Enrollment.objects.filter(enrollment_filter).count()
-        new_bookings = Booking.objects.filter(booking_filter, status='approved')
-        new_students = User.objects.filter(user_filter, user_type='student').count()
-        new_feedback = Feedback.objects.filter(feedback_filter).count()
-        new_complaints = Complaint.objects.filter(complaint_filter).count()
-        resolved_complaints = Complaint.objects.filter(resolved_at__date__range=(start_date, end_date), status='resolved').count()
-        
-        # "Point-in-Time" Metrics (Not affected by date filter)
-        total_students = User.objects.filter(user_type='student').count()
-        total_teachers = User.objects.filter(user_type='teacher').count()
-        total_courses = Course.objects.count()
-        active_enrollments = Enrollment.objects.filter(status='active').count()
-        unverified_students = User.objects.filter(user_type='student', is_verified=False).count()
-        pending_complaints = Complaint.objects.filter(status__in=['submitted', 'in_review']).count()
-
-        # --- 4. Assemble the Flat Response Dictionary ---
-        data = {
-            # Financials
-            "revenue_total_in_period": f"{(course_revenue + booking_revenue):.2f}",
-            "revenue_courses_in_period": f"{course_revenue:.2f}",
-            "revenue_bookings_in_period": f"{booking_revenue:.2f}",
-            "refunds_total_in_period": f"{total_refunds:.2f}",
-            "net_revenue_in_period": f"{(course_revenue + booking_revenue - total_refunds):.2f}",
-            "deposits_sum_in_period": f"{(deposits.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')):.2f}",
-            "deposits_count_in_period": deposits.count(),
-            "withdrawals_sum_in_period": f"{(withdrawals.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')):.2f}",
-            "withdrawals_count_in_period": withdrawals.count(),
-            
-            # Activity in Period
-            "enrollments_new_in_period": new_enrollments,
-            "bookings_new_in_period": new_bookings.count(),
-            "public_bookings_in_period": new_bookings.filter(booking_type='public').count(),
-            "private_bookings_in_period": new_bookings.filter(booking_type='private').count(),
-            "students_new_in_period": new_students,
-            "feedback_new_in_period": new_feedback,
-            "complaints_new_in_period": new_complaints,
-            "complaints_resolved_in_period": resolved_complaints,
-
-            # Totals & Current State
-            "students_total_all_time": total_students,
-            "teachers_total_all_time": total_teachers,
-            "courses_total_all_time": total_courses,
-            "enrollments_active_current": active_enrollments,
-            "students_unverified_current": unverified_students,
-            "complaints_pending_current": pending_complaints,
+        try:
+            period, start_date, end_date = resolve_period(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        # --- 2. Perform Aggregations (cached until a domain changes) ---
+        metrics = get_cached_kpis(period, start_date, end_date, lambda: dashboard_metrics(start_date, end_date))
+
+        # --- 3. Assemble the Flat Response Dictionary ---
+        data = {
+            **flat_kpis(metrics),
             # Time Period Info
             "time_period": {
                 "start": start_date.isoformat(),
@@ -175,4 +125,65 @@ class DashboardViewSet(viewsets.ViewSet):
             }
         }
 
-        return Response(data)
\ No newline at end of file
+        return Response(data)
+
+    @extend_schema(
+        summary="Get Dashboard Time Series",
+        description="""
+        Revenue (course + booking payments), new enrollments, approved bookings, student
+        sign-ups and new complaints per `bucket` of the selected period, for charts.
+
+        The series is dense: every day / week (starting Monday) / month overlapping the
+        period appears once, with zeros where nothing happened. Accepts the same `period`
+        options as the KPI list.
+        """,
+        parameters=[
+            OpenApiParameter(name='period', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, enum=PERIOD_CHOICES, default='month'),
+            OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY, description='Required if period is "custom".'),
+            OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY, description='Required if period is "custom".'),
+            OpenApiParameter(name='bucket', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, enum=SERIES_BUCKETS, default='day'),
+        ],
+        responses={
+            200: OpenApiExample(
+                'Example Time Series Response',
+                value={
+                    "bucket": "week",
+                    "time_period": {"start": "2025-09-01", "end": "2025-09-14", "filter_used": "custom"},
+                    "series": [
+                        {"bucket": "2025-09-01", "revenue": "120000.00", "enrollments": 14, "bookings": 3, "signups": 9, "complaints": 1},
+                        {"bucket": "2025-09-08", "revenue": "0.00", "enrollments": 0, "bookings": 0, "signups": 0, "complaints": 0},
+                    ]
+                }
+            )
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        try:
+            period, start_date, end_date = resolve_period(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in SERIES_BUCKETS:
+            return Response({"error": f"Invalid bucket. Use one of: {', '.join(SERIES_BUCKETS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        # Stop counting one past the cap; a decades-long daily range is not walked in full
+        if len(list(islice(bucket_starts(start_date, end_date, bucket), MAX_SERIES_POINTS + 1))) > MAX_SERIES_POINTS:
+            return Response({"error": f"Too many points; use a larger bucket (max {MAX_SERIES_POINTS})."}, status=status.HTTP_400_BAD_REQUEST)
+
+        series = get_cached_kpis(
+            f"series:{bucket}:{period}", start_date, end_date,
+            lambda: timeseries_metrics(start_date, end_date, bucket),
+        )
+        return Response({
+            "bucket": bucket,
+            "time_period": {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat(),
+                "filter_used": period
+            },
+            "series": [
+                {**point, "bucket": point['bucket'].isoformat(), "revenue": f"{point['revenue']:.2f}"}
+                for point in series
+            ],
+        })
@@ -64,6 +64,13 @@ class NewsFeedConsumer(AsyncWebsocketConsumer):
             "notification": event["payload"]
         }))
 
+    async def news_file_status(self, event):
+        """Broadcast when a file attached to news items or lessons finishes uploading"""
+        await self.send(text_data=json.dumps({
+            "type": "file_status",
+            **event["payload"]
+        }))
+
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
@@ -1,10 +1,12 @@
 from rest_framework import serializers
 
-from core.services import upload_to_telegram
+from core.services import stage_file
+from core.uploads import UploadError, completed_upload
 from .models import Lesson, Homework, Attendance, HomeworkGrade, ScheduleSlotNews, PrivateLessonRequest, PrivateLessonProposedOption
 from courses.models import Enrollment
 from datetime import date
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from core.models import FileStorage
 from core.serializers import FileStorageSerializer
 from core.utils import TranslationMixin
@@ -40,18 +42,35 @@ class LessonSerializer(TranslationMixin, serializers.ModelSerializer):
         return obj.homework_assignments_in_lessons_app.exists()
     
 
+def resolve_upload(serializer, upload_id):
+    """The FileStorage of the requesting user's completed resumable upload."""
+    try:
+        return completed_upload(upload_id, serializer.context['request'].user)
+    except UploadError as e:
+        raise serializers.ValidationError(str(e))
+
+
 class LessonCreateUpdateSerializer(serializers.ModelSerializer):
     # This serializer is used for create/update actions and has writable fields.
     file = serializers.FileField(write_only=True, required=False, allow_null=True)
+    upload_id = serializers.UUIDField(
+        write_only=True, required=False,
+        help_text="Completed resumable upload (/api/core/uploads/) to attach instead of `file`.",
+    )
 
     class Meta:
         model = Lesson
         fields = [
-            'title', 'notes', 'file', 'link', 'course',
+            'title', 'notes', 'file', 'upload_id', 'link', 'course',
             'schedule_slot', 'lesson_date', 'status'
         ]
 
+    def validate_upload_id(self, value):
+        return resolve_upload(self, value)
+
     def validate(self, data):
+        if data.get('file') and data.get('upload_id'):
+            raise serializers.ValidationError({'upload_id': 'Send either a file or an upload_id, not both.'})
         schedule_slot = data.get('schedule_slot') or getattr(self.instance, 'schedule_slot', None)
         course = data.get('course') or getattr(self.instance, 'course', None)
         lesson_date = data.get('lesson_date') or getattr(self.instance, 'lesson_date', None)
@@ -88,9 +107,12 @@ class LessonCreateUpdateSerializer(serializers.ModelSerializer):
         
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
+        # Atomic so the file's upload job only starts once the lesson exists
+        # to announce it to (see core.services.stage_file)
         uploaded_file = validated_data.pop('file', None)
-        file_storage = None
+        file_storage = validated_data.pop('upload_id', None)
 
         if uploaded_file:
             if uploaded_file.size == 0:
@@ -98,14 +120,8 @@ class LessonCreateUpdateSerializer(serializers.ModelSerializer):
                     {"file": "Cannot upload an empty file."}
                 )
             try:
-                result = upload_to_telegram(uploaded_file)
-                file_storage = FileStorage.objects.create(
-                    file=uploaded_file,
-                    telegram_file_id=result['file_id'],
-                    telegram_download_link=result['download_link'],
-                    uploaded_by=self.context['request'].user
-                )
-            except Exception as e:
+                file_storage = stage_file(uploaded_file, uploaded_by=self.context['request'].user)
+            except OSError as e:
                 raise serializers.ValidationError({"file": str(e)})
 
         # auto lesson_order, etc.
@@ -117,6 +133,11 @@ class LessonCreateUpdateSerializer(serializers.ModelSerializer):
         validated_data['file_storage'] = file_storage
         return Lesson.objects.create(**validated_data)
 
+    def update(self, instance, validated_data):
+        if 'upload_id' in validated_data:
+            validated_data['file_storage'] = validated_data.pop('upload_id')
+        return super().update(instance, validated_data)
+
 
 
 class HomeworkSerializer(TranslationMixin, serializers.ModelSerializer):
@@ -266,15 +287,24 @@ class ScheduleSlotNewsCreateUpdateSerializer(serializers.ModelSerializer):
     file_storage = serializers.PrimaryKeyRelatedField(
         queryset=FileStorage.objects.all(), required=False, allow_null=True
     )
+    upload_id = serializers.UUIDField(
+        write_only=True, required=False,
+        help_text="Completed resumable upload (/api/core/uploads/) to attach as the file.",
+    )
     
     class Meta:
         model = ScheduleSlotNews
         fields = [
             'schedule_slot', 'type', 'title', 'content', 'image',
-            'related_homework', 'related_quiz', 'file_storage'
+            'related_homework', 'related_quiz', 'file_storage', 'upload_id'
         ]
 
+    def validate_upload_id(self, value):
+        return resolve_upload(self, value)
+
     def validate(self, data):
+        if 'upload_id' in data:
+            data['file_storage'] = data.pop('upload_id')
         # When creating, type is required. When updating, it might not be.
         if not self.instance and not data.get('type'):
             raise serializers.ValidationError({"type": "This field is required for new posts."})
@@ -5,7 +5,10 @@ from django.db import transaction
 from channels.layers import get_channel_layer
 from quiz.models import Quiz
 from django.conf import settings
-from .models import ScheduleSlotNews
+from core.models import FileStorage
+from core.serializers import FileStorageSerializer
+from core.signals import file_storage_status_changed
+from .models import Lesson, ScheduleSlotNews
 from .serializers import ScheduleSlotNewsSerializer
 from asgiref.sync import async_to_sync
 import logging
@@ -25,6 +28,24 @@ def announce_news(sender, instance, created, **kwargs):
         )
 
 
+@receiver(file_storage_status_changed, sender=FileStorage)
+def announce_file_status(sender, instance, **kwargs):
+    """Tell every slot feed showing the file that its background upload finished or failed."""
+    slots = {}
+    for kind, model in (("news_ids", ScheduleSlotNews), ("lesson_ids", Lesson)):
+        for item_id, slot_id in model.objects.filter(file_storage=instance).values_list("id", "schedule_slot_id"):
+            slots.setdefault(slot_id, {"news_ids": [], "lesson_ids": []})[kind].append(item_id)
+    if not slots:
+        return
+
+    file_data = FileStorageSerializer(instance, context={"request": None}).data
+    for slot_id, items in slots.items():
+        async_to_sync(channel_layer.group_send)(
+            f"slot_news_{slot_id}",
+            {"type": "news_file_status", "payload": {"schedule_slot": slot_id, "file": file_data, **items}}
+        )
+
+
 @receiver(post_save, sender=Homework)
 def create_homework_news_async(sender, instance, created, **kwargs):
     if created:
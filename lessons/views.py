@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from core.tasks import notify_scheduleslot_news_task
 from .models import Lesson, Homework, Attendance, HomeworkGrade
 from .serializers import HomeworkCreateUpdateSerializer, LessonCreateUpdateSerializer, LessonSerializer, HomeworkSerializer, AttendanceSerializer, LessonSummarySerializer, HomeworkGradeSerializer, ScheduleSlotNewsCreateUpdateSerializer
+from django.db import transaction
 from django.db.models import Q
 from core.permissions import IsReception, IsStudent, IsTeacher,IsReceptionOrStudent
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, inline_serializer
@@ -22,8 +23,7 @@ from rest_framework.views import APIView
 from rest_framework import mixins, viewsets
 from .serializers import PrivateLessonRequestSerializer, PrivateLessonProposedOptionSerializer
 from .models import PrivateLessonRequest, PrivateLessonProposedOption
-from core.services import upload_to_telegram
-from core.models import FileStorage
+from core.services import stage_file
 import logging
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -543,6 +543,7 @@ class ScheduleSlotNewsViewSet(viewsets.ModelViewSet):
                     'content': {'type': 'string', 'description': 'Main text content of the post.'},
                     'image': {'type': 'string', 'format': 'binary', 'description': 'Upload an image file.'},
                     'file': {'type': 'string', 'format': 'binary', 'description': 'Upload a document (PDF, etc.) if type is "file".'},
+                    'upload_id': {'type': 'string', 'format': 'uuid', 'description': 'Completed resumable upload to attach instead of `file`.'},
                     'related_homework': {'type': 'integer', 'description': 'Link to a homework item.'},
                     'related_quiz': {'type': 'integer', 'description': 'Link to a quiz.'},
                 },
@@ -566,23 +567,20 @@ class ScheduleSlotNewsViewSet(viewsets.ModelViewSet):
         if user != slot.teacher:
             raise serializers.ValidationError("You can only post news to your own schedule slots.")
 
-        # Handle file upload via Telegram
+        # The file is spooled and uploaded in the background; the news item is
+        # saved in the same transaction so the upload job can announce it
         file_obj = self.request.FILES.get('file')
-        file_storage_instance = None
-        if file_obj:
-            try:
-                tg_result = upload_to_telegram(file_obj)
-                file_storage_instance = FileStorage.objects.create(
-                    file=file_obj,
-                    telegram_file_id=tg_result['file_id'],
-                    telegram_download_link=tg_result['download_link'],
-                    uploaded_by=user
-                )
-            except Exception as e:
-                raise serializers.ValidationError({"file": f"Telegram upload failed: {str(e)}"})
-
-        # Save the instance with the author and file_storage
-        serializer.save(author=user, file_storage=file_storage_instance)
+        with transaction.atomic():
+            # Without a file, keep a file_storage given through upload_id
+            extra = {}
+            if file_obj:
+                try:
+                    extra['file_storage'] = stage_file(file_obj, uploaded_by=user)
+                except OSError as e:
+                    raise serializers.ValidationError({"file": f"File upload failed: {str(e)}"})
+
+            # Save the instance with the author and file_storage
+            serializer.save(author=user, **extra)
         
         notify_scheduleslot_news_task.delay(serializer.instance.id)
 
@@ -618,7 +616,7 @@ class ScheduleSlotNewsViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Note: Deleting the FileStorage object could be added here if desired
+        # The file may be shared with other items; it is purged once nothing references it
         return super().destroy(request, *args, **kwargs)
 
     # Add Swagger documentation to the list action
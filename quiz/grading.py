@@ -0,0 +1,118 @@
+"""
+In-memory grading of quiz submissions.
+
+The answer key (questions, their choices and related lessons) is loaded once
+per submission; every answer is then validated and graded without touching
+the database, and the results are written with a fixed number of bulk
+queries, whatever the number of questions.
+"""
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from .models import Question, QuizAnswer
+
+AUTO_GRADED_TYPES = ('multiple_choice', 'true_false')
+MANUALLY_GRADED_TYPES = ('short_answer', 'essay')
+
+
+class AnswerKey:
+    """A quiz's questions by order, each with its choices by order and its correct choice ids."""
+
+    def __init__(self, quiz):
+        self.questions = {}
+        self.choices = {}
+        self.correct_choice_ids = {}
+        for question in Question.objects.filter(quiz=quiz).prefetch_related('choices', 'related_lessons'):
+            self.questions[question.order] = question
+            choices = list(question.choices.all())
+            self.choices[question.pk] = {choice.order: choice for choice in choices}
+            self.correct_choice_ids[question.pk] = {choice.pk for choice in choices if choice.is_correct}
+
+    @property
+    def total_points(self):
+        return sum(question.points for question in self.questions.values())
+
+    def grade(self, question_order, choice_orders, text_answer):
+        """
+        Validate one answer and return (question, selected choices, points_earned, is_correct);
+        raises ValueError with a message for the student when the answer does not fit the question.
+        """
+        question = self.questions.get(question_order)
+        if question is None:
+            raise ValueError(f"Question with order {question_order} not found in this quiz")
+
+        if question.question_type in AUTO_GRADED_TYPES:
+            if not choice_orders:
+                raise ValueError("You must select at least one choice for this question type")
+            choices = self.choices[question.pk]
+            if not set(choice_orders).issubset(choices):
+                raise ValueError(f"Invalid choice orders. Valid orders: {sorted(choices)}")
+            selected = [choices[order] for order in sorted(set(choice_orders))]
+            # All correct choices selected and nothing else
+            is_correct = {choice.pk for choice in selected} == self.correct_choice_ids[question.pk]
+            return question, selected, question.points if is_correct else 0, is_correct
+
+        if question.question_type in MANUALLY_GRADED_TYPES and not text_answer.strip():
+            raise ValueError("Text answer is required for this question type")
+        # Short answer and essay are graded by a teacher
+        return question, [], 0, None
+
+
+def submit_answers(attempt, answers_data):
+    """
+    Grade `answers_data` (dicts with question_order, choice_orders and
+    text_answer) for `attempt` and save them, replacing earlier answers to
+    the same questions. Returns (answers, errors); the attempt is completed
+    and scored only when there are no errors.
+    """
+    key = AnswerKey(attempt.quiz)
+    graded = {}
+    errors = []
+    for answer_data in answers_data:
+        try:
+            graded[answer_data['question_order']] = (
+                key.grade(answer_data['question_order'], answer_data.get('choice_orders') or [],
+                          answer_data.get('text_answer', '')),
+                answer_data.get('text_answer', ''),
+            )
+        except ValueError as e:
+            errors.append({
+                'question_order': answer_data['question_order'],
+                'errors': {'non_field_errors': [str(e)]},
+            })
+
+    Through = QuizAnswer.selected_choices.through
+    with transaction.atomic():
+        saved = {answer.question_id: answer for answer in QuizAnswer.objects.filter(attempt=attempt)}
+        answers, new_answers, updated_answers, links = [], [], [], []
+        for (question, selected, points, is_correct), text_answer in graded.values():
+            answer = saved.get(question.pk)
+            if answer is None:
+                answer = QuizAnswer(attempt=attempt, question=question)
+                new_answers.append(answer)
+            else:
+                answer.question = question
+                updated_answers.append(answer)
+            answer.text_answer = text_answer
+            answer.points_earned = points
+            answer.is_correct = is_correct
+            answers.append(answer)
+            links.append((answer, selected))
+
+        QuizAnswer.objects.bulk_create(new_answers)
+        QuizAnswer.objects.bulk_update(updated_answers, ['text_answer', 'points_earned', 'is_correct'])
+        if updated_answers:
+            Through.objects.filter(quizanswer_id__in=[answer.pk for answer in updated_answers]).delete()
+        Through.objects.bulk_create([
+            Through(quizanswer_id=answer.pk, choice_id=choice.pk)
+            for answer, selected in links for choice in selected
+        ])
+
+        if not errors:
+            saved.update((answer.question_id, answer) for answer in answers)
+            attempt.status = 'completed'
+            attempt.set_score(key.total_points, sum(answer.points_earned for answer in saved.values()))
+            attempt.save()
+
+    prefetch_related_objects(answers, 'selected_choices')
+    return answers, errors
@@ -189,7 +189,11 @@ class QuizAttempt(models.Model):
         
         total_possible = sum(q.points for q in self.quiz.questions.all())
         earned = sum(answer.points_earned for answer in self.answers.all())
-        
+        self.set_score(total_possible, earned)
+        self.save()
+    
+    def set_score(self, total_possible, earned):
+        """Set points, percentage score and pass/fail from totals already known (does not save)"""
         self.total_points = total_possible
         self.earned_points = earned
         
@@ -199,7 +203,6 @@ class QuizAttempt(models.Model):
             self.score = Decimal('0.00')
         
         self.passed = self.score >= self.quiz.passing_score
-        self.save()
     
     def get_time_remaining(self):
         """Get remaining time for the quiz attempt"""
@@ -1,3 +1,57 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from core.models import User
+from courses.models import Course, CourseType, Department
+from .grading import submit_answers
+from .models import Choice, Question, Quiz, QuizAnswer, QuizAttempt
+
+
+class BulkGradingTests(TestCase):
+    """A submission is graded in memory and saved with a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Languages')
+        course_type = CourseType.objects.create(name='General', department=department)
+        # bulk_create skips the catalog translation hooks
+        course = Course.objects.bulk_create([Course(
+            title='English A1', description='Basics', price=Decimal('10.00'), duration=10, max_students=10,
+            category='course', department=department, course_type=course_type,
+        )])[0]
+        cls.quiz = Quiz.objects.create(title='Unit 1', course=course, passing_score=50)
+        for order in range(1, 11):
+            question = Question.objects.create(quiz=cls.quiz, text=f'Q{order}', question_type='multiple_choice',
+                                               points=2, order=order)
+            Choice.objects.bulk_create([
+                Choice(question=question, text='right', is_correct=True, order=1),
+                Choice(question=question, text='wrong', order=2),
+            ])
+        Question.objects.create(quiz=cls.quiz, text='Describe', question_type='essay', points=5, order=11)
+        cls.student = User.objects.create_user('0991234570', 'Test', 'M', 'Student', password='pass')
+
+    def test_submit_answers(self):
+        attempt = QuizAttempt.objects.select_related('quiz').create(quiz=self.quiz, user=self.student)
+        answers_data = [{'question_order': order, 'choice_orders': [1 if order % 2 else 2]} for order in range(1, 11)]
+        answers_data.append({'question_order': 11, 'text_answer': 'An essay'})
+
+        # Answer key (3), savepoint, saved answers, one insert, choice links, attempt, release, response prefetch
+        with self.assertNumQueries(10):
+            answers, errors = submit_answers(attempt, answers_data)
+        self.assertEqual(errors, [])
+        self.assertEqual([answer.is_correct for answer in answers[:2]], [True, False])
+        self.assertIsNone(answers[-1].is_correct)
+        self.assertEqual([c.text for c in answers[0].selected_choices.all()], ['right'])
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.earned_points, attempt.total_points), ('completed', 10, 25))
+        self.assertFalse(attempt.passed)
+
+        # A second submission replaces the earlier answers and their choices
+        answers, errors = submit_answers(attempt, [{'question_order': 2, 'choice_orders': [1]},
+                                                   {'question_order': 3, 'choice_orders': [9]}])
+        self.assertEqual(errors[0]['question_order'], 3)
+        self.assertEqual(QuizAnswer.objects.filter(attempt=attempt).count(), 11)
+        answer = QuizAnswer.objects.get(attempt=attempt, question__order=2)
+        self.assertTrue(answer.is_correct)
+        self.assertEqual([c.order for c in answer.selected_choices.all()], [1])
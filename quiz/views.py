@@ -10,6 +10,7 @@ from django_rq import enqueue
 from drf_spectacular.utils import extend_schema, OpenApiParameter,extend_schema_view
 from drf_spectacular.types import OpenApiTypes
 from .tasks import generate_questions_for_quiz
+from .grading import submit_answers
 from rest_framework.parsers import MultiPartParser, JSONParser
 from .models import Quiz, Question, Choice, QuizAttempt, QuizAnswer
 from .serializers import (
@@ -529,71 +530,12 @@ class QuizAnswerViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Prefetch attempt and question map
-        attempt = QuizAttempt.objects.select_related('quiz').prefetch_related(
-            'quiz__questions',
-            'quiz__questions__choices',
-            'quiz__questions__related_lessons'
-        ).get(id=attempt_id)
-        question_map = {q.order: q for q in attempt.quiz.questions.all()}
-
-        created_answers = []
-        errors = []
-
-        for answer_data in answers_data:
-            question_order = answer_data['question_order']
-            question = question_map.get(question_order)
-            choice_orders = answer_data.get('choice_orders', [])
-            text_answer = answer_data.get('text_answer', '')
-
-            answer_serializer = QuizAnswerSubmitSerializer(
-                data={
-                    'attempt_id': attempt_id,
-                    'question_order': question_order,
-                    'choice_orders': choice_orders,
-                    'text_answer': text_answer
-                },
-                context={
-                    'request': request,
-                    '_attempt': attempt,
-                    '_question': question
-                }
-            )
-
-            if answer_serializer.is_valid():
-                # Use update_or_create to handle potential duplicates
-                answer, created = QuizAnswer.objects.update_or_create(
-                    attempt=attempt,
-                    question=question,
-                    defaults={
-                        'text_answer': text_answer
-                    }
-                )
-                
-                # Set selected choices
-                if choice_orders:
-                    choices = question.choices.filter(order__in=choice_orders)
-                    answer.selected_choices.set(choices)
-                    answer.refresh_from_db()
-                
-                # Calculate points for auto-graded questions
-                answer.calculate_points()
-                
-                created_answers.append(answer)
-            else:
-                errors.append({
-                    'question_order': question_order,
-                    'errors': answer_serializer.errors
-                })
+        attempt = QuizAttempt.objects.select_related('quiz').get(id=attempt_id)
+        created_answers, errors = submit_answers(attempt, answers_data)
 
         if errors:
             return Response({'errors': errors}, status=status.HTTP_207_MULTI_STATUS)
 
-        # Finalize the attempt
-        attempt.status = 'completed'
-        attempt.calculate_score()
-        attempt.save()
-
         return Response(
             QuizAnswerSerializer(created_answers, many=True).data,
             status=status.HTTP_201_CREATED
@@ -6,4 +6,4 @@ from .models import Report
 class ReportAdmin(admin.ModelAdmin):
     list_display = ('report_type', 'requested_by', 'status', 'created_at', 'completed_at')
     list_filter = ('status', 'report_type', 'created_at')
-    readonly_fields = ('created_at', 'completed_at', 'job_id', 'error_message', 'parameters', 'file_storage')
\ No newline at end of file
+    readonly_fields = ('created_at', 'completed_at', 'job_id', 'error_message', 'parameters', 'file_storage', 'fingerprint', 'data_stamp', 'attached_to')
\ No newline at end of file
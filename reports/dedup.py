@@ -0,0 +1,131 @@
+# reports/dedup.py
+"""
+Content addressing for reports.
+
+A report is identified by its type plus normalized parameters (the
+fingerprint). Its "data stamp" is a cheap aggregate over the rows the report
+covers; when the stamp is unchanged since the last completed report with the
+same fingerprint, that report's file can be reused as-is.
+"""
+import hashlib
+import json
+from datetime import date
+
+from django.db.models import Count, Max, Q, Sum
+
+from complaints.models import Complaint
+from courses.models import Booking, Enrollment
+from dashboard.metrics import transaction_metrics
+from feedback.models import Feedback
+from lessons.models import Attendance, HomeworkGrade, Lesson
+from quiz.models import QuizAttempt
+
+
+def normalize_parameters(parameters):
+    """Canonical form of report parameters: sorted keys, ISO dates, ints for ids."""
+    normalized = {}
+    for key, value in sorted(parameters.items()):
+        if value is None or value == '':
+            continue
+        if isinstance(value, date):
+            value = value.isoformat()
+        elif key.endswith('_id'):
+            value = int(value)
+        else:
+            value = str(value)
+        normalized[key] = value
+    return normalized
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def report_fingerprint(report_type, parameters):
+    return _digest([report_type, normalize_parameters(parameters)])
+
+
+def _period(prefix, params):
+    return Q(**{f'{prefix}__gte': params['start_date'], f'{prefix}__lte': params['end_date']})
+
+
+def _financial_stamp(params):
+    # The report is built only from these rolled-up totals
+    return transaction_metrics(params['start_date'], params['end_date'])
+
+
+def _statistical_stamp(params):
+    # Enrollment and Booking have no updated_at; count the states the report shows
+    enrollments = Enrollment.objects.filter(_period('enrollment_date__date', params)).aggregate(
+        rows=Count('id'), last_id=Max('id'),
+        active=Count('id', filter=Q(status='active')),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+    )
+    bookings = Booking.objects.filter(_period('date', params)).aggregate(
+        rows=Count('id'), last_id=Max('id'),
+        approved=Count('id', filter=Q(status='approved')),
+    )
+    return {'enrollments': enrollments, 'bookings': bookings}
+
+
+def _feedback_stamp(params):
+    # Feedback has no updated_at; rating sums catch edits to existing rows
+    return Feedback.objects.filter(_period('created_at__date', params)).aggregate(
+        rows=Count('id'), last_id=Max('id'),
+        ratings=Sum('teacher_rating') + Sum('material_rating') + Sum('facilities_rating') + Sum('app_rating'),
+    )
+
+
+def _complaints_stamp(params):
+    return Complaint.objects.filter(_period('created_at__date', params)).aggregate(
+        rows=Count('id'), last_id=Max('id'), last_update=Max('updated_at'),
+    )
+
+
+def _performance_stamp(enrollments, slot_id):
+    return {
+        'enrollments': enrollments.aggregate(
+            rows=Count('id'), last_id=Max('id'),
+            completed=Count('id', filter=Q(status='completed')),
+        ),
+        'attendance': Attendance.objects.filter(enrollment__in=enrollments).aggregate(
+            rows=Count('id'), last_update=Max('updated_at'),
+        ),
+        'homework': HomeworkGrade.objects.filter(enrollment__in=enrollments).aggregate(
+            rows=Count('id'), last_update=Max('graded_at'),
+        ),
+        'quizzes': QuizAttempt.objects.filter(quiz__schedule_slot_id=slot_id).aggregate(
+            rows=Count('id'), last_update=Max('completed_at'),
+        ),
+        'lessons': Lesson.objects.filter(schedule_slot_id=slot_id, status='completed').count(),
+    }
+
+
+def _slot_performance_stamp(params):
+    slot_id = params['schedule_slot_id']
+    enrollments = Enrollment.objects.filter(schedule_slot_id=slot_id, status__in=['active', 'completed'])
+    return _performance_stamp(enrollments, slot_id)
+
+
+def _student_performance_stamp(params):
+    enrollments = Enrollment.objects.filter(id=params['enrollment_id'])
+    slot_id = enrollments.values_list('schedule_slot_id', flat=True).first()
+    return _performance_stamp(enrollments, slot_id)
+
+
+DATA_STAMPS = {
+    'financial_summary_period': _financial_stamp,
+    'statistical_summary_period': _statistical_stamp,
+    'feedback_summary': _feedback_stamp,
+    'complaints_summary': _complaints_stamp,
+    'schedule_slot_performance': _slot_performance_stamp,
+    'student_performance': _student_performance_stamp,
+}
+
+
+def data_stamp(report_type, parameters):
+    """Digest of the data a report covers; changes whenever that data changes."""
+    stamp = DATA_STAMPS.get(report_type)
+    if stamp is None:
+        return ''
+    return _digest(stamp(normalize_parameters(parameters)))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_texttranslation'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='attached_to',
+            field=models.ForeignKey(blank=True, help_text='In-flight report this request was attached to instead of starting a new job', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attached_reports', to='reports.report'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='data_stamp',
+            field=models.CharField(blank=True, help_text='Hash of the covered data when the report was generated', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of report type and normalized parameters', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='file_storage',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to='core.filestorage'),
+        ),
+    ]
@@ -29,13 +29,21 @@ class Report(models.Model):
     requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
-    file_storage = models.OneToOneField(FileStorage, on_delete=models.SET_NULL, null=True, blank=True)
+    # Several reports can share one file when an identical report is reused
+    file_storage = models.ForeignKey(FileStorage, on_delete=models.SET_NULL, null=True, blank=True, related_name='reports')
     
     job_id = models.CharField(max_length=255, blank=True, null=True, help_text="RQ Job ID")
     error_message = models.TextField(blank=True, null=True)
 
     parameters = models.JSONField(default=dict, blank=True, help_text="Parameters used for the report, e.g., dates")
 
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True, help_text="Hash of report type and normalized parameters")
+    data_stamp = models.CharField(max_length=64, blank=True, help_text="Hash of the covered data when the report was generated")
+    attached_to = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='attached_reports',
+        help_text="In-flight report this request was attached to instead of starting a new job",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
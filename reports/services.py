@@ -0,0 +1,154 @@
+# reports/services.py
+import logging
+import time
+
+import django_rq
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+
+from core.services import refresh_file_ref_counts
+
+from .dedup import data_stamp, normalize_parameters, report_fingerprint
+from .models import Report
+from .tasks import (
+    generate_financial_report, generate_statistical_report,
+    generate_schedule_slot_performance_report, generate_feedback_report,
+    generate_complaints_report, generate_student_performance_report
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_TASK_MAP = {
+    'financial_summary_period': generate_financial_report,
+    'statistical_summary_period': generate_statistical_report,
+    'schedule_slot_performance': generate_schedule_slot_performance_report,
+    'feedback_summary': generate_feedback_report,
+    'complaints_summary': generate_complaints_report,
+    'student_performance': generate_student_performance_report,
+}
+
+REPORT_LOCK_KEY = "report_request_lock_{fingerprint}"
+REPORT_LOCK_TIMEOUT = 30   # seconds
+REPORT_LOCK_WAIT = 5       # seconds a concurrent identical request waits for the lock
+# Job states in which a report's generation can still finish
+LIVE_JOB_STATUSES = {JobStatus.QUEUED, JobStatus.STARTED, JobStatus.DEFERRED, JobStatus.SCHEDULED}
+IN_FLIGHT = ['pending', 'processing']
+
+
+def _task_args(report, parameters):
+    args = [report.id]
+    if 'start_date' in parameters and 'end_date' in parameters:
+        args.extend([parameters['start_date'], parameters['end_date']])
+    elif 'schedule_slot_id' in parameters:
+        args.append(parameters['schedule_slot_id'])
+    elif 'enrollment_id' in parameters:
+        args.append(parameters['enrollment_id'])
+    return args
+
+
+def _job_alive(job_id):
+    """Whether the RQ job `job_id` can still run to completion (a killed worker never reports back)."""
+    try:
+        job = Job.fetch(job_id, connection=django_rq.get_queue('default').connection)
+    except NoSuchJobError:
+        return False
+    return job.get_status() in LIVE_JOB_STATUSES
+
+
+def _sync_with_primary(report_id, primary_id):
+    """
+    Give an attached report its primary's outcome if the primary finished
+    before the attached row was committed, so the worker's bulk update of
+    attached reports missed it.
+    """
+    primary = Report.objects.filter(pk=primary_id).first()
+    if primary is None or primary.status in IN_FLIGHT:
+        return
+    if primary.status == 'completed':
+        updated = Report.objects.filter(pk=report_id, status__in=IN_FLIGHT).update(
+            status='completed', file_storage=primary.file_storage_id, completed_at=primary.completed_at,
+            data_stamp=primary.data_stamp,
+        )
+        if updated and primary.file_storage_id:
+            refresh_file_ref_counts(primary.file_storage_id)
+    else:
+        Report.objects.filter(pk=report_id, status__in=IN_FLIGHT).update(
+            status=primary.status, error_message=primary.error_message, completed_at=primary.completed_at,
+        )
+
+
+def request_report(report_type, parameters, requested_by):
+    """
+    Create a Report for `report_type`/`parameters`, reusing work when possible:
+
+    - an identical report already queued or running: the new report is
+      attached to it and completes with it (no new job). A report whose job
+      is gone (e.g. the worker was killed) is failed and generated again,
+      together with the reports attached to it;
+    - an identical completed report whose covered data is unchanged: the new
+      report is completed immediately with the same file;
+    - otherwise a new generation job is enqueued.
+
+    Returns (report, reused) where `reused` is True if no new job was started.
+    """
+    parameters = normalize_parameters(parameters)
+    fingerprint = report_fingerprint(report_type, parameters)
+    lock_key = REPORT_LOCK_KEY.format(fingerprint=fingerprint)
+
+    # Serialize identical requests so two of them can't both start a job
+    deadline = time.monotonic() + REPORT_LOCK_WAIT
+    locked = cache.add(lock_key, 1, REPORT_LOCK_TIMEOUT)
+    while not locked and time.monotonic() < deadline:
+        time.sleep(0.1)
+        locked = cache.add(lock_key, 1, REPORT_LOCK_TIMEOUT)
+    if not locked:
+        logger.warning(f"Report lock {lock_key} busy; continuing without it")
+
+    try:
+        report_fields = dict(
+            report_type=report_type,
+            requested_by=requested_by,
+            parameters=parameters,
+            fingerprint=fingerprint,
+        )
+        identical = Report.objects.filter(fingerprint=fingerprint, attached_to__isnull=True)
+
+        in_flight = identical.filter(status__in=IN_FLIGHT).order_by('-created_at').first()
+        lost = None
+        if in_flight and in_flight.job_id and not _job_alive(in_flight.job_id):
+            logger.warning(f"Report {in_flight.pk} lost its job {in_flight.job_id}; generating it again")
+            lost, in_flight = in_flight, None
+        if in_flight:
+            report = Report.objects.create(
+                **report_fields, status=in_flight.status, job_id=in_flight.job_id, attached_to=in_flight,
+            )
+            transaction.on_commit(lambda: _sync_with_primary(report.pk, in_flight.pk))
+            return report, True
+
+        latest = identical.filter(status='completed', file_storage__isnull=False).order_by('-completed_at').first()
+        if latest and latest.data_stamp and latest.data_stamp == data_stamp(report_type, parameters):
+            report = Report.objects.create(
+                **report_fields, status='completed', file_storage=latest.file_storage,
+                data_stamp=latest.data_stamp, completed_at=timezone.now(),
+            )
+            return report, True
+
+        report = Report.objects.create(**report_fields, status='pending')
+        job = django_rq.get_queue('default').enqueue(REPORT_TASK_MAP[report_type], *_task_args(report, parameters))
+        report.job_id = job.id
+        report.save(update_fields=['job_id'])
+        if lost:
+            # Whoever waited on the lost job now waits on this one
+            Report.objects.filter(attached_to=lost, status__in=IN_FLIGHT).update(
+                attached_to=report, job_id=job.id, status='pending',
+            )
+            Report.objects.filter(pk=lost.pk, status__in=IN_FLIGHT).update(
+                status='failed', error_message="Report generation job was lost", completed_at=timezone.now(),
+            )
+        return report, False
+    finally:
+        if locked:
+            cache.delete(lock_key)
@@ -1,42 +1,94 @@
 # reports/utils.py
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import Cell
 from openpyxl.styles import Font, Alignment
 from openpyxl.utils import get_column_letter
 
-def style_header_row(sheet, row_number=1):
-    """Applies bold font and center alignment to all cells in a given row."""
-    header_font = Font(bold=True, name='Calibri', size=12)
-    center_alignment = Alignment(horizontal='center', vertical='center')
-    
-    # This function is safe because it iterates by row, where merged cells are handled correctly.
-    for cell in sheet[row_number]:
-        cell.font = header_font
-        cell.alignment = center_alignment
-
-def adjust_column_widths(sheet):
+HEADER_FONT = Font(bold=True, name='Calibri', size=12)
+TITLE_FONT = Font(bold=True, name='Calibri', size=14)
+CENTER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+
+# Rows held back to size the columns before anything is written
+WIDTH_SAMPLE_ROWS = 200
+MAX_COLUMN_WIDTH = 80
+
+
+def new_workbook():
+    """Write-only workbook: rows are streamed to disk instead of kept as cell objects."""
+    return openpyxl.Workbook(write_only=True)
+
+
+class StreamingSheet:
     """
-    Adjusts column widths based on the longest cell content.
-    This version is safe for sheets with merged cells.
+    Append-only wrapper around a write-only worksheet.
+
+    Write-only sheets need their column widths before the first row is
+    written, so the first WIDTH_SAMPLE_ROWS rows are buffered, widths are
+    computed from that sample, and everything after streams straight through.
+    Call close() (or use it as a context manager) to flush a short sheet.
     """
-    # Iterate through columns by their index (1, 2, 3...) instead of column objects
-    for col_idx in range(1, sheet.max_column + 1):
-        max_length = 0
-        # Safely get the column letter from its index
-        column_letter = get_column_letter(col_idx)
-        
-        # Iterate through all cells in this column
-        for cell in sheet[column_letter]:
-            # We only care about cells that actually have a value.
-            # Merged cell placeholders have a value of None.
-            if cell.value is not None:
-                try:
-                    # Check the length of the cell's content
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
-                except:
-                    # Pass if cell content has no length
-                    pass
-                    
-        # Add a little padding to the width for aesthetics
-        adjusted_width = (max_length + 2)
-        sheet.column_dimensions[column_letter].width = adjusted_width
\ No newline at end of file
+
+    def __init__(self, workbook, title, sample_size=WIDTH_SAMPLE_ROWS):
+        self.sheet = workbook.create_sheet(title=title[:31])
+        self.sample_size = sample_size
+        self._sample = []
+        self._flushed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def title(self, text):
+        # Titles overflow into the next columns; don't size column A by them
+        self._append([self._cell(text, TITLE_FONT)], sized=False)
+
+    def header(self, values):
+        self._append([self._cell(value, HEADER_FONT, CENTER_ALIGNMENT) for value in values])
+
+    def append(self, values=()):
+        self._append(list(values))
+
+    def extend(self, rows):
+        for row in rows:
+            self._append(list(row))
+
+    def close(self):
+        if not self._flushed:
+            self._flush_sample()
+
+    def _cell(self, value, font, alignment=None):
+        cell = WriteOnlyCell(self.sheet, value=value)
+        cell.font = font
+        if alignment:
+            cell.alignment = alignment
+        return cell
+
+    def _append(self, row, sized=True):
+        if self._flushed:
+            self.sheet.append(row)
+            return
+        self._sample.append((row, sized))
+        if len(self._sample) >= self.sample_size:
+            self._flush_sample()
+
+    def _flush_sample(self):
+        widths = {}
+        for row, sized in self._sample:
+            if not sized:
+                continue
+            for idx, value in enumerate(row, start=1):
+                if isinstance(value, Cell):
+                    value = value.value
+                if value is not None:
+                    widths[idx] = max(widths.get(idx, 0), len(str(value)))
+        for idx, width in widths.items():
+            # Add a little padding to the width for aesthetics
+            self.sheet.column_dimensions[get_column_letter(idx)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+        for row, _ in self._sample:
+            self.sheet.append(row)
+        self._sample = []
+        self._flushed = True
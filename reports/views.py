@@ -2,25 +2,11 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
-import django_rq
 from rest_framework.decorators import action
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from .models import Report
 from .serializers import ReportSerializer, ReportCreateSerializer
-from .tasks import (
-    generate_financial_report, generate_statistical_report,
-    generate_schedule_slot_performance_report, generate_feedback_report,
-    generate_complaints_report, generate_student_performance_report
-)
-
-REPORT_TASK_MAP = {
-    'financial_summary_period': generate_financial_report,
-    'statistical_summary_period': generate_statistical_report,
-    'schedule_slot_performance': generate_schedule_slot_performance_report,
-    'feedback_summary': generate_feedback_report,
-    'complaints_summary': generate_complaints_report,
-    'student_performance': generate_student_performance_report,
-}
+from .services import REPORT_TASK_MAP, request_report
 
 class ReportViewSet(viewsets.ModelViewSet):
     queryset = Report.objects.all()
@@ -37,13 +23,15 @@ class ReportViewSet(viewsets.ModelViewSet):
         summary="Request a new background report",
         description="""
         Triggers a background job to generate a report. Poll the report's detail endpoint (`/api/reports/{id}/`) to check the status. When `status` is "completed", the `file_details` object will contain a `telegram_download_link`.
+
+        Identical requests (same type and parameters) are deduplicated: while one is queued or running, new ones attach to it; once completed, its file is reused (returned immediately with 200) as long as the underlying data has not changed.
         
         **Parameter Requirements:**
         - **Time Period Reports** (`financial_summary_period`, `statistical_summary_period`, `feedback_summary`, `complaints_summary`): Require `start_date` and `end_date`.
         - **Academic Reports** (`schedule_slot_performance`): Requires `schedule_slot_id`.
         """,
         request=ReportCreateSerializer,
-        responses={202: ReportSerializer},
+        responses={200: ReportSerializer, 202: ReportSerializer},
         examples=[
             OpenApiExample('Financial Report Request', value={"report_type": "financial_summary_period", "start_date": "2025-08-01", "end_date": "2025-08-31"}, request_only=True),
             OpenApiExample('Statistical Report Request', value={"report_type": "statistical_summary_period", "start_date": "2025-01-01", "end_date": "2025-03-31"}, request_only=True),
@@ -57,27 +45,15 @@ class ReportViewSet(viewsets.ModelViewSet):
         data = create_serializer.validated_data
         report_type = data['report_type']
         
-        task_function = REPORT_TASK_MAP.get(report_type)
-        if not task_function:
+        if report_type not in REPORT_TASK_MAP:
             return Response({'error': 'Invalid report type specified.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        report = Report.objects.create(
-            report_type=report_type,
-            requested_by=request.user,
-            status='pending',
-            parameters={k: str(v) for k, v in data.items() if k != 'report_type'}
+        report, _ = request_report(
+            report_type,
+            {k: v for k, v in data.items() if k != 'report_type'},
+            request.user,
         )
-        
-        task_args = [report.id]
-        if 'start_date' in data and 'end_date' in data:
-            task_args.extend([data['start_date'], data['end_date']])
-        elif 'schedule_slot_id' in data:
-            task_args.append(data['schedule_slot_id'])
-
-        queue = django_rq.get_queue('default')
-        job = queue.enqueue(task_function, *task_args)
-        report.job_id = job.id
-        report.save()
 
         serializer = self.get_serializer(report)
-        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
\ No newline at end of file
+        response_status = status.HTTP_200_OK if report.status == 'completed' else status.HTTP_202_ACCEPTED
+        return Response(serializer.data, status=response_status)
\ No newline at end of file